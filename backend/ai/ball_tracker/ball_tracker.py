@@ -1,136 +1,255 @@
 import logging
-import os
+import math
 import torch
+import torch.nn.functional as F
 import numpy as np
-from collections import deque
 
 from deep_sort_realtime.deepsort_tracker import DeepSort as BallDeepSortTracker
 
+from capstone.backend.ai import model_registry
+from capstone.backend.ai.ball_tracker.kalman_tracker import KalmanBallTracker
 from capstone.backend.ai.ball_tracker.track_net import TrackNetV4
 
 from capstone.backend.app.core import analysis_config as config
 from capstone.backend.app.utils import video_utils
 
+def create_association_tracker(backend: str):
+    """The ball association backend; both expose update_tracks(detections, frame) -> tracks."""
+    if backend == "kalman":
+        return KalmanBallTracker(max_age=config.BALL_TRACKER_MAX_AGE, n_init=config.BALL_TRACKER_N_INIT)
+    if backend != "deepsort":
+        logging.warning(f"Unknown BALL_TRACKER_BACKEND '{backend}', using DeepSORT.")
+    tracker = BallDeepSortTracker(max_age=config.BALL_TRACKER_MAX_AGE,
+                                  n_init=config.BALL_TRACKER_N_INIT,
+                                  nms_max_overlap=config.BALL_TRACKER_NMS_OVERLAP,
+                                  embedder=None)
+    tracker.embedder = model_registry.get_deepsort_embedder()
+    return tracker
+
+
+def select_ball_center(ball_tracks: list) -> tuple[float, float] | None:
+    """Center of the best confirmed track (most recently updated, then most hits) if it was updated just now."""
+    confirmed_ball_tracks = [t for t in ball_tracks if t.is_confirmed()]
+
+    best_ball_track = None
+    if confirmed_ball_tracks:
+        confirmed_ball_tracks.sort(key=lambda t: (t.time_since_update, -t.hits))
+        best_ball_track = confirmed_ball_tracks[0]
+
+    # Get center from the best confirmed track
+    if best_ball_track and best_ball_track.time_since_update <= 1:
+        ltrb_ball = best_ball_track.to_tlbr()
+        return (ltrb_ball[0] + ltrb_ball[2]) / 2, (ltrb_ball[1] + ltrb_ball[3]) / 2
+    return None
+
+
+def _logit_threshold() -> float:
+    """BALL_DETECTION_THRESHOLD in logit space; sigmoid is monotonic, so raw heatmaps can be compared against it."""
+    threshold = config.BALL_DETECTION_THRESHOLD
+    if threshold <= 0:
+        return -math.inf
+    if threshold >= 1:
+        return math.inf
+    return math.log(threshold / (1 - threshold))
+
+
+def heatmap_peak_candidates(heatmap_logits: torch.Tensor) -> list[list[tuple[int, int]]]:
+    """
+    Global peak candidates of a batch of raw heatmaps (N, H, W) that pass BALL_DETECTION_THRESHOLD, as
+    up to BALL_PEAK_CANDIDATES (y, x) per heatmap, strongest first; the first is the global argmax.
+    Max-pool NMS runs on the device: each BALL_PEAK_TILE_SIZE tile contributes its maximum, unless a
+    neighbouring tile holds a stronger one (a blob straddling tile borders is one candidate, not four).
+    Only the candidates reach the host.
+    """
+    num_heatmaps, height, width = heatmap_logits.shape
+    # Non-overlapping tiles: a stride-1 pool over the full map would cost far more than the rest of the search on CPU
+    tile_max, tile_argmax = F.max_pool2d(heatmap_logits.reshape(num_heatmaps, 1, height, width),
+                                         config.BALL_PEAK_TILE_SIZE, ceil_mode=True, return_indices=True)
+    is_peak = (tile_max == F.max_pool2d(tile_max, 3, stride=1, padding=1)) & (tile_max >= _logit_threshold())
+    tile_max = torch.where(is_peak, tile_max, -math.inf).reshape(num_heatmaps, -1)
+    k = min(config.BALL_PEAK_CANDIDATES, tile_max.shape[1])
+    values, order = tile_max.topk(k, dim=1)
+    indices = tile_argmax.reshape(num_heatmaps, -1).gather(1, order)
+
+    return [[divmod(index, width) for value, index in zip(row_values, row_indices) if value != -math.inf]
+            for row_values, row_indices in zip(values.cpu().tolist(), indices.cpu().tolist())]
+
+
 class BallTracker:
     def __init__(self, video_metadata: dict):
-        self.model = self._load_model()
-        self.tracker = BallDeepSortTracker(max_age=config.BALL_TRACKER_MAX_AGE,
-                                           n_init=config.BALL_TRACKER_N_INIT,
-                                           nms_max_overlap=config.BALL_TRACKER_NMS_OVERLAP)
+        # Networks come from the process-wide registry; this object only holds per-video tracker state.
+        self.model = model_registry.get_tracknet_model()
+        self.tracker = create_association_tracker(config.BALL_TRACKER_BACKEND)
         self.last_known_ball_center_model = None
-        self.original_width = video_metadata['width']
-        self.original_height = video_metadata['height']
+        # Ball centers are reported in the coordinates of the decoded frames (the analysis resolution).
+        self.original_width = video_metadata.get('analysis_width', video_metadata['width'])
+        self.original_height = video_metadata.get('analysis_height', video_metadata['height'])
         self.scale_width = self.original_width / config.TRACKNET_WIDTH
         self.scale_height = self.original_height / config.TRACKNET_HEIGHT
+        self.input_buffer = video_utils.TrackNetInputBuffer(config.TRACKNET_WIDTH, config.TRACKNET_HEIGHT)
+        # ROI mode: while the ball track is confirmed, TrackNet runs on a crop around it (0 disables).
+        self.roi_size = config.TRACKNET_ROI_SIZE
+        if self.roi_size > 0 and (self.roi_size % 16 or self.roi_size > min(config.TRACKNET_WIDTH, config.TRACKNET_HEIGHT)):
+            logging.warning(f"TRACKNET_ROI_SIZE {self.roi_size} must be a multiple of 16 and fit the model input; "
+                            f"using full-frame inference.")
+            self.roi_size = 0
+        self.roi_inferences_since_full = 0
 
-    def _load_model(self):
-        if not os.path.exists(config.TRACKNET_MODEL_PATH):
-            logging.error(f"TrackNet model not found at: {config.TRACKNET_MODEL_PATH}")
-            raise FileNotFoundError(f"TrackNet model not found: {config.TRACKNET_MODEL_PATH}")
-        try:
-            model = TrackNetV4().to(config.DEVICE)
-            # Use map_location for flexibility
-            state_dict = torch.load(config.TRACKNET_MODEL_PATH, map_location=config.DEVICE, weights_only=True)
-            model.load_state_dict(state_dict)
-            model.eval()
-            logging.info(f"TrackNet model loaded from {config.TRACKNET_MODEL_PATH} and set to eval mode.")
-            return model
-        except ImportError as imp_err:
-             logging.error(f"Import error loading TrackNet model (check TrackNetV4 source/dependencies): {imp_err}")
-             raise
-        except Exception as e:
-            logging.error(f"Error loading TrackNet model: {e}", exc_info=True)
-            raise
+    def get_state(self) -> dict:
+        """JSON-serialisable tracker state for checkpointing (DeepSORT tracks re-confirm after a resume)."""
+        center = self.last_known_ball_center_model
+        return {"last_known_ball_center_model": None if center is None else [float(v) for v in center]}
+
+    def load_state(self, state: dict):
+        center = state.get("last_known_ball_center_model")
+        self.last_known_ball_center_model = None if center is None else tuple(center)
 
-    def _find_ball_peak(self, heatmap: torch.Tensor) -> tuple[int, int] | None:
-        """Finds the peak in the heatmap, potentially using a search window."""
-        ball_peak_found = False
-        peak_y_model, peak_x_model = -1, -1
+    def _window_peak(self, heatmap_logits: torch.Tensor, origin: tuple[int, int]) -> tuple[int, int] | None:
+        """Argmax of the search window around the last known ball, if it passes the threshold; two scalars reach the host."""
+        origin_y, origin_x = origin
+        height, width = heatmap_logits.shape
+        prev_x_model, prev_y_model = self.last_known_ball_center_model
+        y_min = int(max(origin_y, prev_y_model - config.BALL_SEARCH_WINDOW_RADIUS))
+        y_max = int(min(origin_y + height, prev_y_model + config.BALL_SEARCH_WINDOW_RADIUS))
+        x_min = int(max(origin_x, prev_x_model - config.BALL_SEARCH_WINDOW_RADIUS))
+        x_max = int(min(origin_x + width, prev_x_model + config.BALL_SEARCH_WINDOW_RADIUS))
+        if y_min >= y_max or x_min >= x_max:
+            return None
 
+        heatmap_window = heatmap_logits[y_min - origin_y:y_max - origin_y, x_min - origin_x:x_max - origin_x]
+        max_logit, max_index = torch.max(heatmap_window.reshape(-1), dim=0)
+        max_logit, max_index = torch.stack([max_logit.double(), max_index.double()]).tolist()
+        if max_logit < _logit_threshold():
+            return None
+        window_y_rel, window_x_rel = divmod(int(max_index), x_max - x_min)
+        return y_min + window_y_rel, x_min + window_x_rel
+
+    def _find_ball_peak(self, heatmap_logits: torch.Tensor, origin: tuple[int, int] = (0, 0)) -> tuple[int, int] | None:
+        """
+        Finds the ball in a raw heatmap: the windowed argmax around the last known ball, else the
+        strongest global candidate (see heatmap_peak_candidates), which is only computed on a window miss.
+        The heatmap covers model coordinates from origin (y, x), e.g. a ROI crop; the peak is returned
+        in full model coordinates.
+        """
         # 1. Search window (if previous location known)
         if self.last_known_ball_center_model:
-            prev_x_model, prev_y_model = self.last_known_ball_center_model
-            y_min = int(max(0, prev_y_model - config.BALL_SEARCH_WINDOW_RADIUS))
-            y_max = int(min(config.TRACKNET_HEIGHT, prev_y_model + config.BALL_SEARCH_WINDOW_RADIUS))
-            x_min = int(max(0, prev_x_model - config.BALL_SEARCH_WINDOW_RADIUS))
-            x_max = int(min(config.TRACKNET_WIDTH, prev_x_model + config.BALL_SEARCH_WINDOW_RADIUS))
-
-            if y_min < y_max and x_min < x_max:
-                heatmap_window = heatmap[y_min:y_max, x_min:x_max]
-                if heatmap_window.numel() > 0:
-                    max_conf_window, max_idx_window = torch.max(heatmap_window.reshape(-1), dim=0)
-                    if max_conf_window.item() >= config.BALL_DETECTION_THRESHOLD:
-                        window_y_rel, window_x_rel = divmod(max_idx_window.item(), heatmap_window.shape[1])
-                        peak_y_model = y_min + window_y_rel
-                        peak_x_model = x_min + window_x_rel
-                        ball_peak_found = True
+            window_peak = self._window_peak(heatmap_logits, origin)
+            if window_peak is not None:
+                return window_peak
 
         # 2. Global search (if window search failed or no previous location)
-        if not ball_peak_found:
-            max_conf_global, max_idx_global = torch.max(heatmap.view(-1), dim=0)
-            if max_conf_global.item() >= config.BALL_DETECTION_THRESHOLD:
-                peak_y_model, peak_x_model = divmod(max_idx_global.item(), config.TRACKNET_WIDTH)
-                ball_peak_found = True
+        candidates = heatmap_peak_candidates(heatmap_logits.unsqueeze(0))[0]
+        if not candidates:
+            return None
+        peak_y, peak_x = candidates[0]
+        return origin[0] + peak_y, origin[1] + peak_x
+
+    def add_frame(self, frame: np.ndarray) -> bool:
+        """Preprocesses a newly decoded frame into the rolling TrackNet input buffer."""
+        try:
+            self.input_buffer.push(frame)
+            return True
+        except Exception as e:
+            logging.warning(f"Error preparing TrackNet input: {e}")
+            self.input_buffer.clear()
+            return False
 
-        return (peak_y_model, peak_x_model) if ball_peak_found else None
+    def _run_tracknet(self, channels=(0, 1, 2), origin: tuple[int, int] | None = None) -> torch.Tensor | None:
+        """
+        Runs TrackNet on the buffered 3-frame window and returns the raw heatmaps (1, len(channels), H, W).
+        With an origin (y, x), only the roi_size square crop of the window from there is processed.
+        """
+        if not self.input_buffer.is_full() or self.model is None:
+            return None
+        frames = self.input_buffer.model_input(origin, self.roi_size)
+        if isinstance(self.model, TrackNetV4):
+            return self.model.infer(frames, channels)
+        # Compiled/exported backends only have the full forward
+        with torch.no_grad():
+            return self.model(frames)[:, list(channels)]
 
-    def track_ball(self, frame_buffer: deque, current_frame_for_deepsort: np.ndarray) -> tuple[tuple | None, bool]:
-        """Processes frame buffer with TrackNet and updates DeepSORT."""
+    def _roi_origin(self) -> tuple[int, int] | None:
+        """Top-left (y, x) of the crop centred on the confirmed ball, or None when the full frame should be used."""
+        if self.roi_size <= 0 or self.last_known_ball_center_model is None:
+            return None
+        # Periodic full-frame pass, so a ball the crop lost sight of can be re-acquired
+        if self.roi_inferences_since_full >= config.TRACKNET_ROI_REFRESH_INTERVAL:
+            return None
+        center_x, center_y = self.last_known_ball_center_model
+        y0 = int(min(max(round(center_y) - self.roi_size // 2, 0), config.TRACKNET_HEIGHT - self.roi_size))
+        x0 = int(min(max(round(center_x) - self.roi_size // 2, 0), config.TRACKNET_WIDTH - self.roi_size))
+        return y0, x0
+
+    def _infer_heatmaps(self, channels) -> tuple[torch.Tensor | None, tuple[int, int]]:
+        """Heatmaps for the buffered window and the model coordinates (y, x) they start at."""
+        origin = self._roi_origin()
+        if origin is not None:
+            try:
+                heatmaps = self._run_tracknet(channels, origin)
+                self.roi_inferences_since_full += 1
+                return heatmaps, origin
+            except Exception as e:
+                # e.g. an exported backend with a fixed input size
+                logging.warning(f"ROI TrackNet inference failed, using full frames from now on: {e}")
+                self.roi_size = 0
+        self.roi_inferences_since_full = 0
+        return self._run_tracknet(channels), (0, 0)
+
+    def _detections_from_peak(self, peak_coords_model: tuple[int, int] | None) -> list:
+        """Converts a heatmap peak in model coordinates into DeepSORT detections in original frame coordinates."""
+        detections_for_tracker = []
+        if peak_coords_model:
+            peak_y_model, peak_x_model = peak_coords_model
+            # Convert model coords to original frame bbox for DeepSORT
+            center_x_orig = peak_x_model * self.scale_width
+            center_y_orig = peak_y_model * self.scale_height
+            width_orig = config.BALL_BOX_SIZE_MODEL * self.scale_width
+            height_orig = config.BALL_BOX_SIZE_MODEL * self.scale_height
+            left_orig = max(0.0, center_x_orig - (width_orig / 2))
+            top_orig = max(0.0, center_y_orig - (height_orig / 2))
+            # Ensure width/height don't extend beyond frame boundaries and are positive
+            w_final = max(1.0, width_orig if left_orig + width_orig <= self.original_width else self.original_width - left_orig)
+            h_final = max(1.0, height_orig if top_orig + height_orig <= self.original_height else self.original_height - top_orig)
+            bbox_xywh_original = [left_orig, top_orig, w_final, h_final]
+            # Confidence is high as it passed the heatmap threshold
+            detections_for_tracker.append((bbox_xywh_original, 0.9, 'ball'))
+        return detections_for_tracker
+
+    def _detections_from_heatmap(self, heatmap_logits: torch.Tensor, origin: tuple[int, int] = (0, 0)) -> list:
+        """Converts a single raw heatmap (starting at model coordinates origin) into DeepSORT detections in original frame coordinates."""
+        return self._detections_from_peak(self._find_ball_peak(heatmap_logits, origin))
+
+    def _update_tracker(self, detections_for_tracker: list, frame: np.ndarray) -> tuple[tuple | None, bool]:
+        """Feeds one frame's detections to DeepSORT and returns the confirmed ball center."""
+        ball_tracks = self.tracker.update_tracks(detections_for_tracker, frame=frame)
+        ball_center = select_ball_center(ball_tracks)
+        if ball_center is not None:
+            cx_orig, cy_orig = ball_center
+            self.last_known_ball_center_model = (cx_orig / self.scale_width, cy_orig / self.scale_height)
+            return (cx_orig, cy_orig), True
+
+        if self.last_known_ball_center_model is not None:
+            logging.info(f"Ball track lost.")
+        self.last_known_ball_center_model = None
+        return None, False
+
+    def track_ball(self, current_frame_for_deepsort: np.ndarray) -> tuple[tuple | None, bool]:
+        """Runs TrackNet on the buffered window (see add_frame) and updates DeepSORT for its middle frame."""
         ball_center_orig = None
         ball_tracked_this_frame = False
         detections_for_tracker = []
 
         try:
-            tracknet_input = video_utils.prepare_tracknet_input(frame_buffer, config.TRACKNET_WIDTH, config.TRACKNET_HEIGHT)
-            if tracknet_input is not None and self.model is not None:
-                with torch.no_grad():
-                    heatmap_output = self.model(tracknet_input)
-                # Ensure the channel index is valid
-                if config.TRACKNET_BALL_HEATMAP_CHANNEL < heatmap_output.shape[1]:
-                     heatmap_current = torch.sigmoid(heatmap_output[0, config.TRACKNET_BALL_HEATMAP_CHANNEL].cpu())
-                     peak_coords_model = self._find_ball_peak(heatmap_current)
-
-                     if peak_coords_model:
-                         peak_y_model, peak_x_model = peak_coords_model
-                         # Convert model coords to original frame bbox for DeepSORT
-                         center_x_orig = peak_x_model * self.scale_width
-                         center_y_orig = peak_y_model * self.scale_height
-                         width_orig = config.BALL_BOX_SIZE_MODEL * self.scale_width
-                         height_orig = config.BALL_BOX_SIZE_MODEL * self.scale_height
-                         left_orig = max(0.0, center_x_orig - (width_orig / 2))
-                         top_orig = max(0.0, center_y_orig - (height_orig / 2))
-                         # Ensure width/height don't extend beyond frame boundaries and are positive
-                         w_final = max(1.0, width_orig if left_orig + width_orig <= self.original_width else self.original_width - left_orig)
-                         h_final = max(1.0, height_orig if top_orig + height_orig <= self.original_height else self.original_height - top_orig)
-                         bbox_xywh_original = [left_orig, top_orig, w_final, h_final]
-                         # Confidence is high as it passed the heatmap threshold
-                         detections_for_tracker.append((bbox_xywh_original, 0.9, 'ball'))
-                else:
-                    logging.warning(f"Invalid TRACKNET_BALL_HEATMAP_CHANNEL: {config.TRACKNET_BALL_HEATMAP_CHANNEL}")
-
+            # Ensure the channel index is valid
+            if 0 <= config.TRACKNET_BALL_HEATMAP_CHANNEL < 3:
+                heatmap_output, origin = self._infer_heatmaps((config.TRACKNET_BALL_HEATMAP_CHANNEL,))
+                if heatmap_output is not None:
+                    detections_for_tracker = self._detections_from_heatmap(heatmap_output[0, 0], origin)
+            else:
+                logging.warning(f"Invalid TRACKNET_BALL_HEATMAP_CHANNEL: {config.TRACKNET_BALL_HEATMAP_CHANNEL}")
 
             # Update DeepSORT tracker
-            ball_tracks = self.tracker.update_tracks(detections_for_tracker, frame=current_frame_for_deepsort)
-            confirmed_ball_tracks = [t for t in ball_tracks if t.is_confirmed()]
-
-            best_ball_track = None
-            if confirmed_ball_tracks:
-                confirmed_ball_tracks.sort(key=lambda t: (t.time_since_update, -t.hits))
-                best_ball_track = confirmed_ball_tracks[0]
-
-            # Get center from the best confirmed track
-            if best_ball_track and best_ball_track.time_since_update <= 1:
-                 ltrb_ball = best_ball_track.to_tlbr()
-                 cx_orig = (ltrb_ball[0] + ltrb_ball[2]) / 2
-                 cy_orig = (ltrb_ball[1] + ltrb_ball[3]) / 2
-                 ball_center_orig = (cx_orig, cy_orig)
-                 self.last_known_ball_center_model = (cx_orig / self.scale_width, cy_orig / self.scale_height)
-                 ball_tracked_this_frame = True
-            else:
-                 self.last_known_ball_center_model = None
-                 ball_tracked_this_frame = False
-                 if self.last_known_ball_center_model is not None:
-                     logging.info(f"Ball track lost.")
+            ball_center_orig, ball_tracked_this_frame = self._update_tracker(detections_for_tracker, current_frame_for_deepsort)
 
         except Exception as e:
             logging.error(f"Error during ball tracking: {e}", exc_info=False)
@@ -138,4 +257,27 @@ class BallTracker:
             ball_center_orig = None
             ball_tracked_this_frame = False
 
-        return ball_center_orig, ball_tracked_this_frame
\ No newline at end of file
+        return ball_center_orig, ball_tracked_this_frame
+
+    def track_ball_window(self, frames: list) -> list[tuple[tuple | None, bool]]:
+        """
+        Strided mode: runs TrackNet once on a window of 3 newly added frames and feeds all three
+        heatmaps to DeepSORT in frame order. Returns one (ball_center, tracked) per frame.
+        """
+        results = []
+        try:
+            heatmap_output, origin = self._infer_heatmaps((0, 1, 2))
+            # The peak search runs per frame, as each tracker update moves the window.
+            for i, frame in enumerate(frames):
+                detections_for_tracker = []
+                if heatmap_output is not None:
+                    peak = self._find_ball_peak(heatmap_output[0, i], origin)
+                    detections_for_tracker = self._detections_from_peak(peak)
+                results.append(self._update_tracker(detections_for_tracker, frame))
+
+        except Exception as e:
+            logging.error(f"Error during strided ball tracking: {e}", exc_info=False)
+            self.last_known_ball_center_model = None
+            results.extend([(None, False)] * (len(frames) - len(results)))
+
+        return results
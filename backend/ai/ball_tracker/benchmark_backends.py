@@ -0,0 +1,55 @@
+import argparse
+import logging
+import os
+
+import torch
+
+from capstone.backend.ai.ball_tracker import inference_backends
+from capstone.backend.ai.ball_tracker.track_net import TrackNetV4
+from capstone.backend.app.core import analysis_config as config
+
+
+def main():
+    """
+    Compares the TrackNet inference backends: max heatmap difference to eager mode and throughput.
+    Uses the configured weights when present, otherwise a randomly initialised network.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--backends", nargs="+", default=list(inference_backends.BACKENDS),
+                        choices=inference_backends.BACKENDS)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--height", type=int, default=config.TRACKNET_HEIGHT)
+    parser.add_argument("--width", type=int, default=config.TRACKNET_WIDTH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=config.LOG_FORMAT)
+
+    model = TrackNetV4().to(config.DEVICE)
+    if os.path.exists(config.TRACKNET_MODEL_PATH):
+        model.load_state_dict(torch.load(config.TRACKNET_MODEL_PATH, map_location=config.DEVICE, weights_only=True))
+    else:
+        logging.warning(f"No weights at {config.TRACKNET_MODEL_PATH}; benchmarking random weights.")
+    model.eval()
+
+    inputs = inference_backends.example_input(args.batch_size, args.height, args.width)
+    eager_rate = None
+    print(f"{'backend':<12} {'max diff':>10} {'windows/s':>10} {'speed-up':>9}")
+    for name in args.backends:
+        try:
+            backend = inference_backends.build_backend(model, name, inputs)
+            difference = inference_backends.max_heatmap_difference(model, backend, inputs)
+            rate = inference_backends.measure_throughput(backend, inputs, args.iterations) * args.batch_size
+        except Exception as e:
+            print(f"{name:<12} failed: {e}")
+            continue
+        if name == "eager":
+            eager_rate = rate
+        speed_up = f"{rate / eager_rate:.2f}x" if eager_rate else "-"
+        print(f"{name:<12} {difference:>10.2e} {rate:>10.2f} {speed_up:>9}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+
+from capstone.backend.ai.ball_tracker.ball_tracker import create_association_tracker, select_ball_center
+from capstone.backend.app.core import analysis_config as config
+
+
+def synthetic_peaks(num_frames: int, width: int, height: int, seed: int = 0) -> tuple[list, list]:
+    """
+    A ball moving with occasional kicks and bounces off the frame edges. Returns (ground truth
+    centers, heatmap peaks), where peaks carry pixel noise, dropouts (None) and false positives.
+    """
+    rng = np.random.default_rng(seed)
+    position = np.array([width / 2, height / 2])
+    velocity = rng.normal(0, 6, size=2)
+    truth, peaks = [], []
+    for _ in range(num_frames):
+        if rng.random() < 0.02:
+            velocity = rng.normal(0, 12, size=2)  # kick
+        position = position + velocity
+        for axis, limit in ((0, width), (1, height)):
+            if not 0 <= position[axis] < limit:
+                velocity[axis] = -velocity[axis]
+                position[axis] = np.clip(position[axis], 0, limit - 1)
+        truth.append(position.tolist())
+        if rng.random() < 0.1:
+            peaks.append(None)
+        elif rng.random() < 0.03:
+            peaks.append([float(rng.uniform(0, width)), float(rng.uniform(0, height))])
+        else:
+            peaks.append((position + rng.normal(0, 2, size=2)).tolist())
+    return truth, peaks
+
+
+def run_backend(backend: str, peaks: list, width: int, height: int) -> tuple[list, float]:
+    """Feeds the peaks to one association backend like BallTracker does; returns per-frame centers and frames/s."""
+    tracker = create_association_tracker(backend)
+    box_width = config.BALL_BOX_SIZE_MODEL * width / config.TRACKNET_WIDTH
+    box_height = config.BALL_BOX_SIZE_MODEL * height / config.TRACKNET_HEIGHT
+    # DeepSORT embeds a crop of the frame for every detection; its cost is part of the comparison.
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+
+    centers = []
+    start = time.perf_counter()
+    for peak in peaks:
+        detections = []
+        if peak is not None:
+            left, top = max(0.0, peak[0] - box_width / 2), max(0.0, peak[1] - box_height / 2)
+            detections.append(([left, top, box_width, box_height], 0.9, 'ball'))
+        centers.append(select_ball_center(tracker.update_tracks(detections, frame=frame)))
+    elapsed = time.perf_counter() - start
+    return centers, len(peaks) / elapsed if elapsed > 0 else float("inf")
+
+
+def continuity_report(centers: list, reference: list, max_error: float) -> dict:
+    """Coverage, track breaks and error of the tracked centers against the reference positions."""
+    tracked = np.array([c is not None for c in centers])
+    errors = np.array([np.hypot(c[0] - r[0], c[1] - r[1]) for c, r in zip(centers, reference)
+                       if c is not None and r is not None])
+    breaks = int(np.count_nonzero(tracked[:-1] & ~tracked[1:]))
+    return {
+        "coverage": float(tracked.mean()) if tracked.size else 0.0,
+        "track_breaks": breaks,
+        "mean_error_px": float(errors.mean()) if errors.size else None,
+        "p95_error_px": float(np.percentile(errors, 95)) if errors.size else None,
+        "off_ball_frames": int(np.count_nonzero(errors > max_error)),
+    }
+
+
+def main():
+    """
+    Compares the DeepSORT and Kalman ball association backends on the same heatmap peaks: throughput
+    and track continuity. Peaks come from a JSON file {"width", "height", "peaks": [[x, y] | null, ...]}
+    in frame pixels, or from a synthetic trajectory (then errors are against the true positions).
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--peaks", help="Recorded peaks JSON; omit for a synthetic trajectory")
+    parser.add_argument("--synthetic-frames", type=int, default=2000)
+    parser.add_argument("--backends", nargs="+", default=["deepsort", "kalman"], choices=["deepsort", "kalman"])
+    parser.add_argument("--max-error", type=float, default=20.0, help="Error (px) above which a tracked frame counts as off the ball")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format=config.LOG_FORMAT)
+
+    if args.peaks:
+        with open(args.peaks) as f:
+            recorded = json.load(f)
+        width, height, peaks = recorded["width"], recorded["height"], recorded["peaks"]
+        reference = peaks
+    else:
+        width, height = 1280, 720
+        reference, peaks = synthetic_peaks(args.synthetic_frames, width, height)
+
+    report = {}
+    for backend in args.backends:
+        centers, frames_per_second = run_backend(backend, peaks, width, height)
+        report[backend] = {"frames_per_s": round(frames_per_second, 1),
+                           **continuity_report(centers, reference, args.max_error)}
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import Callable
+
+import torch
+
+from capstone.backend.app.core import analysis_config as config
+
+# Every backend is a callable taking the (N, 9, H, W) input tensor and returning the (N, 3, H, W)
+# heatmap logits on the input's device, so BallTracker runs them all the same way.
+BACKENDS = ("eager", "compile", "torchscript", "onnx")
+
+
+def _build_compile(model: torch.nn.Module, example_input: torch.Tensor) -> Callable:
+    compiled = torch.compile(model)
+    with torch.no_grad():
+        compiled(example_input)  # compile now rather than on the first video frame
+    return compiled
+
+
+def _build_torchscript(model: torch.nn.Module, example_input: torch.Tensor) -> Callable:
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example_input)
+    # Freezing inlines the weights; optimize_for_inference then fuses conv+ReLU (MKL-DNN on CPU).
+    frozen = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+    with torch.no_grad():
+        frozen(example_input)
+    return frozen
+
+
+class OnnxTrackNet:
+    """Runs an exported TrackNet with ONNX Runtime, taking and returning torch tensors."""
+
+    def __init__(self, onnx_path: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Follow torch's thread count, which the analysis workers size to their share of the cores.
+        options.intra_op_num_threads = torch.get_num_threads()
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, frames: torch.Tensor) -> torch.Tensor:
+        heatmaps = self.session.run(None, {self.input_name: frames.detach().cpu().numpy()})[0]
+        return torch.from_numpy(heatmaps).to(frames.device)
+
+
+def _onnx_export_path(model: torch.nn.Module, example_input: torch.Tensor) -> str:
+    """Exports are cached per model weights and input size, so workers export only once."""
+    digest = hashlib.sha256()
+    for name, tensor in model.state_dict().items():
+        digest.update(name.encode())
+        digest.update(tensor.detach().cpu().numpy().tobytes())
+    height, width = example_input.shape[-2:]
+    return os.path.join(config.TRACKNET_EXPORT_DIR, f"tracknet-{digest.hexdigest()[:16]}-{height}x{width}.onnx")
+
+
+def export_onnx(model: torch.nn.Module, example_input: torch.Tensor, onnx_path: str):
+    """Exports TrackNet with a dynamic batch dimension; written atomically so concurrent workers can share it."""
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".onnx", dir=os.path.dirname(onnx_path))
+    os.close(fd)
+    try:
+        batch = torch.export.Dim("batch", min=1, max=64)
+        torch.onnx.export(model, (example_input.cpu(),), tmp_path, input_names=["frames"],
+                          output_names=["heatmaps"], dynamic_shapes={"x": {0: batch}}, external_data=False)
+        os.replace(tmp_path, onnx_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    logging.info(f"Exported TrackNet to ONNX: {onnx_path}")
+
+
+def _build_onnx(model: torch.nn.Module, example_input: torch.Tensor) -> Callable:
+    onnx_path = _onnx_export_path(model, example_input)
+    if not os.path.exists(onnx_path):
+        export_onnx(model.cpu(), example_input, onnx_path)
+        model.to(config.DEVICE)
+    return OnnxTrackNet(onnx_path)
+
+
+_BUILDERS = {
+    "compile": _build_compile,
+    "torchscript": _build_torchscript,
+    "onnx": _build_onnx,
+}
+
+
+def build_backend(model: torch.nn.Module, backend: str, example_input: torch.Tensor) -> Callable:
+    """Builds the named backend from an eval-mode TrackNet; raises if it can't be built."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown TrackNet backend '{backend}', expected one of {BACKENDS}")
+    if backend == "eager":
+        return model
+    return _BUILDERS[backend](model, example_input)
+
+
+def max_heatmap_difference(reference: Callable, candidate: Callable, inputs: torch.Tensor) -> float:
+    """Largest absolute difference between the two backends' sigmoid heatmaps for the same inputs."""
+    with torch.no_grad():
+        expected = torch.sigmoid(reference(inputs)).cpu()
+        actual = torch.sigmoid(candidate(inputs)).cpu()
+    return (expected - actual).abs().max().item()
+
+
+def measure_throughput(backend: Callable, inputs: torch.Tensor, iterations: int = 10, warmup: int = 2) -> float:
+    """Forward passes of the given batch per second."""
+    with torch.no_grad():
+        for _ in range(warmup):
+            backend(inputs)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            backend(inputs)
+        elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed > 0 else float("inf")
+
+
+def example_input(batch_size: int = 1, height: int | None = None, width: int | None = None) -> torch.Tensor:
+    """A random TrackNet input, by default at the configured model size."""
+    generator = torch.Generator().manual_seed(0)
+    shape = (batch_size, 9, height or config.TRACKNET_HEIGHT, width or config.TRACKNET_WIDTH)
+    return torch.rand(shape, generator=generator).to(config.DEVICE)
+
+
+def load_backend(model: torch.nn.Module, backend: str) -> Callable:
+    """
+    Builds the configured backend and checks its heatmaps against eager mode on a random input.
+    Falls back to the eager model if the backend can't be built or differs by more than
+    TRACKNET_BACKEND_TOLERANCE, so a bad export never reaches the analysis.
+    """
+    if backend == "eager":
+        return model
+    inputs = example_input()
+    try:
+        candidate = build_backend(model, backend, inputs)
+        difference = max_heatmap_difference(model, candidate, inputs)
+    except Exception as e:
+        logging.warning(f"TrackNet backend '{backend}' unavailable, using eager mode: {e}")
+        return model
+    if difference > config.TRACKNET_BACKEND_TOLERANCE:
+        logging.warning(f"TrackNet backend '{backend}' heatmaps differ from eager mode by {difference:.2e} "
+                        f"(tolerance {config.TRACKNET_BACKEND_TOLERANCE:.0e}); using eager mode.")
+        return model
+    logging.info(f"Using TrackNet backend '{backend}' (max heatmap difference {difference:.2e}).")
+    return candidate
@@ -0,0 +1,120 @@
+import itertools
+
+import numpy as np
+
+from capstone.backend.app.core import analysis_config as config
+
+# Constant-velocity model over [cx, cy, vx, vy], one step per frame; only the center is measured.
+_TRANSITION = np.array([[1, 0, 1, 0],
+                        [0, 1, 0, 1],
+                        [0, 0, 1, 0],
+                        [0, 0, 0, 1]], dtype=np.float64)
+_OBSERVATION = np.array([[1, 0, 0, 0],
+                         [0, 1, 0, 0]], dtype=np.float64)
+
+
+class KalmanBallTrack:
+    """One ball hypothesis. Mirrors the parts of deep_sort_realtime's Track that BallTracker uses."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, center: np.ndarray, size: tuple[float, float], n_init: int, max_age: int):
+        self.track_id = next(self._ids)
+        self.mean = np.array([center[0], center[1], 0.0, 0.0])
+        self.covariance = np.diag([config.BALL_KALMAN_MEASUREMENT_NOISE**2] * 2 +
+                                  [config.BALL_KALMAN_INITIAL_VELOCITY_STD**2] * 2)
+        self.size = size
+        self.hits = 1
+        self.time_since_update = 0
+        self._n_init = n_init
+        self._max_age = max_age
+        self._confirmed = n_init <= 1
+        self._deleted = False
+
+    def predict(self):
+        process_noise = np.diag([0.25, 0.25, 1.0, 1.0]) * config.BALL_KALMAN_PROCESS_NOISE**2
+        self.mean = _TRANSITION @ self.mean
+        self.covariance = _TRANSITION @ self.covariance @ _TRANSITION.T + process_noise
+        self.time_since_update += 1
+
+    def _innovation(self, center: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        residual = center - _OBSERVATION @ self.mean
+        innovation_cov = _OBSERVATION @ self.covariance @ _OBSERVATION.T + \
+            np.eye(2) * config.BALL_KALMAN_MEASUREMENT_NOISE**2
+        return residual, innovation_cov
+
+    def gating_distance(self, center: np.ndarray) -> float:
+        """Squared Mahalanobis distance of a measured center from the predicted one."""
+        residual, innovation_cov = self._innovation(center)
+        return float(residual @ np.linalg.solve(innovation_cov, residual))
+
+    def update(self, center: np.ndarray, size: tuple[float, float]):
+        residual, innovation_cov = self._innovation(center)
+        gain = self.covariance @ _OBSERVATION.T @ np.linalg.inv(innovation_cov)
+        self.mean = self.mean + gain @ residual
+        self.covariance = (np.eye(4) - gain @ _OBSERVATION) @ self.covariance
+        self.size = size
+        self.hits += 1
+        self.time_since_update = 0
+        if not self._confirmed and self.hits >= self._n_init:
+            self._confirmed = True
+
+    def mark_missed(self):
+        if not self._confirmed or self.time_since_update > self._max_age:
+            self._deleted = True
+
+    def is_confirmed(self) -> bool:
+        return self._confirmed
+
+    def is_deleted(self) -> bool:
+        return self._deleted
+
+    def to_tlbr(self) -> np.ndarray:
+        cx, cy = self.mean[:2]
+        w, h = self.size
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+class KalmanBallTracker:
+    """
+    Lightweight alternative to DeepSORT for the single ball: a constant-velocity Kalman filter per
+    track, Mahalanobis gating and greedy nearest-first association, with DeepSORT's n_init/max_age
+    track lifecycle. Needs no appearance embeddings, so the frame passed to update_tracks is unused.
+    """
+
+    def __init__(self, max_age: int = 30, n_init: int = 3):
+        self.max_age = max_age
+        self.n_init = n_init
+        self.tracks: list[KalmanBallTrack] = []
+
+    def update_tracks(self, raw_detections: list, frame=None) -> list[KalmanBallTrack]:
+        """raw_detections: ([left, top, width, height], confidence, class) tuples, as for DeepSort.update_tracks."""
+        for track in self.tracks:
+            track.predict()
+
+        detections = [(np.array([left + width / 2, top + height / 2]), (width, height))
+                      for (left, top, width, height), _, _ in raw_detections]
+
+        candidates = sorted(
+            (distance, track_index, detection_index)
+            for track_index, track in enumerate(self.tracks)
+            for detection_index, (center, _) in enumerate(detections)
+            if (distance := track.gating_distance(center)) <= config.BALL_KALMAN_GATE
+        )
+        matched_tracks, matched_detections = set(), set()
+        for _, track_index, detection_index in candidates:
+            if track_index in matched_tracks or detection_index in matched_detections:
+                continue
+            self.tracks[track_index].update(*detections[detection_index])
+            matched_tracks.add(track_index)
+            matched_detections.add(detection_index)
+
+        for track_index, track in enumerate(self.tracks):
+            if track_index not in matched_tracks:
+                track.mark_missed()
+        for detection_index, (center, size) in enumerate(detections):
+            if detection_index not in matched_detections:
+                self.tracks.append(KalmanBallTrack(center, size, self.n_init, self.max_age))
+
+        self.tracks = [track for track in self.tracks if not track.is_deleted()]
+        return self.tracks
@@ -0,0 +1,147 @@
+import copy
+import logging
+from typing import Iterable
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+from torch.utils.data import DataLoader, Subset
+import torchvision.transforms as transforms
+
+from capstone.backend.ai.ball_tracker.track_net import TrackNetV4
+from capstone.backend.ai.ball_tracker.train.dataset.track_net_dataset import TrackNetDataset
+from capstone.backend.app.core import analysis_config as config
+
+
+class _EncoderDecoder(nn.Module):
+    """The convolutional part of TrackNetV4, which is what gets quantised."""
+
+    def __init__(self, encoder: nn.Module, decoder: nn.Module):
+        super().__init__()
+        self.encoder = encoder
+        self.decoder = decoder
+
+    def forward(self, x):
+        bottleneck, skip_connections = self.encoder(x)
+        return self.decoder(bottleneck, skip_connections)
+
+
+class QuantizedTrackNetV4(nn.Module):
+    """
+    TrackNetV4 with a static INT8 encoder/decoder. The motion attention maps (power normalisation and
+    min/max scaling) and the fusion stay in FP32. Quantised kernels run on the CPU only.
+    """
+
+    def __init__(self, encoder_decoder: nn.Module, theta: torch.Tensor):
+        super().__init__()
+        self.encoder_decoder = encoder_decoder
+        self.theta = nn.Parameter(theta.detach().clone().cpu())
+
+    generate_motion_attention_maps = TrackNetV4.generate_motion_attention_maps
+
+    def forward(self, x):
+        device = x.device
+        x = x.cpu()
+        motion_maps = self.generate_motion_attention_maps(x)
+        visual_features = self.encoder_decoder(x)
+        return TrackNetV4.fuse_motion(visual_features, motion_maps).to(device)
+
+
+def _set_engine():
+    engine = config.TRACKNET_QUANTIZATION_ENGINE
+    if engine not in torch.backends.quantized.supported_engines:
+        raise RuntimeError(f"Quantization engine '{engine}' is not supported on this machine "
+                           f"(supported: {torch.backends.quantized.supported_engines})")
+    torch.backends.quantized.engine = engine
+
+
+def _prepare(model: TrackNetV4, example_input: torch.Tensor) -> nn.Module:
+    _set_engine()
+    encoder_decoder = _EncoderDecoder(copy.deepcopy(model.encoder), copy.deepcopy(model.decoder)).cpu().eval()
+    # The default mapping fuses each conv with its ReLU before observing.
+    qconfig_mapping = get_default_qconfig_mapping(config.TRACKNET_QUANTIZATION_ENGINE)
+    return prepare_fx(encoder_decoder, qconfig_mapping, (example_input.cpu(),))
+
+
+def quantize_tracknet(model: TrackNetV4, calibration_batches: Iterable[torch.Tensor]) -> QuantizedTrackNetV4:
+    """Post-training static quantisation: observes activation ranges on the calibration batches, then converts."""
+    batches = iter(calibration_batches)
+    first_batch = next(batches)
+    prepared = _prepare(model, first_batch)
+    num_batches = 0
+    with torch.no_grad():
+        for batch in [first_batch, *batches]:
+            prepared(batch.cpu())
+            num_batches += 1
+    logging.info(f"Calibrated TrackNet quantisation on {num_batches} batches.")
+    return QuantizedTrackNetV4(convert_fx(prepared), model.theta).eval()
+
+
+def load_quantized_tracknet(weights_path: str) -> QuantizedTrackNetV4:
+    """Rebuilds the quantised structure and loads the weights, scales and zero points saved by quantize.py."""
+    template = TrackNetV4().eval()
+    example_input = torch.zeros((1, 9, config.TRACKNET_HEIGHT, config.TRACKNET_WIDTH))
+    model = QuantizedTrackNetV4(convert_fx(_prepare(template, example_input)), template.theta)
+    model.load_state_dict(torch.load(weights_path, map_location="cpu", weights_only=True))
+    return model.eval()
+
+
+def calibration_loader(dataset_dir: str, num_samples: int, batch_size: int = 1, offset: int = 0) -> DataLoader:
+    """
+    Frames from TrackNetDataset, preprocessed like the live input (RGB scaled to [0, 1], no mean/std
+    normalisation) at the model size. offset skips samples, e.g. to evaluate on frames not used for calibration.
+    """
+    transform = transforms.Compose([
+        transforms.Resize((config.TRACKNET_HEIGHT, config.TRACKNET_WIDTH)),
+        transforms.ToTensor(),
+    ])
+    dataset = TrackNetDataset(dataset_dir, target_size=(config.TRACKNET_HEIGHT, config.TRACKNET_WIDTH),
+                              transform=transform)
+    indices = range(offset, min(offset + num_samples, len(dataset)))
+    return DataLoader(Subset(dataset, indices), batch_size=batch_size, shuffle=False)
+
+
+def _peaks(heatmap_logits: torch.Tensor) -> tuple[np.ndarray, np.ndarray]:
+    """Per (sample, channel): the peak (y, x) and its sigmoid confidence."""
+    heatmaps = torch.sigmoid(heatmap_logits.cpu())
+    flat = heatmaps.flatten(2)
+    confidence, index = flat.max(dim=2)
+    width = heatmaps.shape[-1]
+    coords = torch.stack([index // width, index % width], dim=-1)
+    return coords.numpy(), confidence.numpy()
+
+
+def compare_peaks(reference: nn.Module, candidate: nn.Module, batches: Iterable[torch.Tensor]) -> dict:
+    """
+    Ball-peak localisation of the candidate against the reference model. A heatmap counts as a
+    detection when its peak reaches BALL_DETECTION_THRESHOLD; peak errors (model pixels) are measured
+    where both models detect the ball.
+    """
+    errors, agreements = [], []
+    with torch.no_grad():
+        for batch in batches:
+            reference_coords, reference_conf = _peaks(reference(batch))
+            candidate_coords, candidate_conf = _peaks(candidate(batch))
+            reference_hit = reference_conf >= config.BALL_DETECTION_THRESHOLD
+            candidate_hit = candidate_conf >= config.BALL_DETECTION_THRESHOLD
+            agreements.append((reference_hit == candidate_hit).ravel())
+            both = reference_hit & candidate_hit
+            errors.append(np.linalg.norm(reference_coords[both] - candidate_coords[both], axis=-1))
+
+    errors = np.concatenate(errors) if errors else np.zeros(0)
+    agreements = np.concatenate(agreements) if agreements else np.zeros(0, dtype=bool)
+    return {
+        "heatmaps": int(agreements.size),
+        "detections_compared": int(errors.size),
+        "detection_agreement": float(agreements.mean()) if agreements.size else 1.0,
+        "mean_peak_error_px": float(errors.mean()) if errors.size else 0.0,
+        "p95_peak_error_px": float(np.percentile(errors, 95)) if errors.size else 0.0,
+        "max_peak_error_px": float(errors.max()) if errors.size else 0.0,
+    }
+
+
+def passes_accuracy_gate(report: dict) -> bool:
+    return (report["mean_peak_error_px"] <= config.TRACKNET_QUANTIZATION_MAX_MEAN_PEAK_ERROR_PX
+            and report["detection_agreement"] >= config.TRACKNET_QUANTIZATION_MIN_DETECTION_AGREEMENT)
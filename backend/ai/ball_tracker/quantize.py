@@ -0,0 +1,58 @@
+import argparse
+import json
+import logging
+import sys
+
+import torch
+
+from capstone.backend.ai.ball_tracker import inference_backends, quantization
+from capstone.backend.ai.ball_tracker.track_net import TrackNetV4
+from capstone.backend.app.core import analysis_config as config
+
+
+def main():
+    """
+    Quantises the FP32 TrackNet to INT8, calibrating on TrackNetDataset frames, and reports ball-peak
+    localisation against FP32 on held-out frames. The model is only saved if it passes the accuracy gate.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--dataset-dir", required=True, help="TrackNetDataset root (frame* folders)")
+    parser.add_argument("--calibration-samples", type=int, default=64)
+    parser.add_argument("--eval-samples", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--output", default=config.TRACKNET_QUANTIZED_MODEL_PATH)
+    parser.add_argument("--force", action="store_true", help="Save even if the accuracy gate fails")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=config.LOG_FORMAT)
+
+    model = TrackNetV4()
+    model.load_state_dict(torch.load(config.TRACKNET_MODEL_PATH, map_location="cpu", weights_only=True))
+    model.eval()
+
+    calibration = quantization.calibration_loader(args.dataset_dir, args.calibration_samples, args.batch_size)
+    quantized = quantization.quantize_tracknet(model, (images for images, _ in calibration))
+
+    # Evaluate on the frames after the calibration set
+    evaluation = quantization.calibration_loader(args.dataset_dir, args.eval_samples, args.batch_size,
+                                                 offset=args.calibration_samples)
+    report = quantization.compare_peaks(model, quantized, (images for images, _ in evaluation))
+    inputs = inference_backends.example_input(1).cpu()
+    fp32_rate = inference_backends.measure_throughput(model.cpu(), inputs)
+    int8_rate = inference_backends.measure_throughput(quantized, inputs)
+    report.update({"fp32_windows_per_s": round(fp32_rate, 2), "int8_windows_per_s": round(int8_rate, 2),
+                   "speed_up": round(int8_rate / fp32_rate, 2)})
+    passed = quantization.passes_accuracy_gate(report)
+    report["accuracy_gate_passed"] = passed
+    print(json.dumps(report, indent=2))
+
+    if not passed and not args.force:
+        logging.error("Quantized model failed the accuracy gate; not saved.")
+        return 1
+    torch.save(quantized.state_dict(), args.output)
+    logging.info(f"Quantized TrackNet saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -132,6 +132,38 @@ class TrackNetV4(nn.Module):
 
         return motion_maps  # (batch, 2, H, W) - 2 motion maps
 
+    @torch.no_grad()
+    def infer(self, x, channels=(0, 1, 2)):
+        """
+        Inference-only forward: returns just the requested heatmap channels (batch, len(channels), H, W),
+        identical to forward(x)[:, channels]. Both motion maps are built in a single buffer, normalised
+        and multiplied into the selected channels in place, and skipped entirely when only channel 0
+        is requested. The decoder still computes all three channels: its last layer is a cheap 1x1
+        conv, and computing a single output channel would change the floating-point results.
+        """
+        channels = list(channels)
+        visual_features = self.decoder(*self.encoder(x))
+        heatmaps = visual_features if channels == [0, 1, 2] else visual_features[:, channels]
+        if not any(channels):
+            return heatmaps
+
+        batch_size, _, h, w = x.shape
+        gray = x.reshape(batch_size, 3, 3, h, w).mean(dim=2)  # (batch, 3, H, W), one map per frame
+        motion_maps = torch.sub(gray[:, 1:], gray[:, :2]).abs_().pow_(self.theta)
+        del gray
+        low, high = torch.aminmax(motion_maps)
+        motion_maps.sub_(low).div_(high - low + 1e-6)
+        for i, channel in enumerate(channels):
+            if channel:
+                heatmaps[:, i].mul_(motion_maps[:, channel - 1])
+        return heatmaps
+
+    @staticmethod
+    def fuse_motion(visual_features, motion_maps):
+        # Motion-aware fusion. First frame unchanged; the second and third are weighted by their
+        # motion maps. Built with cat rather than slice assignment so the graph exports cleanly.
+        return torch.cat([visual_features[:, 0:1], visual_features[:, 1:3] * motion_maps], dim=1)
+
     def forward(self, x):
         # x: (batch, 9, H, W) - 3 frames stacked
         # Step 1: Generate motion attention maps
@@ -142,9 +174,4 @@ class TrackNetV4(nn.Module):
         visual_features = self.decoder(bottleneck, skip_connections)  # (batch, 3, H, W)
 
         # Step 3: Motion-aware fusion
-        fused_features = torch.zeros_like(visual_features)
-        fused_features[:, 0, :, :] = visual_features[:, 0, :, :]  # First frame unchanged
-        fused_features[:, 1, :, :] = visual_features[:, 1, :, :] * motion_maps[:, 0, :, :]  # Second frame
-        fused_features[:, 2, :, :] = visual_features[:, 2, :, :] * motion_maps[:, 1, :, :]  # Third frame
-
-        return fused_features
\ No newline at end of file
+        return self.fuse_motion(visual_features, motion_maps)
\ No newline at end of file
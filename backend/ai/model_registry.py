@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+
+import numpy as np
+import torch
+
+from capstone.backend.ai.ball_tracker import inference_backends
+from capstone.backend.app.core import analysis_config as config
+
+# Process-wide cache of loaded networks. Every analysis in a worker process shares these; per-video
+# objects (PlayerTracker, BallTracker) only carry tracker state.
+_models = {}
+_lock = threading.Lock()
+
+
+def _get_or_load(key: str, loader):
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        if key not in _models:
+            _models[key] = loader()
+        return _models[key]
+
+
+def clear():
+    """Drops all cached models, e.g. after the weight files were replaced."""
+    with _lock:
+        _models.clear()
+
+
+def _load_yolo_model():
+    from ultralytics import YOLO
+
+    if not os.path.exists(config.YOLO_MODEL_PATH):
+        logging.error(f"YOLO model not found at: {config.YOLO_MODEL_PATH}")
+        raise FileNotFoundError(f"YOLO model not found: {config.YOLO_MODEL_PATH}")
+    try:
+        model = YOLO(config.YOLO_MODEL_PATH)
+        logging.info(f"YOLO model loaded from {config.YOLO_MODEL_PATH}")
+    except Exception as e:
+        logging.error(f"Error loading YOLO model: {e}", exc_info=True)
+        raise
+
+    try:
+        warmup_frame = np.zeros((config.MODEL_WARMUP_SIZE, config.MODEL_WARMUP_SIZE, 3), dtype=np.uint8)
+        model.predict(warmup_frame, verbose=False)
+    except Exception as e:
+        logging.warning(f"YOLO warm-up inference failed: {e}")
+    return model
+
+
+def _load_quantized_tracknet_model():
+    """The INT8 TrackNet, or None (with a warning) when it can't be used and FP32 should be loaded instead."""
+    from capstone.backend.ai.ball_tracker.quantization import load_quantized_tracknet
+
+    if not os.path.exists(config.TRACKNET_QUANTIZED_MODEL_PATH):
+        logging.warning(f"Quantized TrackNet not found at {config.TRACKNET_QUANTIZED_MODEL_PATH}; using FP32.")
+        return None
+    try:
+        model = load_quantized_tracknet(config.TRACKNET_QUANTIZED_MODEL_PATH)
+        with torch.no_grad():
+            model(torch.zeros((1, 9, config.TRACKNET_HEIGHT, config.TRACKNET_WIDTH), device=config.DEVICE))
+    except Exception as e:
+        logging.warning(f"Failed to load quantized TrackNet, using FP32: {e}", exc_info=True)
+        return None
+    logging.info(f"Quantized TrackNet model loaded from {config.TRACKNET_QUANTIZED_MODEL_PATH}.")
+    return model
+
+
+def _load_tracknet_model():
+    from capstone.backend.ai.ball_tracker.track_net import TrackNetV4
+
+    if config.TRACKNET_USE_QUANTIZED:
+        # The INT8 model runs as is; TRACKNET_BACKEND only applies to the FP32 network.
+        model = _load_quantized_tracknet_model()
+        if model is not None:
+            return model
+
+    if not os.path.exists(config.TRACKNET_MODEL_PATH):
+        logging.error(f"TrackNet model not found at: {config.TRACKNET_MODEL_PATH}")
+        raise FileNotFoundError(f"TrackNet model not found: {config.TRACKNET_MODEL_PATH}")
+    try:
+        model = TrackNetV4().to(config.DEVICE)
+        # Use map_location for flexibility
+        state_dict = torch.load(config.TRACKNET_MODEL_PATH, map_location=config.DEVICE, weights_only=True)
+        model.load_state_dict(state_dict)
+        model.eval()
+        logging.info(f"TrackNet model loaded from {config.TRACKNET_MODEL_PATH} and set to eval mode.")
+    except ImportError as imp_err:
+        logging.error(f"Import error loading TrackNet model (check TrackNetV4 source/dependencies): {imp_err}")
+        raise
+    except Exception as e:
+        logging.error(f"Error loading TrackNet model: {e}", exc_info=True)
+        raise
+
+    try:
+        with torch.no_grad():
+            model(torch.zeros((1, 9, config.TRACKNET_HEIGHT, config.TRACKNET_WIDTH), device=config.DEVICE))
+    except Exception as e:
+        logging.warning(f"TrackNet warm-up inference failed: {e}")
+    return inference_backends.load_backend(model, config.TRACKNET_BACKEND)
+
+
+def _load_deepsort_embedder():
+    from deep_sort_realtime.embedder.embedder_pytorch import MobileNetv2_Embedder
+
+    # Same settings DeepSort uses for its built-in "mobilenet" embedder.
+    embedder = MobileNetv2_Embedder(half=True, max_batch_size=16, bgr=True, gpu=True)
+    logging.info("DeepSORT appearance embedder loaded.")
+    try:
+        embedder.predict([np.zeros((config.BALL_BOX_SIZE_MODEL, config.BALL_BOX_SIZE_MODEL, 3), dtype=np.uint8)])
+    except Exception as e:
+        logging.warning(f"DeepSORT embedder warm-up failed: {e}")
+    return embedder
+
+
+def get_yolo_model():
+    return _get_or_load("yolo", _load_yolo_model)
+
+
+def get_tracknet_model():
+    return _get_or_load("tracknet", _load_tracknet_model)
+
+
+def get_deepsort_embedder():
+    return _get_or_load("deepsort_embedder", _load_deepsort_embedder)
+
+
+def warm_up():
+    """Loads and warms up every analysis model, e.g. when an analysis worker process starts."""
+    get_yolo_model()
+    get_tracknet_model()
+    if config.BALL_TRACKER_BACKEND != "kalman":
+        get_deepsort_embedder()
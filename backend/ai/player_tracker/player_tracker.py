@@ -1,28 +1,33 @@
 import logging
-import os
-from ultralytics import YOLO
 import numpy as np
 
 # Assuming analysis_config is accessible
 from capstone.backend.app.core import analysis_config as config
 from capstone.backend.app.utils import video_utils
+from capstone.backend.ai import model_registry
 
 class PlayerTracker:
-    def __init__(self):
-        self.model = self._load_model()
+    def __init__(self, analysis_scale: float = 1.0):
+        # Frame size relative to the source video, for the source-pixel thresholds of color extraction
+        self.analysis_scale = analysis_scale
+        # The YOLO network is shared per process via the model registry; only tracker state is per video.
+        self.model = model_registry.get_yolo_model()
+        self._reset_tracker_state()
         self.player_class_index = self._get_player_class_index()
+        # Detection-stride state: {track_id: (last detected box [x1, y1, x2, y2], velocity per frame)} as float arrays.
+        # Propagated boxes are derived from the detected box and never written back, so velocity is always
+        # measured between two detections.
+        self.track_motion = {}
+        self.frames_since_detection = 0
+        self.last_detection_confidence = 1.0
+        # Standalone track association for batched detection, created on first use
+        self.association_tracker = None
 
-    def _load_model(self):
-        if not os.path.exists(config.YOLO_MODEL_PATH):
-            logging.error(f"YOLO model not found at: {config.YOLO_MODEL_PATH}")
-            raise FileNotFoundError(f"YOLO model not found: {config.YOLO_MODEL_PATH}")
-        try:
-            model = YOLO(config.YOLO_MODEL_PATH)
-            logging.info(f"YOLO model loaded from {config.YOLO_MODEL_PATH}")
-            return model
-        except Exception as e:
-            logging.error(f"Error loading YOLO model: {e}", exc_info=True)
-            raise
+    def _reset_tracker_state(self):
+        """Clears Ultralytics' tracker state left on the shared model by a previous video."""
+        predictor = getattr(self.model, "predictor", None)
+        for tracker in getattr(predictor, "trackers", None) or []:
+            tracker.reset()
 
     def _get_player_class_index(self):
         if not self.model or not hasattr(self.model, 'names'):
@@ -39,18 +44,16 @@ class PlayerTracker:
              logging.error(f"Error accessing model names: {e}")
              return -1
 
-    def track_players(self, frame: np.ndarray) -> tuple[dict, list, list, list]:
-        """Tracks players in a frame and extracts features."""
-        current_player_boxes = {} # {track_id: [x1, y1, x2, y2]}
-        current_player_features_lab = []
-        current_player_track_ids = []
-        current_player_bboxes = []
-
-        if not self.model or self.player_class_index == -1:
-            return current_player_boxes, current_player_features_lab, current_player_track_ids, current_player_bboxes
+    def _should_detect(self) -> bool:
+        return (config.PLAYER_DETECTION_STRIDE <= 1
+                or not self.track_motion
+                or self.frames_since_detection >= config.PLAYER_DETECTION_STRIDE - 1
+                or self.last_detection_confidence < config.PLAYER_REDETECT_CONFIDENCE)
 
+    def _detect_players(self, frame: np.ndarray) -> dict:
+        """Runs YOLO tracking on the frame and returns {track_id: [x1, y1, x2, y2]}."""
+        current_player_boxes = {}
         track_classes = [self.player_class_index]
-        yolo_results = None
         try:
             yolo_results = self.model.track(frame, persist=True, verbose=False,
                                             conf=config.PLAYER_CONFIDENCE_THRESHOLD,
@@ -58,12 +61,14 @@ class PlayerTracker:
                                             classes=track_classes)
         except Exception as track_err:
             logging.error(f"Error during YOLO track: {track_err}")
-            return current_player_boxes, current_player_features_lab, current_player_track_ids, current_player_bboxes # Return empty
+            return current_player_boxes
 
         if yolo_results and len(yolo_results) > 0 and yolo_results[0].boxes is not None and yolo_results[0].boxes.id is not None:
             try:
                 boxes_xyxy = yolo_results[0].boxes.xyxy.cpu().numpy()
                 track_ids = yolo_results[0].boxes.id.cpu().numpy().astype(int)
+                confidences = yolo_results[0].boxes.conf.cpu().numpy()
+                self.last_detection_confidence = float(confidences.mean()) if len(confidences) else 0.0
 
                 for i, box in enumerate(boxes_xyxy):
                     track_id = -1
@@ -73,13 +78,6 @@ class PlayerTracker:
                         if x1 >= x2 or y1 >= y2: continue # Skip invalid box
 
                         current_player_boxes[track_id] = [x1, y1, x2, y2]
-                        player_crop = frame[y1:y2, x1:x2]
-                        dom_lab = video_utils.get_dominant_color_lab_team(player_crop)
-
-                        if dom_lab is not None:
-                            current_player_features_lab.append(dom_lab)
-                            current_player_track_ids.append(track_id)
-                            current_player_bboxes.append((x1, y1, x2, y2))
                     except (IndexError, ValueError) as box_err:
                         logging.warning(f"Error processing player box {i} (Track ID {track_id if track_id !=-1 else 'N/A'}): {box_err}")
                         continue
@@ -87,5 +85,158 @@ class PlayerTracker:
                 logging.warning(f"Attribute error processing YOLO tracking results: {attr_err}.")
             except Exception as proc_err:
                 logging.warning(f"Error processing YOLO tracking results: {proc_err}")
+        else:
+            self.last_detection_confidence = 0.0
+
+        return current_player_boxes
+
+    def _update_motion(self, detected_boxes: dict, frames_elapsed: int):
+        """Refreshes the per-track motion model from a new detection, frames_elapsed after the previous one."""
+        smoothing = config.PLAYER_VELOCITY_SMOOTHING
+        track_motion = {}
+        for track_id, box in detected_boxes.items():
+            box = np.asarray(box, dtype=np.float64)
+            velocity = np.zeros(4)
+            previous = self.track_motion.get(track_id)
+            if previous is not None:
+                previous_box, previous_velocity = previous
+                measured = (box - previous_box) / max(1, frames_elapsed)
+                velocity = smoothing * measured + (1 - smoothing) * previous_velocity
+            track_motion[track_id] = (box, velocity)
+        self.track_motion = track_motion
+
+    def _propagate_players(self, frame: np.ndarray) -> dict:
+        """Moves every last detected box on by its velocity times the frames since that detection."""
+        frame_height, frame_width = frame.shape[:2]
+        limits = np.array([frame_width, frame_height, frame_width, frame_height], dtype=np.float64)
+        current_player_boxes = {}
+        for track_id, (detected_box, velocity) in self.track_motion.items():
+            box = np.clip(detected_box + velocity * self.frames_since_detection, 0, limits)
+            x1, y1, x2, y2 = map(int, box)
+            if x1 < x2 and y1 < y2:
+                current_player_boxes[track_id] = [x1, y1, x2, y2]
+        return current_player_boxes
+
+    def _create_association_tracker(self):
+        """Builds the same Ultralytics tracker model.track would use, but driven by our own detections."""
+        import yaml
+        from ultralytics.trackers.track import TRACKER_MAP
+        from ultralytics.utils import IterableSimpleNamespace
+        from ultralytics.utils.checks import check_yaml
+
+        with open(check_yaml(config.PLAYER_TRACKER_CONFIG)) as f:
+            tracker_cfg = IterableSimpleNamespace(**yaml.safe_load(f))
+        tracker_cfg.device = config.DEVICE
+        if tracker_cfg.tracker_type not in TRACKER_MAP:
+            raise ValueError(f"Unsupported tracker type '{tracker_cfg.tracker_type}' in {config.PLAYER_TRACKER_CONFIG}")
+        return TRACKER_MAP[tracker_cfg.tracker_type](args=tracker_cfg)
+
+    def _predict_players(self, frames: list) -> list:
+        """Runs YOLO detection (no tracking) on a batch of frames in one call."""
+        return self.model.predict(frames, verbose=False,
+                                  conf=config.PLAYER_CONFIDENCE_THRESHOLD,
+                                  iou=config.PLAYER_IOU_THRESHOLD,
+                                  classes=[self.player_class_index])
+
+    def _associate_players(self, detection_result, frame: np.ndarray) -> dict:
+        """Feeds one frame's detections to the association tracker and returns {track_id: [x1, y1, x2, y2]}."""
+        current_player_boxes = {}
+        if self.association_tracker is None:
+            self.association_tracker = self._create_association_tracker()
+        detections = detection_result.boxes.cpu().numpy()
+        self.last_detection_confidence = float(detections.conf.mean()) if len(detections) else 0.0
+
+        tracks = self.association_tracker.update(detections, frame)
+        for track in tracks:
+            try:
+                x1, y1, x2, y2 = map(int, track[:4])
+                track_id = int(track[4])
+                if x1 >= x2 or y1 >= y2: continue # Skip invalid box
+                current_player_boxes[track_id] = [x1, y1, x2, y2]
+            except (IndexError, ValueError) as box_err:
+                logging.warning(f"Error processing associated player track {track}: {box_err}")
+        return current_player_boxes
+
+    def _boxes_for_frame(self, frame: np.ndarray, detected_boxes: dict | None) -> dict:
+        """Uses a fresh detection when given, otherwise propagates the previous boxes."""
+        if detected_boxes is not None:
+            if config.PLAYER_DETECTION_STRIDE > 1:
+                self._update_motion(detected_boxes, self.frames_since_detection + 1)
+            self.frames_since_detection = 0
+            return detected_boxes
+        self.frames_since_detection += 1
+        return self._propagate_players(frame)
 
-        return current_player_boxes, current_player_features_lab, current_player_track_ids, current_player_bboxes
\ No newline at end of file
+    def _player_features(self, frame: np.ndarray, current_player_boxes: dict) -> tuple[dict, list, list, list]:
+        current_player_features_lab = []
+        current_player_track_ids = []
+        current_player_bboxes = []
+        if not current_player_boxes:
+            return current_player_boxes, current_player_features_lab, current_player_track_ids, current_player_bboxes
+
+        try:
+            valid_track_ids = list(current_player_boxes.keys())
+            valid_boxes = [tuple(current_player_boxes[track_id]) for track_id in valid_track_ids]
+
+            # One color extraction call for all players in the frame
+            colors_lab, has_color = video_utils.get_dominant_colors_lab_team(frame, valid_boxes, self.analysis_scale)
+            for j in np.flatnonzero(has_color):
+                current_player_features_lab.append(colors_lab[j])
+                current_player_track_ids.append(valid_track_ids[j])
+                current_player_bboxes.append(valid_boxes[j])
+        except Exception as proc_err:
+            logging.warning(f"Error extracting player colors: {proc_err}")
+
+        return current_player_boxes, current_player_features_lab, current_player_track_ids, current_player_bboxes
+
+    def track_players(self, frame: np.ndarray) -> tuple[dict, list, list, list]:
+        """
+        Tracks players in a frame and extracts features. With PLAYER_DETECTION_STRIDE > 1, YOLO only runs
+        every N frames (or sooner if its confidence dropped) and boxes are propagated in between.
+        """
+        if not self.model or self.player_class_index == -1:
+            return {}, [], [], []
+
+        detected_boxes = self._detect_players(frame) if self._should_detect() else None
+        return self._player_features(frame, self._boxes_for_frame(frame, detected_boxes))
+
+    def track_players_batch(self, frames: list) -> list[tuple[dict, list, list, list]]:
+        """
+        Tracks players in consecutive frames. With PLAYER_DETECTION_BATCH_SIZE > 1, all frames that need
+        detection are sent to YOLO predict in one batch, and the detections are then associated frame by
+        frame with a standalone tracker (same config as model.track), so track ids keep their meaning.
+        """
+        if config.PLAYER_DETECTION_BATCH_SIZE <= 1:
+            return [self.track_players(frame) for frame in frames]
+        if not self.model or self.player_class_index == -1:
+            return [({}, [], [], []) for _ in frames]
+
+        # Plan which frames run the detector; a confidence drop inside the batch takes effect from the next batch.
+        detect_plan = []
+        frames_since_detection = self.frames_since_detection
+        should_detect = self._should_detect()
+        for _ in frames:
+            detect_plan.append(should_detect)
+            frames_since_detection = 0 if should_detect else frames_since_detection + 1
+            should_detect = config.PLAYER_DETECTION_STRIDE <= 1 or frames_since_detection >= config.PLAYER_DETECTION_STRIDE - 1
+
+        detection_results = []
+        try:
+            detection_results = self._predict_players([frame for frame, detect in zip(frames, detect_plan) if detect])
+        except Exception as predict_err:
+            logging.error(f"Error during batched YOLO predict: {predict_err}")
+        detection_results = iter(detection_results)
+
+        outputs = []
+        for frame, detect in zip(frames, detect_plan):
+            detected_boxes = None
+            if detect:
+                detected_boxes = {}
+                detection_result = next(detection_results, None)
+                if detection_result is not None:
+                    try:
+                        detected_boxes = self._associate_players(detection_result, frame)
+                    except Exception as assoc_err:
+                        logging.warning(f"Error associating player detections: {assoc_err}")
+            outputs.append(self._player_features(frame, self._boxes_for_frame(frame, detected_boxes)))
+        return outputs
@@ -1,13 +1,9 @@
 import logging
 import numpy as np
-import cv2
 from sklearn.cluster import KMeans
 
 
 from capstone.backend.app.core import analysis_config as config
-from capstone.backend.app.utils import video_utils
-
-from capstone.backend.ai.player_tracker.player_tracker import PlayerTracker
 
 
 class TeamIdentifier:
@@ -15,29 +11,27 @@ class TeamIdentifier:
         self.reference_team_colors_lab = [None, None]
         self.teams_initialized = False
         self.kmeans_ref = KMeans(n_clusters=2, n_init=10, random_state=0)
-        self.kmeans_frame = KMeans(n_clusters=2, n_init=10, random_state=42)
-
-    def initialize_teams(self, video_path: str, player_tracker: PlayerTracker):
-        """Performs initial clustering to find reference team colors."""
-        logging.info("Starting team color clustering phase...")
-        cap_cluster = cv2.VideoCapture(video_path)
-        if not cap_cluster.isOpened():
-            logging.error(f"Failed to open video for team clustering: {video_path}")
-            return
-
-        cluster_frame_count = 0
-        player_colors_lab_samples = []
-
-        while cap_cluster.isOpened() and cluster_frame_count < config.INITIALIZATION_FRAMES:
-            ret, frame = cap_cluster.read()
-            if not ret: break
-            cluster_frame_count += 1
-
-            _, features, _, _ = player_tracker.track_players(frame)
-            if features:
-                 player_colors_lab_samples.extend(features)
-
-        cap_cluster.release()
+        # {track_id: {'score', 'team', 'last_checked', 'last_seen'}}; score > 0 votes for team index 1
+        self.track_teams = {}
+        self.frames_assigned = 0
+
+    def get_state(self) -> dict:
+        """JSON-serialisable reference colors for checkpointing; per-track votes are rebuilt after a resume."""
+        return {
+            "teams_initialized": self.teams_initialized,
+            "reference_team_colors_lab": [None if color is None else np.asarray(color, dtype=float).tolist()
+                                          for color in self.reference_team_colors_lab],
+        }
+
+    def load_state(self, state: dict):
+        """Restores the reference colors from get_state, so team indices keep their meaning."""
+        self.reference_team_colors_lab = [None if color is None else np.asarray(color, dtype=float)
+                                          for color in state["reference_team_colors_lab"]]
+        self.teams_initialized = state["teams_initialized"] and all(c is not None for c in self.reference_team_colors_lab)
+        self.track_teams = {}
+
+    def initialize_from_samples(self, player_colors_lab_samples: list) -> bool:
+        """Clusters collected player colors (LAB) into the two reference team colors."""
         logging.info(f"Clustering: Gathered {len(player_colors_lab_samples)} samples.")
 
         if len(player_colors_lab_samples) >= config.TEAM_CLUSTERING_MIN_SAMPLES:
@@ -71,38 +65,64 @@ class TeamIdentifier:
             logging.warning("Not enough color samples for clustering. Team assignment disabled.")
             self.teams_initialized = False
 
+        return self.teams_initialized
+
+
+    def _evict_stale_tracks(self):
+        stale = [track_id for track_id, entry in self.track_teams.items()
+                 if self.frames_assigned - entry['last_seen'] > config.TEAM_CACHE_MAX_AGE_FRAMES]
+        for track_id in stale:
+            del self.track_teams[track_id]
 
     def assign_teams_for_frame(self, player_features_lab: list, player_track_ids: list) -> dict:
-        """Assigns team indices (0 or 1) to players based on features for the current frame."""
+        """
+        Assigns team indices (0 or 1) to players for the current frame. Each player votes for the nearest
+        reference color; votes are smoothed per track with exponential decay, and tracks whose team is
+        stable are only re-checked every TEAM_RECHECK_INTERVAL_FRAMES frames.
+        """
+        self.frames_assigned += 1
+        frame = self.frames_assigned
+        if frame % config.TEAM_CACHE_MAX_AGE_FRAMES == 0:
+            self._evict_stale_tracks()
+
         current_frame_player_teams = {}
-        if not self.teams_initialized or len(player_features_lab) < 2:
+        if not self.teams_initialized or len(player_features_lab) == 0:
             return current_frame_player_teams
 
-        features = np.array(player_features_lab)
-        try:
-            self.kmeans_frame.fit(features)
-            current_labels = self.kmeans_frame.labels_
-            current_centers = self.kmeans_frame.cluster_centers_
-
-            # Match current centers to reference centers
-            dist0_ref0 = np.linalg.norm(current_centers[0] - self.reference_team_colors_lab[0])
-            dist0_ref1 = np.linalg.norm(current_centers[0] - self.reference_team_colors_lab[1])
-            dist1_ref0 = np.linalg.norm(current_centers[1] - self.reference_team_colors_lab[0])
-            dist1_ref1 = np.linalg.norm(current_centers[1] - self.reference_team_colors_lab[1])
-
-            # Determine mapping: map current cluster index (0 or 1) to reference team index (0 or 1)
-            if (dist0_ref0 + dist1_ref1) <= (dist0_ref1 + dist1_ref0):
-                map_kmeans_to_team = {0: 0, 1: 1}
+        to_check = []
+        for i, track_id in enumerate(player_track_ids):
+            entry = self.track_teams.get(track_id)
+            if entry is not None and abs(entry['score']) >= config.TEAM_LOCK_SCORE and \
+               frame - entry['last_checked'] < config.TEAM_RECHECK_INTERVAL_FRAMES:
+                entry['last_seen'] = frame
+                current_frame_player_teams[track_id] = entry['team']
             else:
-                map_kmeans_to_team = {0: 1, 1: 0}
+                to_check.append(i)
+
+        if not to_check:
+            return current_frame_player_teams
+
+        try:
+            features = np.asarray([player_features_lab[i] for i in to_check], dtype=np.float64)
+            references = np.asarray(self.reference_team_colors_lab, dtype=np.float64)
+            distances = np.linalg.norm(features[:, None, :] - references[None, :, :], axis=2)
+            votes = np.where(distances[:, 1] < distances[:, 0], 1.0, -1.0)
 
-            # Apply mapping
-            for i, k_label in enumerate(current_labels):
+            for i, vote in zip(to_check, votes):
                 track_id = player_track_ids[i]
-                current_frame_player_teams[track_id] = map_kmeans_to_team[k_label]
+                entry = self.track_teams.get(track_id)
+                if entry is None:
+                    entry = {'score': 0.0, 'team': -1, 'last_checked': frame, 'last_seen': frame}
+                    self.track_teams[track_id] = entry
+                entry['score'] = config.TEAM_VOTE_DECAY * entry['score'] + (1 - config.TEAM_VOTE_DECAY) * vote
+                if entry['score'] != 0:
+                    entry['team'] = 1 if entry['score'] > 0 else 0
+                entry['last_checked'] = frame
+                entry['last_seen'] = frame
+                current_frame_player_teams[track_id] = entry['team']
 
         except Exception as e:
-            logging.warning(f"KMeans/Assignment error during frame processing: {e}.")
-            # Return empty dict if clustering/assignment fails for the frame
+            logging.warning(f"Team assignment error during frame processing: {e}.")
+            # Return only cached assignments if the assignment fails for the frame
 
-        return current_frame_player_teams
\ No newline at end of file
+        return current_frame_player_teams
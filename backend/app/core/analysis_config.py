@@ -1,6 +1,7 @@
 import numpy as np
 import torch
 import os
+import tempfile
 
 # --- Device ---
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -9,13 +10,35 @@ DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 YOLO_MODEL_PATH = os.path.join(BACKEND_DIR, "ai/player_tracker/player_model_weights.pt")
 TRACKNET_MODEL_PATH = os.path.join(BACKEND_DIR, "ai/ball_tracker/ball_model_weights.pth")
+# TrackNet inference backend: "eager", "compile" (torch.compile), "torchscript" (frozen, conv+ReLU fused)
+# or "onnx" (ONNX Runtime). Non-eager backends are checked against eager heatmaps at load time.
+TRACKNET_BACKEND = "eager"
+TRACKNET_BACKEND_TOLERANCE = 1e-4  # Max sigmoid heatmap difference to eager mode; larger falls back to eager
+TRACKNET_EXPORT_DIR = os.path.join(tempfile.gettempdir(), "capstone-tracknet-exports")
+# INT8 TrackNet written by ai/ball_tracker/quantize.py; used instead of the FP32 weights when enabled (CPU only).
+TRACKNET_USE_QUANTIZED = False
+TRACKNET_QUANTIZED_MODEL_PATH = os.path.join(BACKEND_DIR, "ai/ball_tracker/ball_model_weights_int8.pth")
+TRACKNET_QUANTIZATION_ENGINE = "x86"  # "x86" (fbgemm/onednn) on Intel/AMD, "qnnpack" on ARM
+TRACKNET_QUANTIZATION_MAX_MEAN_PEAK_ERROR_PX = 2.0  # Accuracy gate: mean ball-peak shift vs FP32, model pixels
+TRACKNET_QUANTIZATION_MIN_DETECTION_AGREEMENT = 0.95  # Accuracy gate: share of heatmaps where INT8 and FP32 agree on detection
+MODEL_WARMUP_SIZE = 640  # Side of the blank frame used for YOLO warm-up inference
 
 # --- Processing Parameters ---
+# Frames are decoded at most this tall (aspect ratio kept); 0 analyses at the source resolution.
+ANALYSIS_MAX_HEIGHT = 0
+VIDEO_DECODE_BACKEND = "auto"  # "pyav" (scales in the decoder), "opencv", or "auto" (PyAV for scaled decoding when installed)
 TRACKNET_WIDTH = 1024
 TRACKNET_HEIGHT = 576
 PLAYER_CONFIDENCE_THRESHOLD = 0.4
 PLAYER_IOU_THRESHOLD = 0.5
 PLAYER_CLASS_NAME = 'player'
+PLAYER_DETECTION_STRIDE = 1  # Run YOLO every N frames; boxes are propagated with a constant-velocity model in between
+PLAYER_REDETECT_CONFIDENCE = 0.5  # Run YOLO early when the last detection's mean confidence fell below this
+PLAYER_VELOCITY_SMOOTHING = 0.5  # Weight of the newest measured box velocity in the running estimate
+# >1: run YOLO predict on batches of frames and associate detections with a standalone tracker.
+PLAYER_DETECTION_BATCH_SIZE = 1
+PLAYER_TRACKER_CONFIG = "botsort.yaml"  # Ultralytics tracker config; botsort.yaml is what model.track uses by default
+ANALYSIS_QUEUE_SIZE = 8  # Max frames buffered between pipeline stages (decode -> ball -> players -> stats)
 
 # --- Team Identification Parameters ---
 INITIALIZATION_FRAMES = 50
@@ -23,20 +46,56 @@ MIN_NON_BG_PIXELS_TEAM = 50
 LOWER_GREEN_HSV_TEAM = np.array([30, 40, 40])
 UPPER_GREEN_HSV_TEAM = np.array([90, 255, 255])
 TEAM_CLUSTERING_MIN_SAMPLES = 10
+TEAM_COLOR_DOWNSCALE = 1.0  # Frame scale used for color extraction (e.g. 0.5 halves width and height)
+TEAM_COLOR_TORSO_ONLY = False  # Only use the torso band of each player box for its color
+TEAM_COLOR_TORSO_TOP = 0.15  # Torso band as fractions of box height, measured from the top
+TEAM_COLOR_TORSO_BOTTOM = 0.6
 TEAM_SIMILARITY_THRESHOLD_LAB = 20
+TEAM_VOTE_DECAY = 0.8  # Weight of a track's previous team score when a new per-frame vote (+1/-1) arrives
+TEAM_LOCK_SCORE = 0.9  # |score| at which a track's team is considered stable
+TEAM_RECHECK_INTERVAL_FRAMES = 25  # Stable tracks are re-checked against the reference colors this often
+TEAM_CACHE_MAX_AGE_FRAMES = 250  # Tracks not seen for this many frames are dropped from the team cache
 
 # --- Ball Tracking Parameters ---
 BALL_DETECTION_THRESHOLD = 0.3
 BALL_BOX_SIZE_MODEL = 15
 BALL_SEARCH_WINDOW_RADIUS = 50
+BALL_PEAK_TILE_SIZE = 16  # Global search: each tile maximum not beaten by a neighbouring tile is a ball peak candidate
+BALL_PEAK_CANDIDATES = 8  # Strongest global peak candidates kept per heatmap
 BALL_TRACKER_MAX_AGE = 10
 BALL_TRACKER_N_INIT = 3
 BALL_TRACKER_NMS_OVERLAP = 1.0
+BALL_TRACKER_BACKEND = "deepsort"  # "deepsort" (appearance embeddings) or "kalman" (constant-velocity filter only)
+# Kalman backend, in frame pixels per frame
+BALL_KALMAN_PROCESS_NOISE = 8.0  # Std of the per-frame change in ball velocity
+BALL_KALMAN_MEASUREMENT_NOISE = 4.0  # Std of a heatmap peak around the true center
+BALL_KALMAN_INITIAL_VELOCITY_STD = 30.0
+BALL_KALMAN_GATE = 9.21  # Max squared Mahalanobis distance for a detection to match a track (chi-square, 2 dof, 99%)
 TRACKNET_BALL_HEATMAP_CHANNEL = 1
+# 1: sliding window, one forward pass per frame using TRACKNET_BALL_HEATMAP_CHANNEL.
+# 3: non-overlapping windows, one forward pass per 3 frames using all three heatmaps.
+TRACKNET_INFERENCE_STRIDE = 1
+# >0: while the ball track is confirmed, run TrackNet only on a square crop of this size (model pixels,
+# multiple of 16) centred on it. Needs a backend that accepts any input size (not "onnx").
+TRACKNET_ROI_SIZE = 0
+TRACKNET_ROI_REFRESH_INTERVAL = 25  # ROI inferences between full-frame passes that re-acquire a ball the crop missed
 
 # --- Statistics Parameters ---
 POSSESSION_THRESHOLD_PIXELS = 150
 
+# --- Progress Reporting ---
+ANALYSIS_PROGRESS_INTERVAL_SECONDS = 2.0  # Minimum time between progress/partial-stats updates sent to the API
+
+# --- Segment-Parallel Analysis ---
+# >1 splits each video into this many time segments analysed concurrently in the process pool
+# (up to analysis_max_workers at once); 1 analyses the video in a single sequential pass.
+ANALYSIS_SEGMENTS = 1
+ANALYSIS_SEGMENT_OVERLAP_FRAMES = 50  # Frames before each segment decoded (not counted) to warm up its trackers
+
+# --- Checkpointing ---
+CHECKPOINT_INTERVAL_FRAMES = 1500  # Save resumable analysis state every N frames; 0 disables checkpoints
+CHECKPOINT_RESUME_WARMUP_FRAMES = 25  # Frames before the checkpoint re-decoded on resume to rebuild tracker state
+
 # --- Logging ---
 LOG_FORMAT = 'ANALYZER - %(module)s - %(levelname)s: %(message)s'
 
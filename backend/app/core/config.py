@@ -1,3 +1,5 @@
+import os
+import tempfile
 from typing import ClassVar
 
 from dotenv import load_dotenv
@@ -15,6 +17,25 @@ class Settings(BaseSettings):
     jwt_algo: str = "HS256"
     bytescale_api_key: str = "default key"
     bytescale_account_id: str = "default account id"
+    analysis_max_workers: int = 1
+    # Torch threads per analysis worker; 0 divides the CPU cores among analysis_max_workers.
+    analysis_worker_threads: int = 0
+    progress_poll_interval: float = 1.0
+    analysis_checkpoint_dir: str = os.path.join(tempfile.gettempdir(), "capstone-analysis-checkpoints")
+    analysis_max_restarts: int = 1
+    # Restart analyses left in processing state on startup; enable on one API instance only.
+    resume_interrupted_analyses: bool = False
+    video_cache_dir: str = os.path.join(tempfile.gettempdir(), "capstone-video-cache")
+    video_cache_max_bytes: int = 10 * 1024**3
+    video_cache_download_timeout: float = 60.0
+    upload_chunk_size: int = 1024 * 1024
+    upload_max_retries: int = 3
+    upload_retry_backoff: float = 0.5
+    http_client_timeout: float = 60.0
+    http_client_max_connections: int = 50
+    http_client_max_keepalive_connections: int = 20
+    http_client_keepalive_expiry: float = 30.0
+    http_client_http2: bool = True
     model_config = SettingsConfigDict(env_file="../../.env")
     pwd_ctx: ClassVar[CryptContext] = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
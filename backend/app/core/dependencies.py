@@ -1,9 +1,11 @@
+import httpx
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from motor.motor_asyncio import AsyncIOMotorCollection
 from starlette import status
 
 from capstone.backend.app.core.database import get_mongo_collection
+from capstone.backend.app.core.http_client import get_http_client
 from capstone.backend.app.services.user_service import UserService
 from capstone.backend.app.core.config import settings
 from capstone.backend.app.services.video_service import VideoService
@@ -26,8 +28,9 @@ def get_user_service(user_collection: AsyncIOMotorCollection = Depends(get_user_
     return UserService(user_collection)
 
 
-def get_video_service(video_collection: AsyncIOMotorCollection = Depends(get_video_collection)) -> VideoService:
-    return VideoService(video_collection)
+def get_video_service(video_collection: AsyncIOMotorCollection = Depends(get_video_collection),
+                      http_client: httpx.AsyncClient | None = Depends(get_http_client)) -> VideoService:
+    return VideoService(video_collection, http_client)
 
 
 security = HTTPBearer()
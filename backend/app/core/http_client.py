@@ -0,0 +1,26 @@
+import logging
+
+import httpx
+from fastapi import Request
+
+from capstone.backend.app.core.config import settings
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Creates the pooled client shared by all requests; the app lifespan owns and closes it."""
+    http2 = settings.http_client_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logging.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1.")
+            http2 = False
+    limits = httpx.Limits(max_connections=settings.http_client_max_connections,
+                          max_keepalive_connections=settings.http_client_max_keepalive_connections,
+                          keepalive_expiry=settings.http_client_keepalive_expiry)
+    return httpx.AsyncClient(timeout=settings.http_client_timeout, limits=limits, http2=http2)
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient | None:
+    """The shared client from app state, or None when the app was started without the lifespan."""
+    return getattr(request.app.state, "http_client", None)
@@ -1,9 +1,29 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+from capstone.backend.app.core.config import settings
+from capstone.backend.app.core.dependencies import get_video_collection
+from capstone.backend.app.core.http_client import create_http_client
 from capstone.backend.app.routes import user, project
+from capstone.backend.app.services.video_service import VideoService
+from capstone.backend.app.services.analysis_service import shutdown_analysis_executor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.http_client = create_http_client()
+    app.state.resumed_analyses = []
+    if settings.resume_interrupted_analyses:
+        video_service = VideoService(get_video_collection(), app.state.http_client)
+        app.state.resumed_analyses = await project.resume_interrupted_analyses(video_service)
+    yield
+    await app.state.http_client.aclose()
+    shutdown_analysis_executor()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "*",
@@ -1,14 +1,19 @@
-from typing import List
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, List
 
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, UploadFile, HTTPException, Request
 from fastapi.params import Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from capstone.backend.app.core.config import settings
 from capstone.backend.app.core.dependencies import get_video_service, get_current_user
 from capstone.backend.app.schemas.project import Project, ProjectSummary
-from capstone.backend.app.services.analysis_service import run_video_analysis
+from capstone.backend.app.services.analysis_service import run_video_analysis_in_pool
 from capstone.backend.app.services.video_service import VideoService
+from capstone.backend.app.utils.video_cache import get_video_cache
 
 
 
@@ -29,9 +34,9 @@ async def upload_video_file(
     if not settings.bytescale_api_key or not settings.bytescale_account_id:
         raise HTTPException(status_code=500, detail="Server configuration error: Upload service credentials not set.")
 
+    cache_writer = None
     try:
-        file_content = await file.read()
-        if not file_content:
+        if not await file.read(1):
             raise HTTPException(status_code=400, detail="Cannot upload an empty file.")
 
         upload_metadata = {
@@ -44,18 +49,32 @@ async def upload_video_file(
 
         user_email = user_payload.get("email")
 
+        # The upload is also spooled into the local video cache, so the analysis worker needn't download it.
+        try:
+            cache_writer = await run_in_threadpool(get_video_cache().open_writer)
+        except Exception as cache_err:
+            logging.warning(f"Could not open video cache for upload: {cache_err}")
+
         # Upload the video to Bytescale
         response_data = await video_service.upload_video(
             account_id=settings.bytescale_account_id,
             api_key=settings.bytescale_api_key,
             user_email=user_email,
-            request_body=file_content,
+            request_body=lambda: _stream_upload(file, cache_writer),
             metadata=upload_metadata,
-            querystring=upload_querystring
+            querystring=upload_querystring,
+            content_length=file.size
         )
 
         file_url = response_data.get("fileUrl")
 
+        if cache_writer is not None and not cache_writer.discarded:
+            try:
+                await run_in_threadpool(cache_writer.commit, file_url)
+                cache_writer = None
+            except Exception as cache_err:
+                logging.warning(f"Could not seed video cache for {file_url}: {cache_err}")
+
         # Add video analysis as a background task using the URL
         background_tasks.add_task(
             analyze_and_update_video, file_url, video_service, user_email
@@ -69,27 +88,64 @@ async def upload_video_file(
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail="An internal server error occurred during file processing.")
+    finally:
+        if cache_writer is not None:
+            await run_in_threadpool(cache_writer.discard)
+
+
+async def _stream_upload(file: UploadFile, cache_writer) -> AsyncIterator[bytes]:
+    """
+    Yields the upload from the start in chunks of upload_chunk_size, copying each chunk into the cache
+    writer. Each call starts over, so a failed upload attempt can be retried.
+    """
+    await file.seek(0)
+    if cache_writer is not None and not cache_writer.discarded:
+        await run_in_threadpool(cache_writer.reset)
+    while chunk := await file.read(settings.upload_chunk_size):
+        if cache_writer is not None and not cache_writer.discarded:
+            try:
+                await run_in_threadpool(cache_writer.write, chunk)
+            except Exception as cache_err:
+                # The cache is an optimisation; the upload itself carries on.
+                logging.warning(f"Could not write upload to video cache: {cache_err}")
+                await run_in_threadpool(cache_writer.discard)
+        yield chunk
 
 async def analyze_and_update_video(file_url: str, video_service: VideoService, user_email: str):
     """
     Background task to analyze the video using the URL directly and update MongoDB.
+    The analysis itself runs in the analysis process pool, so the event loop stays responsive;
+    progress and partial stats are written to the project while it runs.
     """
+    new_url = file_url.replace("raw", "video")
     try:
-        analysis_results = await run_video_analysis(file_url)
-        new_url = file_url.replace("raw", "video")
+        await video_service.update_status(new_url, source_url=file_url)
+
+        async def publish_progress(update: dict):
+            await video_service.update_progress(new_url, update["progress"], update["stats"])
+
+        analysis_results = await run_video_analysis_in_pool(file_url, publish_progress)
         print("new url: ", new_url)
         stats = await video_service.finish_stats(new_url, analysis_results)
         print(stats)
 
     except Exception as e:
         # Log error and update status in MongoDB
-        import logging
         logging.error(f"Error during video analysis: {e}")
         await video_service.video_collection.update_one(
-            {"file_url": file_url},
+            {"file_url": new_url},
             {"$set": {"status": "error", "error_message": str(e)}}
         )
 
+async def resume_interrupted_analyses(video_service: VideoService) -> list[asyncio.Task]:
+    """Restarts analyses left in processing state; each resumes from its last checkpoint."""
+    tasks = []
+    for doc in await video_service.get_interrupted_analyses():
+        logging.info(f"Resuming interrupted analysis of {doc['source_url']}")
+        user_email = doc["email"][0] if doc.get("email") else None
+        tasks.append(asyncio.create_task(analyze_and_update_video(doc["source_url"], video_service, user_email)))
+    return tasks
+
 @router.get("/projects")
 async def get_projects(
         user_payload: dict = Depends(get_current_user),
@@ -109,3 +165,24 @@ async def get_project_by_id(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     return project
+
+
+@router.get("/project/{id}/events")
+async def stream_project_events(
+        id: str,
+        request: Request,
+        user_payload: dict = Depends(get_current_user),
+        video_service: VideoService = Depends(get_video_service)):
+    """Server-Sent Events with the analysis progress and new stats of a project until it finishes."""
+    user_email = user_payload.get("email")
+    if await video_service.get_progress(id, user_email) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    async def event_stream():
+        async for event, data in video_service.progress_events(id, user_email, settings.progress_poll_interval):
+            if await request.is_disconnected():
+                return
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -6,6 +6,7 @@ from bson import ObjectId
 
 class ProjectStatus(Enum):
     LOADING = "loading"
+    PROCESSING = "processing"
     ERROR = "error"
     FINISHED = "finished"
 
@@ -25,11 +26,18 @@ class StatEntry(BaseModel):
 class AnalysisResults(BaseModel):
     stats: Dict[str, StatEntry]
 
+class AnalysisProgress(BaseModel):
+    frames_done: int
+    frame_count: int
+    fps: float
+    eta_seconds: Optional[float] = None
+
 class Project(BaseModel):
     id: ObjectId = Field(alias="_id")
     email: List[str]
     file_url: str
-    analysis_results: AnalysisResults
+    analysis_results: Optional[AnalysisResults] = None
+    progress: Optional[AnalysisProgress] = None
     status: ProjectStatus
     title: str
 
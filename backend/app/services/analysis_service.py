@@ -1,119 +1,725 @@
+import asyncio
 import logging
+import multiprocessing
+import os
+import queue
 import time
-import cv2
-from collections import deque
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterator
+
+import numpy as np
+import torch
 
 from capstone.backend.app.core import analysis_config as config
+from capstone.backend.app.core.config import settings
 from capstone.backend.app.utils import video_utils
+from capstone.backend.app.utils.frame_pipeline import FramePipeline
 from capstone.backend.app.utils.stats_calculator import StatsCalculator
+from capstone.backend.app.utils.analysis_checkpoint import CheckpointStore, get_checkpoint_store
+from capstone.backend.app.utils.video_cache import get_video_cache
 
 from capstone.backend.ai.player_tracker.player_tracker import PlayerTracker
 from capstone.backend.ai.ball_tracker.ball_tracker import BallTracker
 from capstone.backend.ai.team_identifier import TeamIdentifier
+from capstone.backend.ai import model_registry
 
 logging.basicConfig(level=logging.INFO, format=config.LOG_FORMAT)
 
-async def run_video_analysis(video_path: str) -> dict:
+
+@dataclass
+class FrameAnalysis:
+    """Per-frame results handed from one pipeline stage to the next."""
+    frame_number: int
+    frame: np.ndarray | None
+    ball_center: tuple | None = None
+    player_boxes: dict = field(default_factory=dict)
+    player_features: list = field(default_factory=list)
+    player_ids: list = field(default_factory=list)
+    player_teams: dict = field(default_factory=dict)
+    # Tracker state snapshots taken by the stages when this is a checkpoint frame
+    checkpoint_state: dict | None = None
+
+
+def _is_checkpoint_frame(frame_number: int) -> bool:
+    return config.CHECKPOINT_INTERVAL_FRAMES > 0 and frame_number % config.CHECKPOINT_INTERVAL_FRAMES == 0
+
+
+def _ball_item(ball_tracker: BallTracker, frame_number: int, frame: np.ndarray, ball_center) -> FrameAnalysis:
+    item = FrameAnalysis(frame_number, frame, ball_center)
+    if _is_checkpoint_frame(frame_number):
+        item.checkpoint_state = {"ball": ball_tracker.get_state()}
+    return item
+
+
+def _sliding_ball_stage(ball_tracker: BallTracker, frames: Iterator) -> Iterator[FrameAnalysis]:
+    """Tracks the ball on the middle frame of each overlapping 3-frame window."""
+    window = deque(maxlen=3)
+    for frame_number, frame in frames:
+        ball_tracker.add_frame(frame)
+        window.append((frame_number, frame))
+        if len(window) == 3:
+            middle_number, middle_frame = window[1]
+            ball_center, _ = ball_tracker.track_ball(middle_frame)
+            yield _ball_item(ball_tracker, middle_number, middle_frame, ball_center)
+
+
+def _strided_ball_stage(ball_tracker: BallTracker, frames: Iterator) -> Iterator[FrameAnalysis]:
+    """Tracks the ball on every frame using one TrackNet pass per non-overlapping 3-frame window."""
+    window = []
+
+    def flush():
+        num_frames = len(window)
+        # Pad a short trailing window by repeating its last frame; only real frames are used.
+        while len(window) < 3:
+            window.append(window[-1])
+            ball_tracker.add_frame(window[-1][1])
+        ball_results = ball_tracker.track_ball_window([frame for _, frame in window])
+        for (frame_number, frame), (ball_center, _) in list(zip(window, ball_results))[:num_frames]:
+            yield _ball_item(ball_tracker, frame_number, frame, ball_center)
+        window.clear()
+
+    for frame_number, frame in frames:
+        ball_tracker.add_frame(frame)
+        window.append((frame_number, frame))
+        if len(window) == 3:
+            yield from flush()
+    if window:
+        yield from flush()
+
+
+def _player_stage(player_tracker: PlayerTracker, items: Iterator[FrameAnalysis]) -> Iterator[FrameAnalysis]:
     """
-    Orchestrates the video analysis process using refactored components.
+    Detects players and extracts their colors, then releases the frame before the later stages.
+    Frames are grouped into batches of PLAYER_DETECTION_BATCH_SIZE for batched YOLO inference.
     """
-    logging.info(f"Starting analysis for video: {video_path}")
-    analysis_start_time = time.time()
-    stats_log = {"stats": {}}
-    final_summary = {}
+    batch_size = max(1, config.PLAYER_DETECTION_BATCH_SIZE)
+    batch = []
+
+    def flush():
+        try:
+            results = player_tracker.track_players_batch([item.frame for item in batch])
+            for item, (player_boxes, player_features, player_ids, _) in zip(batch, results):
+                item.player_boxes = player_boxes
+                item.player_features = player_features
+                item.player_ids = player_ids
+        except Exception as loop_err:
+            logging.error(f"Error during processing frames {batch[0].frame_number}-{batch[-1].frame_number}: {loop_err}",
+                          exc_info=False)
+        for item in batch:
+            item.frame = None
+        yield from batch
+        batch.clear()
+
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield from flush()
+    if batch:
+        yield from flush()
+
+
+def _team_stage(team_identifier: TeamIdentifier, items: Iterator[FrameAnalysis]) -> Iterator[FrameAnalysis]:
+    """
+    Assigns teams. The first INITIALIZATION_FRAMES frames are held back while their player colors are
+    collected as clustering samples; once the reference colors are known, teams are assigned to the
+    held-back frames retroactively, so the opening frames are decoded and detected only once.
+    """
+    pending = []
+    initializing = not team_identifier.teams_initialized
+
+    def assign(item: FrameAnalysis) -> FrameAnalysis:
+        try:
+            item.player_teams = team_identifier.assign_teams_for_frame(item.player_features, item.player_ids)
+        except Exception as loop_err:
+            logging.error(f"Error during processing frame {item.frame_number}: {loop_err}", exc_info=False)
+        if item.checkpoint_state is not None:
+            item.checkpoint_state["teams"] = team_identifier.get_state()
+        return item
+
+    def finish_initialization():
+        logging.info("Starting team color clustering phase...")
+        samples = [feature for item in pending for feature in item.player_features]
+        try:
+            team_identifier.initialize_from_samples(samples)
+        except Exception as e:
+            logging.error(f"Error during team initialization phase: {e}", exc_info=True)
+        if not team_identifier.teams_initialized:
+            logging.warning("Proceeding without team identification.")
+
+    for item in items:
+        if not initializing:
+            yield assign(item)
+            continue
+
+        pending.append(item)
+        if len(pending) >= config.INITIALIZATION_FRAMES:
+            finish_initialization()
+            initializing = False
+            for pending_item in pending:
+                yield assign(pending_item)
+            pending.clear()
+
+    if pending:
+        finish_initialization()
+        for pending_item in pending:
+            yield assign(pending_item)
+
+
+class _ProgressReporter:
+    """Collects stats deltas and hands them on with progress figures at most every ANALYSIS_PROGRESS_INTERVAL_SECONDS."""
+
+    def __init__(self, frame_count: int, callback: Callable[[dict], None], frames_done: int = 0):
+        self.frame_count = frame_count
+        self.callback = callback
+        self.start_time = time.monotonic()
+        self.last_report_time = self.start_time
+        # A resumed analysis starts with the frames its checkpoint already covered
+        self.start_frames_done = frames_done
+        self.frames_done = frames_done
+        self.pending_stats = {}
+
+    def update(self, frames_done: int, stat_update: dict | None):
+        self.frames_done = frames_done
+        if stat_update:
+            self.pending_stats.update(stat_update)
+        if time.monotonic() - self.last_report_time >= config.ANALYSIS_PROGRESS_INTERVAL_SECONDS:
+            self.flush()
+
+    def flush(self, finished: bool = False):
+        now = time.monotonic()
+        elapsed = now - self.start_time
+        fps = (self.frames_done - self.start_frames_done) / elapsed if elapsed > 0 else 0.0
+        remaining = 0 if finished else max(self.frame_count - self.frames_done, 0)
+        progress = {
+            "frames_done": self.frames_done,
+            "frame_count": self.frame_count,
+            "fps": round(fps, 2),
+            "eta_seconds": round(remaining / fps, 1) if fps > 0 else None,
+        }
+        try:
+            self.callback({"progress": progress, "stats": self.pending_stats})
+        except Exception as e:
+            logging.warning(f"Failed to report analysis progress: {e}")
+        self.pending_stats = {}
+        self.last_report_time = now
+
+
+def _save_checkpoint(checkpoint_store: CheckpointStore, key: str, item: FrameAnalysis, frame_count: int,
+                     frames_done: int, stats_calculator: StatsCalculator, stats_log: dict):
+    try:
+        checkpoint_store.save(key, {
+            "frame_number": item.frame_number,
+            "frame_count": frame_count,
+            "frames_done": frames_done,
+            "stats": stats_calculator.get_state(),
+            "stats_log": stats_log["stats"],
+            **item.checkpoint_state,
+        })
+        logging.info(f"Saved analysis checkpoint at frame {item.frame_number}.")
+    except Exception as e:
+        logging.warning(f"Failed to save analysis checkpoint at frame {item.frame_number}: {e}")
 
 
+def _open_video(video_path: str, lease: str) -> tuple[str | None, dict]:
+    """
+    Fetches the video into the local cache, held there by lease, and reads its metadata.
+    Returns (local path, metadata), or (None, error result) when the video can't be analysed.
+    """
+    try:
+        # Remote videos are fetched once into the local cache; every stage below reads the local file.
+        video_path = get_video_cache().materialize(video_path, lease)
+    except Exception as e:
+        logging.error(f"Failed to fetch video {video_path}: {e}")
+        return None, {"error": f"Failed to fetch video: {e}"}
+
     video_metadata = video_utils.get_video_metadata(video_path)
     if not video_metadata:
-        return {"error": "Failed to read video metadata."}
+        return None, {"error": "Failed to read video metadata."}
     if video_metadata["frame_count"] <= 0:
          logging.warning(f"Video has {video_metadata['frame_count']} frames. Cannot analyze.")
-         return {"error": "Video has zero or negative frames."}
+         return None, {"error": "Video has zero or negative frames."}
 
     logging.info(f"Video Info: {video_metadata['width']}x{video_metadata['height']} "
                  f"@ {video_metadata['fps']}fps, {video_metadata['frame_count']} frames.")
+    return video_path, video_metadata
+
+
+def _decode_size(video_metadata: dict) -> tuple[int, int] | None:
+    """The size frames are decoded at, or None for the source resolution."""
+    decode_size = (video_metadata["analysis_width"], video_metadata["analysis_height"])
+    if decode_size == (video_metadata["width"], video_metadata["height"]):
+        return None
+    logging.info(f"Decoding at analysis resolution {decode_size[0]}x{decode_size[1]}.")
+    return decode_size
+
 
+def _ball_stage_for_config():
+    strided = config.TRACKNET_INFERENCE_STRIDE == 3
+    if config.TRACKNET_INFERENCE_STRIDE not in (1, 3):
+        logging.warning(f"Unsupported TRACKNET_INFERENCE_STRIDE {config.TRACKNET_INFERENCE_STRIDE}, using sliding window.")
+    return _strided_ball_stage if strided else _sliding_ball_stage
 
+
+def run_video_analysis(video_path: str, progress_callback: Callable[[dict], None] | None = None) -> dict:
+    """
+    Orchestrates the video analysis process using refactored components.
+    CPU-bound; the API runs it in the analysis process pool via run_video_analysis_in_pool.
+    If progress_callback is given, it receives {"progress": {...}, "stats": {...new stat entries}}
+    at a bounded rate while the video is processed.
+    Every CHECKPOINT_INTERVAL_FRAMES frames the analysis state is checkpointed; a later run for the same
+    video content resumes from the last checkpoint instead of frame 1.
+    """
+    # The cached copy of a remote video must not be evicted while it is being read
+    video_cache = get_video_cache()
+    lease = video_cache.new_lease()
     try:
-        player_tracker = PlayerTracker()
+        return _run_video_analysis(video_path, progress_callback, lease)
+    finally:
+        video_cache.release(lease)
+
+
+def _run_video_analysis(video_path: str, progress_callback: Callable[[dict], None] | None, lease: str) -> dict:
+    logging.info(f"Starting analysis for video: {video_path}")
+    analysis_start_time = time.time()
+    stats_log = {"stats": {}}
+    final_summary = {}
+
+    video_path, video_metadata = _open_video(video_path, lease)
+    if video_path is None:
+        return video_metadata
+    decode_size = _decode_size(video_metadata)
+
+    try:
+        player_tracker = PlayerTracker(analysis_scale=video_metadata["analysis_scale"])
         team_identifier = TeamIdentifier()
 
         ball_tracker = BallTracker(video_metadata)
-        stats_calculator = StatsCalculator()
+        stats_calculator = StatsCalculator(distance_scale=video_metadata["analysis_scale"])
     except (FileNotFoundError, ImportError, Exception) as e:
         logging.error(f"Failed to initialize analysis components: {e}", exc_info=True)
         return {"error": f"Initialization failed: {e}"}
 
 
+    checkpoint_store, checkpoint_key, resume_after, frames_done = None, None, 0, 0
+    if config.CHECKPOINT_INTERVAL_FRAMES > 0:
+        try:
+            checkpoint_store = get_checkpoint_store()
+            checkpoint_key = get_video_cache().content_key(video_path)
+            checkpoint = checkpoint_store.load(checkpoint_key)
+            if checkpoint is not None and checkpoint["frame_count"] == video_metadata["frame_count"]:
+                stats_calculator.load_state(checkpoint["stats"])
+                team_identifier.load_state(checkpoint["teams"])
+                ball_tracker.load_state(checkpoint["ball"])
+                stats_log["stats"] = checkpoint["stats_log"]
+                resume_after, frames_done = checkpoint["frame_number"], checkpoint["frames_done"]
+                logging.info(f"Resuming analysis after checkpoint at frame {resume_after}.")
+        except Exception as e:
+            logging.warning(f"Could not restore analysis checkpoint, starting from the beginning: {e}")
+            checkpoint_store = None
+            stats_calculator = StatsCalculator(distance_scale=video_metadata["analysis_scale"])
+            team_identifier = TeamIdentifier()
+            ball_tracker = BallTracker(video_metadata)
+            stats_log["stats"], resume_after, frames_done = {}, 0, 0
+    # Frames just before the checkpoint are decoded again (but not counted) so the trackers can warm up.
+    start_frame = max(1, resume_after - config.CHECKPOINT_RESUME_WARMUP_FRAMES + 1)
+
+    ball_stage = _ball_stage_for_config()
+
+    pipeline = FramePipeline(
+        video_utils.read_frames(video_path, decode_size, start_frame),
+        [
+            lambda frames: ball_stage(ball_tracker, frames),
+            lambda items: _player_stage(player_tracker, items),
+            lambda items: _team_stage(team_identifier, items),
+        ],
+        queue_size=config.ANALYSIS_QUEUE_SIZE,
+        name="analysis",
+    )
+    logging.info(f"Starting main processing loop ({'strided' if ball_stage is _strided_ball_stage else 'sliding'} TrackNet inference)...")
+
+    progress = _ProgressReporter(video_metadata["frame_count"], progress_callback, frames_done) if progress_callback else None
     try:
-        team_identifier.initialize_teams(video_path, player_tracker)
-    except Exception as e:
-        logging.error(f"Error during team initialization phase: {e}", exc_info=True)
+        for item in pipeline:
+            frame_number = item.frame_number
+            if frame_number <= resume_after:
+                continue
+            frames_done += 1
+            if frame_number % 200 == 0 or frames_done == 1:
+                logging.info(f"Analyzer processing frame {frame_number}/{video_metadata['frame_count']}")
 
-        logging.warning("Proceeding without team identification.")
+            try:
+                stats_calculator.update(frame_number, item.ball_center, item.player_boxes, item.player_teams)
 
+                stat_update = stats_calculator.get_stats_update(frame_number)
+                if stat_update:
+                    stats_log["stats"].update(stat_update)
+                if progress:
+                    progress.update(frames_done, stat_update)
+                if checkpoint_store is not None and item.checkpoint_state is not None:
+                    _save_checkpoint(checkpoint_store, checkpoint_key, item, video_metadata["frame_count"],
+                                     frames_done, stats_calculator, stats_log)
 
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        logging.error(f"Failed to reopen video for main processing: {video_path}")
-        return {"error": "Failed to open video for processing."}
+            except Exception as loop_err:
+                 logging.error(f"Error during processing frame {frame_number}: {loop_err}", exc_info=False)
+    except Exception as e:
+        logging.error(f"Video processing pipeline failed: {e}", exc_info=True)
+        return {"error": f"Failed to process video: {e}"}
+    if progress:
+        progress.flush(finished=True)
 
-    frame_buffer = deque(maxlen=3)
-    frame_count = 0
-    logging.info("Starting main processing loop...")
+    logging.info("Finished processing loop.")
+    if checkpoint_store is not None:
+        checkpoint_store.delete(checkpoint_key)
 
-    while cap.isOpened():
-        ret, original_frame = cap.read()
-        if not ret:
-            logging.info("End of video or cannot read frame.")
-            break
 
-        frame_buffer.append(original_frame.copy())
-        frame_count += 1
+    final_summary = stats_calculator.get_final_stats()
+    stats_log["summary"] = final_summary
 
-        if frame_count % 200 == 0 or frame_count == 1:
-            logging.info(f"Analyzer processing frame {frame_count}/{video_metadata['frame_count']}")
+    analysis_duration = time.time() - analysis_start_time
+    logging.info(f"Analysis took {analysis_duration:.2f} seconds.")
 
+    if not stats_log["stats"] and not final_summary:
+        logging.warning("Analysis completed but no statistics were logged or calculated.")
+        stats_log["message"] = "No significant statistics generated."
 
-        if len(frame_buffer) == 3:
-            current_frame_original = frame_buffer[1]
 
-            try:
+    return stats_log
+
 
-                player_boxes, player_features, player_ids, _ = player_tracker.track_players(current_frame_original)
+def _segment_bounds(frame_count: int, segments: int) -> list[tuple[int, int | None]]:
+    """
+    Splits frames 1..frame_count into contiguous (first, last) segments of near-equal length.
+    The last segment is open-ended (None) in case the container's frame count is short.
+    """
+    segments = max(1, min(segments, frame_count))
+    edges = np.linspace(0, frame_count, segments + 1).round().astype(int)
+    bounds = [(int(edges[i]) + 1, int(edges[i + 1])) for i in range(segments)]
+    bounds[-1] = (bounds[-1][0], None)
+    return bounds
 
 
-                current_teams = team_identifier.assign_teams_for_frame(player_features, player_ids)
+def _frames_until(frames: Iterator, last_frame: int | None) -> Iterator:
+    """Passes frames on up to last_frame, then closes the decoder."""
+    try:
+        for frame_number, frame in frames:
+            if last_frame is not None and frame_number > last_frame:
+                return
+            yield frame_number, frame
+    finally:
+        frames.close()
 
 
-                ball_center, ball_tracked = ball_tracker.track_ball(frame_buffer, current_frame_original)
+def prepare_segmented_analysis(video_path: str, lease: str) -> dict:
+    """
+    First job of a segment-parallel analysis: fetches the video, held in the cache by the caller's
+    lease until all segments are done, and runs the single team-color clustering pass, so every
+    segment labels teams against the same reference colors.
+    Returns {"video_path", "video_metadata", "teams"} or an error result.
+    """
+    video_path, video_metadata = _open_video(video_path, lease)
+    if video_path is None:
+        return video_metadata
 
+    try:
+        # Samples come from frames decoded like the segments decode them, as in the single-pass _team_stage
+        player_tracker = PlayerTracker(analysis_scale=video_metadata["analysis_scale"])
+        samples = []
+        frames = video_utils.read_frames(video_path, _decode_size(video_metadata))
+        for _, frame in _frames_until(frames, config.INITIALIZATION_FRAMES):
+            _, features, _, _ = player_tracker.track_players(frame)
+            samples.extend(features)
+        team_identifier = TeamIdentifier()
+        team_identifier.initialize_from_samples(samples)
+    except Exception as e:
+        logging.error(f"Error during team initialization phase: {e}", exc_info=True)
+        team_identifier = TeamIdentifier()
+    if not team_identifier.teams_initialized:
+        logging.warning("Proceeding without team identification.")
+    return {"video_path": video_path, "video_metadata": video_metadata, "teams": team_identifier.get_state()}
 
-                stats_calculator.update(frame_count, ball_center, player_boxes, current_teams)
 
-                stat_update = stats_calculator.get_stats_update(frame_count)
-                if stat_update:
-                    stats_log["stats"].update(stat_update)
+def analyze_segment(video_path: str, video_metadata: dict, first_frame: int, last_frame: int | None,
+                    team_state: dict) -> dict:
+    """
+    Analyses frames first_frame..last_frame of a local video with fresh tracker state. Decoding starts
+    ANALYSIS_SEGMENT_OVERLAP_FRAMES (at least one) earlier so the trackers are warmed up at first_frame; the overlap
+    frames are recorded too, which lets merge_segment_results match track ids across the boundary.
+    Returns the per-frame possessing player id and team rather than counts, since counts can only be
+    stitched together in frame order.
+    """
+    try:
+        player_tracker = PlayerTracker(analysis_scale=video_metadata["analysis_scale"])
+        team_identifier = TeamIdentifier()
+        team_identifier.load_state(team_state)
+        ball_tracker = BallTracker(video_metadata)
+        stats_calculator = StatsCalculator(distance_scale=video_metadata["analysis_scale"])
+    except Exception as e:
+        logging.error(f"Failed to initialize analysis components: {e}", exc_info=True)
+        return {"error": f"Initialization failed: {e}"}
 
+    ball_stage = _ball_stage_for_config()
+    stages = [
+        lambda frames: ball_stage(ball_tracker, frames),
+        lambda items: _player_stage(player_tracker, items),
+    ]
+    # Teams are only assigned against the shared reference colors; a segment never clusters on its own.
+    if team_identifier.teams_initialized:
+        stages.append(lambda items: _team_stage(team_identifier, items))
+
+    # At least one frame before the segment is decoded, so the sliding ball window can emit first_frame itself.
+    decode_from = max(1, first_frame - max(1, config.ANALYSIS_SEGMENT_OVERLAP_FRAMES))
+    # One frame past the segment is decoded so the sliding ball window can emit last_frame itself.
+    decode_to = None if last_frame is None else last_frame + 1
+    pipeline = FramePipeline(
+        _frames_until(video_utils.read_frames(video_path, _decode_size(video_metadata), decode_from), decode_to),
+        stages,
+        queue_size=config.ANALYSIS_QUEUE_SIZE,
+        name=f"segment-{first_frame}",
+    )
+    logging.info(f"Analyzing segment {first_frame}-{last_frame or video_metadata['frame_count']} "
+                 f"(decoding from frame {decode_from}).")
+
+    segment = {"first_frame": first_frame, "frame_numbers": [], "possessor_ids": [], "possessor_teams": []}
+    try:
+        for item in pipeline:
+            if last_frame is not None and item.frame_number > last_frame:
+                continue
+            try:
+                possessor_id = stats_calculator.find_possessing_player(item.ball_center, item.player_boxes)
             except Exception as loop_err:
-                 logging.error(f"Error during processing frame {frame_count}: {loop_err}", exc_info=False)
+                logging.error(f"Error during processing frame {item.frame_number}: {loop_err}", exc_info=False)
+                possessor_id = None
+            segment["frame_numbers"].append(item.frame_number)
+            segment["possessor_ids"].append(possessor_id)
+            segment["possessor_teams"].append(item.player_teams.get(possessor_id, -1) if possessor_id is not None else -1)
+    except Exception as e:
+        logging.error(f"Segment {first_frame} pipeline failed: {e}", exc_info=True)
+        return {"error": f"Failed to process video: {e}"}
+    return segment
 
-                 continue
 
+def _match_overlap_possessors(previous: dict, segment: dict) -> dict:
+    """
+    Maps a segment's track ids to the previous segment's merged ids, by which players both segments
+    saw in possession on the same overlap frames. Each id is matched at most once, by majority vote.
+    """
+    votes = Counter()
+    for frame_number, possessor_id in zip(segment["frame_numbers"], segment["possessor_ids"]):
+        if frame_number >= segment["first_frame"]:
+            break
+        previous_id = previous.get(frame_number)
+        if possessor_id is not None and previous_id is not None:
+            votes[(possessor_id, previous_id)] += 1
 
-    cap.release()
-    logging.info("Finished processing loop.")
+    id_map = {}
+    for (possessor_id, previous_id), _ in votes.most_common():
+        if possessor_id not in id_map and previous_id not in id_map.values():
+            id_map[possessor_id] = previous_id
+    return id_map
 
 
+def merge_segment_results(segments: list[dict]) -> dict:
+    """
+    Replays the per-frame possession of all segments in frame order through one StatsCalculator,
+    producing the same stats log as a sequential analysis. Track ids are namespaced per segment, except
+    where the overlap shows the same player in possession, so a possession that spans a boundary is
+    neither counted as a pass nor breaks one that does happen there.
+    """
+    stats_calculator = StatsCalculator()
+    stats_log = {"stats": {}}
+    previous = {}
+    for index, segment in enumerate(sorted(segments, key=lambda s: s["first_frame"])):
+        id_map = _match_overlap_possessors(previous, segment)
+        merged_ids = {}
+        for frame_number, possessor_id, possessor_team in zip(segment["frame_numbers"], segment["possessor_ids"],
+                                                              segment["possessor_teams"]):
+            merged_id = None if possessor_id is None else id_map.get(possessor_id, (index, possessor_id))
+            merged_ids[frame_number] = merged_id
+            if frame_number < segment["first_frame"]:
+                continue
+            stats_calculator.update_possessor(frame_number, merged_id, possessor_team)
+            stat_update = stats_calculator.get_stats_update(frame_number)
+            if stat_update:
+                stats_log["stats"].update(stat_update)
+        previous = merged_ids
+
     final_summary = stats_calculator.get_final_stats()
     stats_log["summary"] = final_summary
-
-    analysis_duration = time.time() - analysis_start_time
-    logging.info(f"Analysis took {analysis_duration:.2f} seconds.")
-
     if not stats_log["stats"] and not final_summary:
         logging.warning("Analysis completed but no statistics were logged or calculated.")
         stats_log["message"] = "No significant statistics generated."
+    return stats_log
+
 
+_analysis_executor: ProcessPoolExecutor | None = None
+_progress_manager = None
 
-    return stats_log
\ No newline at end of file
+
+def _init_analysis_worker():
+    """Loads and warms up the models once per worker process, before the first video arrives."""
+    # Concurrent workers (e.g. segments of one video) share the cores instead of each using all of them.
+    threads = settings.analysis_worker_threads or max(1, (os.cpu_count() or 1) // max(1, settings.analysis_max_workers))
+    torch.set_num_threads(threads)
+    try:
+        model_registry.warm_up()
+    except Exception as e:
+        logging.error(f"Failed to warm up analysis models: {e}")
+
+
+def _run_video_analysis_with_queue(video_path: str, progress_queue) -> dict:
+    return run_video_analysis(video_path, progress_queue.put)
+
+
+def get_analysis_executor() -> ProcessPoolExecutor:
+    """Returns the process pool analyses run in, creating it on first use."""
+    global _analysis_executor
+    if _analysis_executor is None:
+        # spawn: forked children would inherit the API's event loop, DB client and torch thread state.
+        _analysis_executor = ProcessPoolExecutor(max_workers=settings.analysis_max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_init_analysis_worker)
+        logging.info(f"Started analysis process pool with {settings.analysis_max_workers} worker(s).")
+    return _analysis_executor
+
+
+def _get_progress_manager():
+    """Manager whose queues carry progress updates from the pool workers back to the API process."""
+    global _progress_manager
+    if _progress_manager is None:
+        _progress_manager = multiprocessing.get_context("spawn").Manager()
+    return _progress_manager
+
+
+def _reset_analysis_executor(broken_executor: ProcessPoolExecutor):
+    """Replaces a broken pool; concurrent analyses that saw the same breakage don't reset its successor."""
+    global _analysis_executor
+    if _analysis_executor is broken_executor:
+        _analysis_executor.shutdown(wait=False, cancel_futures=True)
+        _analysis_executor = None
+
+
+def shutdown_analysis_executor():
+    global _analysis_executor, _progress_manager
+    if _analysis_executor is not None:
+        _analysis_executor.shutdown(wait=False, cancel_futures=True)
+        _analysis_executor = None
+    if _progress_manager is not None:
+        _progress_manager.shutdown()
+        _progress_manager = None
+
+
+def _drain_progress(progress_queue) -> dict | None:
+    """Merges all queued progress messages: the latest progress figures and every stats delta."""
+    merged = None
+    while True:
+        try:
+            message = progress_queue.get_nowait()
+        except queue.Empty:
+            return merged
+        if merged is None:
+            merged = {"progress": message["progress"], "stats": {}}
+        merged["progress"] = message["progress"]
+        merged["stats"].update(message["stats"])
+
+
+async def _run_in_pool_once(executor: ProcessPoolExecutor, video_path: str,
+                            on_progress: Callable[[dict], Awaitable[None]] | None) -> dict:
+    loop = asyncio.get_running_loop()
+    if on_progress is None:
+        return await loop.run_in_executor(executor, run_video_analysis, video_path)
+
+    progress_queue = _get_progress_manager().Queue()
+    future = loop.run_in_executor(executor, _run_video_analysis_with_queue, video_path, progress_queue)
+    while True:
+        done, _ = await asyncio.wait({future}, timeout=config.ANALYSIS_PROGRESS_INTERVAL_SECONDS)
+        try:
+            update = _drain_progress(progress_queue)
+            if update is not None:
+                await on_progress(update)
+        except Exception as e:
+            logging.warning(f"Failed to publish analysis progress: {e}")
+        if done:
+            return future.result()
+
+
+async def _run_segmented_in_pool_once(executor: ProcessPoolExecutor, video_path: str,
+                                      on_progress: Callable[[dict], Awaitable[None]] | None) -> dict:
+    """
+    Segment-parallel analysis: one job clusters the team colors, then ANALYSIS_SEGMENTS segment jobs
+    run concurrently and their results are merged. Progress is reported as segments finish; the stats
+    only become available once all of them have.
+    """
+    # The lease belongs to this process, so it outlives any worker that reads the cached file
+    video_cache = get_video_cache()
+    lease = video_cache.new_lease()
+    try:
+        return await _run_segments(executor, video_path, on_progress, lease)
+    finally:
+        video_cache.release(lease)
+
+
+async def _run_segments(executor: ProcessPoolExecutor, video_path: str,
+                        on_progress: Callable[[dict], Awaitable[None]] | None, lease: str) -> dict:
+    loop = asyncio.get_running_loop()
+    plan = await loop.run_in_executor(executor, prepare_segmented_analysis, video_path, lease)
+    if "error" in plan:
+        return plan
+
+    frame_count = plan["video_metadata"]["frame_count"]
+    bounds = _segment_bounds(frame_count, config.ANALYSIS_SEGMENTS)
+    logging.info(f"Analyzing {video_path} in {len(bounds)} segments.")
+    futures = [
+        loop.run_in_executor(executor, analyze_segment, plan["video_path"], plan["video_metadata"],
+                             first_frame, last_frame, plan["teams"])
+        for first_frame, last_frame in bounds
+    ]
+    updates = []
+    progress = _ProgressReporter(frame_count, updates.append)
+    segments = []
+    try:
+        for next_done in asyncio.as_completed(futures):
+            segment = await next_done
+            if "error" in segment:
+                return segment
+            segments.append(segment)
+            progress.frames_done += sum(1 for n in segment["frame_numbers"] if n >= segment["first_frame"])
+            if on_progress is not None:
+                progress.flush(finished=len(segments) == len(bounds))
+                try:
+                    await on_progress(updates.pop())
+                except Exception as e:
+                    logging.warning(f"Failed to publish analysis progress: {e}")
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return await asyncio.to_thread(merge_segment_results, segments)
+
+
+async def run_video_analysis_in_pool(video_path: str,
+                                     on_progress: Callable[[dict], Awaitable[None]] | None = None) -> dict:
+    """
+    Runs run_video_analysis in the process pool without blocking the event loop. Progress messages
+    from the worker are forwarded to on_progress, coalesced to at most one call per
+    ANALYSIS_PROGRESS_INTERVAL_SECONDS. If the worker dies, the job is resubmitted up to
+    analysis_max_restarts times and resumes from its last checkpoint.
+    With ANALYSIS_SEGMENTS > 1 the video is split into segments analysed in parallel instead;
+    segment jobs are not checkpointed, so a restart analyses them again.
+    """
+    restarts = 0
+    while True:
+        executor = get_analysis_executor()
+        run_once = _run_segmented_in_pool_once if config.ANALYSIS_SEGMENTS > 1 else _run_in_pool_once
+        try:
+            return await run_once(executor, video_path, on_progress)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); replace the pool so this and later analyses can still run.
+            logging.error("Analysis worker process died; restarting the process pool.")
+            _reset_analysis_executor(executor)
+            if restarts >= settings.analysis_max_restarts:
+                raise
+            restarts += 1
+            logging.info(f"Resubmitting analysis of {video_path} (restart {restarts}); it resumes from its last checkpoint.")
@@ -1,24 +1,77 @@
+import asyncio
 import httpx
 import json
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterable, AsyncIterator, Callable
 
 from bson import ObjectId
 from fastapi import HTTPException
 from motor.motor_asyncio import AsyncIOMotorCollection
 
+from capstone.backend.app.core.config import settings
 from capstone.backend.app.schemas.project import Project, ProjectStatus, ProjectSummary
 
+# Responses worth retrying: rate limiting and gateway/availability errors.
+_RETRY_STATUS_CODES = {429, 502, 503, 504}
+# Transport errors raised before the request was sent; after that (e.g. a read timeout) the upload may
+# already be stored, and posting it again would store it twice.
+_RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
 
 class VideoService:
 
-    def __init__(self, video_collection: AsyncIOMotorCollection):
+    def __init__(self, video_collection: AsyncIOMotorCollection, http_client: httpx.AsyncClient | None = None):
         self.video_collection = video_collection
+        # Shared pooled client from the app lifespan; without one, each upload uses its own client.
+        self.http_client = http_client
+
+    @asynccontextmanager
+    async def _client(self) -> AsyncIterator[httpx.AsyncClient]:
+        if self.http_client is not None:
+            yield self.http_client
+        else:
+            async with httpx.AsyncClient(timeout=settings.http_client_timeout) as client:
+                yield client
+
+    @staticmethod
+    async def _post_with_retries(client: httpx.AsyncClient, url: str, headers: dict, params: dict,
+                                 request_body) -> httpx.Response:
+        """
+        Posts request_body, retrying connection failures and _RETRY_STATUS_CODES with exponential backoff.
+        Only bodies that can be sent again are retried: bytes, or a callable returning a fresh body for each attempt.
+        """
+        replayable = isinstance(request_body, (bytes, bytearray)) or callable(request_body)
+        max_retries = settings.upload_max_retries if replayable else 0
+        for attempt in range(max_retries + 1):
+            content = request_body() if callable(request_body) else request_body
+            try:
+                response = await client.post(url, headers=headers, params=params, content=content)
+                if response.status_code not in _RETRY_STATUS_CODES or attempt == max_retries:
+                    response.raise_for_status()
+                    return response
+                reason = f"status {response.status_code}"
+            except _RETRY_EXCEPTIONS as exc:
+                if attempt == max_retries:
+                    raise
+                reason = type(exc).__name__
+            delay = settings.upload_retry_backoff * 2**attempt
+            logging.warning(f"Upload attempt {attempt + 1} failed ({reason}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
 
     async def upload_video(self,
                            account_id: str,
                            user_email: str,
-                           api_key: str, request_body: bytes,
+                           api_key: str,
+                           request_body: bytes | AsyncIterable[bytes] | Callable[[], AsyncIterable[bytes]],
                            metadata: dict | None = None,
-                           querystring: dict | None = None):
+                           querystring: dict | None = None,
+                           content_length: int | None = None):
+        """
+        Uploads a video to Bytescale. request_body may be an async iterable of chunks, which httpx
+        streams without holding the whole file in memory, or a callable returning such an iterable so
+        failed attempts can be retried; pass content_length when it is known.
+        """
         base_url = "https://api.bytescale.com"
         path = f"/v2/accounts/{account_id}/uploads/binary"
         url = f"{base_url}{path}"
@@ -27,6 +80,8 @@ class VideoService:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "video/mp4"
         }
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
         if metadata:
             try:
                 headers["X-Upload-Metadata"] = json.dumps(metadata)
@@ -35,15 +90,9 @@ class VideoService:
 
         params_to_send = querystring if querystring is not None else {}
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with self._client() as client:
             try:
-                response = await client.post(
-                    url,
-                    headers=headers,
-                    params=params_to_send,
-                    content=request_body
-                )
-                response.raise_for_status()
+                response = await self._post_with_retries(client, url, headers, params_to_send, request_body)
 
                 file_path = response.json()["filePath"]
                 file_url = f"https://upcdn.io/{account_id}/video{file_path}"
@@ -74,12 +123,29 @@ class VideoService:
             except ValueError as ve:
                 raise HTTPException(status_code=400, detail=str(ve))
 
-    async def update_status(self, file_url):
+    async def update_status(self, file_url, source_url: str | None = None):
+        update = {"status": "processing"}
+        if source_url is not None:
+            # The URL the analysis reads from, so an interrupted analysis can be restarted later.
+            update["source_url"] = source_url
         await self.video_collection.update_one(
             {"file_url": file_url},
-            {"$set": {"status": "processing"}}
+            {"$set": update}
         )
 
+    async def get_interrupted_analyses(self) -> list[dict]:
+        """Projects whose analysis was still running, e.g. when the API process was stopped."""
+        cursor = self.video_collection.find({"status": ProjectStatus.PROCESSING.value, "source_url": {"$exists": True}},
+                                            {"source_url": 1, "email": 1})
+        return await cursor.to_list(length=None)
+
+    async def update_progress(self, file_url: str, progress: dict, stats_delta: dict):
+        """Stores progress figures and merges new stat entries into the partial analysis results."""
+        update = {"status": ProjectStatus.PROCESSING.value, "progress": progress, "latest_stats": stats_delta}
+        for frame_key, stat_entry in stats_delta.items():
+            update[f"analysis_results.stats.{frame_key}"] = stat_entry
+        await self.video_collection.update_one({"file_url": file_url}, {"$set": update})
+
     async def finish_stats(self, file_url: str, stats: dict):
         print(f"calling finish stats: {file_url}")
         file_url.replace("raw", "video")
@@ -107,3 +173,33 @@ class VideoService:
             return None
 
         return Project(**project)
+
+    async def get_progress(self, project_id: str, user_email: str) -> dict | None:
+        """Reads only the fields needed for live progress, not the whole project document."""
+        return await self.video_collection.find_one(
+            {"_id": ObjectId(project_id), "email": [user_email]},
+            {"status": 1, "progress": 1, "latest_stats": 1, "error_message": 1},
+        )
+
+    async def progress_events(self, project_id: str, user_email: str, poll_interval: float) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Yields (event, data) pairs for a project: "progress" whenever the analysis reported new progress,
+        then a final "status" once it has finished or failed.
+        """
+        last_progress = None
+        while True:
+            doc = await self.get_progress(project_id, user_email)
+            if doc is None:
+                return
+            progress = doc.get("progress")
+            if progress is not None and progress != last_progress:
+                last_progress = progress
+                yield "progress", {"progress": progress, "stats": doc.get("latest_stats") or {}}
+            status = doc.get("status")
+            if status in (ProjectStatus.FINISHED.value, ProjectStatus.ERROR.value):
+                data = {"status": status}
+                if doc.get("error_message"):
+                    data["error_message"] = doc["error_message"]
+                yield "status", data
+                return
+            await asyncio.sleep(poll_interval)
@@ -0,0 +1,65 @@
+import json
+import logging
+import os
+import tempfile
+
+from capstone.backend.app.core.config import settings
+
+CHECKPOINT_VERSION = 1
+
+
+class CheckpointStore:
+    """
+    Keeps the latest analysis checkpoint per video as a JSON file, keyed by the video's content hash,
+    so a restarted job for the same video can continue where the previous one stopped.
+    """
+
+    def __init__(self, checkpoint_dir: str):
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{key}.json")
+
+    def load(self, key: str) -> dict | None:
+        try:
+            with open(self._path(key)) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, OSError) as e:
+            logging.warning(f"Ignoring unreadable checkpoint {key}: {e}")
+            return None
+        if checkpoint.get("version") != CHECKPOINT_VERSION:
+            logging.info(f"Ignoring checkpoint {key} from an older version")
+            return None
+        return checkpoint
+
+    def save(self, key: str, checkpoint: dict):
+        """Writes the checkpoint atomically; a crash mid-write leaves the previous one intact."""
+        checkpoint = {**checkpoint, "version": CHECKPOINT_VERSION}
+        fd, tmp_path = tempfile.mkstemp(dir=self.checkpoint_dir, suffix=".json.tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(checkpoint, f)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+_checkpoint_store: CheckpointStore | None = None
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Returns the process-wide store configured by settings."""
+    global _checkpoint_store
+    if _checkpoint_store is None:
+        _checkpoint_store = CheckpointStore(settings.analysis_checkpoint_dir)
+    return _checkpoint_store
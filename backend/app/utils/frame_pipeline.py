@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+from typing import Callable, Iterable, Iterator
+
+_END = object()
+
+
+class _StageFailure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class FramePipeline:
+    """
+    Runs a frame source and a chain of stages in separate threads connected by bounded queues.
+
+    Each stage is a callable taking an iterator over the previous stage's items and returning an
+    iterator of its own items, so a stage may buffer, batch or drop items. Iterating the pipeline
+    yields the last stage's items in order. A full queue blocks its producer (backpressure), and an
+    exception in any stage is re-raised to the consumer after all threads have been stopped.
+    """
+
+    def __init__(self, source: Iterable, stages: list[Callable[[Iterator], Iterator]],
+                 queue_size: int = 8, name: str = "pipeline"):
+        self.name = name
+        self._source = source
+        self._stages = list(stages)
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(len(self._stages) + 1)]
+        self._stop = threading.Event()
+        self._threads = []
+        self._started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __iter__(self) -> Iterator:
+        self._start()
+        try:
+            for item in self._drain(self._queues[-1]):
+                yield item
+        finally:
+            self.close()
+
+    def _start(self):
+        if self._started:
+            raise RuntimeError(f"{self.name} can only be iterated once")
+        self._started = True
+        self._threads.append(threading.Thread(target=self._run_source, name=f"{self.name}-source", daemon=True))
+        for i, stage in enumerate(self._stages):
+            self._threads.append(threading.Thread(target=self._run_stage, args=(i, stage),
+                                                  name=f"{self.name}-stage-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        """Stops all threads and releases the source. Safe to call more than once."""
+        self._stop.set()
+        for q in self._queues:
+            self._discard(q)
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        for q in self._queues:
+            self._discard(q)
+
+    @staticmethod
+    def _discard(q: queue.Queue):
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(self, q: queue.Queue) -> Iterator:
+        while not self._stop.is_set():
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _StageFailure):
+                raise item.error
+            yield item
+
+    def _forward(self, items: Iterable, out_queue: queue.Queue):
+        try:
+            for item in items:
+                if not self._put(out_queue, item):
+                    return
+            self._put(out_queue, _END)
+        except BaseException as e:
+            logging.error(f"{self.name}: stage failed: {e}", exc_info=False)
+            self._put(out_queue, _StageFailure(e))
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    def _run_source(self):
+        try:
+            items = iter(self._source)
+        except BaseException as e:
+            self._put(self._queues[0], _StageFailure(e))
+            return
+        self._forward(items, self._queues[0])
+
+    def _run_stage(self, index: int, stage: Callable[[Iterator], Iterator]):
+        try:
+            items = iter(stage(self._drain(self._queues[index])))
+        except BaseException as e:
+            self._put(self._queues[index + 1], _StageFailure(e))
+            return
+        self._forward(items, self._queues[index + 1])
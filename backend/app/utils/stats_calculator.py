@@ -1,52 +1,118 @@
 import logging
 
+import numpy as np
 
 from capstone.backend.app.core import analysis_config as config
 
 class StatsCalculator:
-    def __init__(self):
-        self.possession_frames_team = {0: 0, 1: 0}
-        self.pass_counts_team = {0: 0, 1: 0}
+    def __init__(self, distance_scale: float = 1.0):
+        # Analysis pixels per source pixel; POSSESSION_THRESHOLD_PIXELS is given in source pixels.
+        self.distance_scale = distance_scale
+        # Running counters are array-backed (index = team); the dict properties below are views for callers.
+        self._possession_frames = np.zeros(2, dtype=np.int64)
+        self._pass_counts = np.zeros(2, dtype=np.int64)
         # Stores {'id': track_id, 'team': team_index} of the last player confirmed to have possession
         self.last_confirmed_possessor_info = {'id': None, 'team': -1}
         # Keep track of last logged values to only log changes
         self.last_logged_possession_percent = None
         self.last_logged_pass_count = None
 
-    def _find_possessing_player(self, ball_center_orig: tuple, current_player_boxes: dict) -> int | None:
-        """Finds the player closest to the ball within the threshold."""
-        possessing_player_id = None
-        min_dist_sq = config.POSSESSION_THRESHOLD_PIXELS**2
+    @property
+    def possession_frames_team(self) -> dict:
+        return {0: int(self._possession_frames[0]), 1: int(self._possession_frames[1])}
+
+    @possession_frames_team.setter
+    def possession_frames_team(self, counts: dict):
+        self._possession_frames[:] = [counts[0], counts[1]]
+
+    @property
+    def pass_counts_team(self) -> dict:
+        return {0: int(self._pass_counts[0]), 1: int(self._pass_counts[1])}
+
+    @pass_counts_team.setter
+    def pass_counts_team(self, counts: dict):
+        self._pass_counts[:] = [counts[0], counts[1]]
+
+    def get_state(self) -> dict:
+        """JSON-serialisable counters for checkpointing."""
+        return {
+            "possession_frames": self._possession_frames.tolist(),
+            "pass_counts": self._pass_counts.tolist(),
+            "last_logged_possession_percent": self.last_logged_possession_percent,
+            "last_logged_pass_count": self.last_logged_pass_count,
+        }
+
+    def load_state(self, state: dict):
+        """
+        Restores counters from get_state. The last possessor is not restored: player track ids are
+        not stable across a restart, so possession starts afresh to avoid counting a phantom pass.
+        """
+        self._possession_frames[:] = state["possession_frames"]
+        self._pass_counts[:] = state["pass_counts"]
+        self.last_logged_possession_percent = state.get("last_logged_possession_percent")
+        self.last_logged_pass_count = state.get("last_logged_pass_count")
+        self.last_confirmed_possessor_info = {'id': None, 'team': -1}
 
-        if ball_center_orig is None:
-            return None
+    def _possession_threshold_sq(self) -> float:
+        return (config.POSSESSION_THRESHOLD_PIXELS * self.distance_scale)**2
 
-        ball_cx, ball_cy = ball_center_orig
+    @staticmethod
+    def _boxes_to_arrays(current_player_boxes: dict) -> tuple[np.ndarray, np.ndarray]:
+        """Converts {track_id: [x1, y1, x2, y2]} to an (N, 4) box array and an (N,) id array, skipping invalid boxes."""
+        boxes = []
+        ids = []
         for p_id, p_box in current_player_boxes.items():
             try:
                 p_x1, p_y1, p_x2, p_y2 = p_box
-                player_cx = (p_x1 + p_x2) / 2
-                player_cy = (p_y1 + p_y2) / 2
-                dist_sq = (ball_cx - player_cx)**2 + (ball_cy - player_cy)**2
-                if dist_sq < min_dist_sq:
-                    min_dist_sq = dist_sq
-                    possessing_player_id = p_id
+                boxes.append((float(p_x1), float(p_y1), float(p_x2), float(p_y2)))
+                ids.append(p_id)
             except Exception as e:
                 logging.warning(f"Error calculating possession distance for player {p_id}: {e}")
                 continue
-        return possessing_player_id
+        return np.asarray(boxes, dtype=np.float64).reshape(-1, 4), np.asarray(ids)
+
+    @staticmethod
+    def _possession_distances_sq(ball_centers: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        """Squared distances between ball centers (N, 2) and the centers of boxes (N, 4), row by row."""
+        player_cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        player_cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        return (ball_centers[:, 0] - player_cx)**2 + (ball_centers[:, 1] - player_cy)**2
+
+    def _find_possessing_player_array(self, ball_center_orig: tuple | None, boxes: np.ndarray, ids: np.ndarray):
+        """Finds the player closest to the ball within the threshold, given (N, 4) boxes and (N,) ids."""
+        if ball_center_orig is None or len(boxes) == 0:
+            return None
 
-    def update(self, frame_count: int, ball_center_orig: tuple | None, current_player_boxes: dict, current_frame_player_teams: dict):
-        """Updates possession and pass counts based on current frame data."""
-        possessing_player_id = self._find_possessing_player(ball_center_orig, current_player_boxes)
+        ball = np.broadcast_to(np.asarray(ball_center_orig, dtype=np.float64), (len(boxes), 2))
+        dist_sq = self._possession_distances_sq(ball, boxes)
+        # argmin returns the first minimum, matching the "first strictly closer player" rule.
+        closest = int(np.argmin(dist_sq))
+        if dist_sq[closest] < self._possession_threshold_sq():
+            possessing_player_id = ids[closest]
+            return possessing_player_id.item() if isinstance(possessing_player_id, np.generic) else possessing_player_id
+        return None
+
+    def _find_possessing_player(self, ball_center_orig: tuple, current_player_boxes: dict) -> int | None:
+        """Finds the player closest to the ball within the threshold."""
+        if ball_center_orig is None:
+            return None
+
+        boxes, ids = self._boxes_to_arrays(current_player_boxes)
+        return self._find_possessing_player_array(ball_center_orig, boxes, ids)
 
+    def _apply_possession(self, frame_count: int, possessing_player_id, current_frame_player_teams: dict) -> tuple[int, int]:
+        """
+        Updates possession and pass counts for one frame's possessor.
+        Returns (possessing team, passing team), each -1 when there is none.
+        """
         current_possessor_team = -1
+        pass_team = -1
         if possessing_player_id is not None:
             current_possessor_team = current_frame_player_teams.get(possessing_player_id, -1)
 
             if current_possessor_team != -1:
                 # Increment possession frames for the valid team
-                self.possession_frames_team[current_possessor_team] += 1
+                self._possession_frames[current_possessor_team] += 1
 
                 # --- Pass Detection Logic ---
                 # Check if there was a previous possessor with a valid team
@@ -56,7 +122,8 @@ class StatsCalculator:
                     if self.last_confirmed_possessor_info['id'] != possessing_player_id and \
                        self.last_confirmed_possessor_info['team'] == current_possessor_team:
                         # This indicates a pass within the same team
-                        self.pass_counts_team[current_possessor_team] += 1
+                        self._pass_counts[current_possessor_team] += 1
+                        pass_team = current_possessor_team
                         logging.info(f"Frame {frame_count}: Pass detected T{current_possessor_team + 1} "
                                      f"({self.last_confirmed_possessor_info['id']} -> {possessing_player_id})")
 
@@ -64,13 +131,76 @@ class StatsCalculator:
                 self.last_confirmed_possessor_info['id'] = possessing_player_id
                 self.last_confirmed_possessor_info['team'] = current_possessor_team
 
-            else:
-                pass
-
         else:
             # No player has possession this frame. Reset last confirmed possessor.
             self.last_confirmed_possessor_info = {'id': None, 'team': -1}
 
+        return current_possessor_team, pass_team
+
+    def update(self, frame_count: int, ball_center_orig: tuple | None, current_player_boxes: dict, current_frame_player_teams: dict) -> tuple[int, int]:
+        """Updates possession and pass counts based on current frame data."""
+        possessing_player_id = self._find_possessing_player(ball_center_orig, current_player_boxes)
+        return self._apply_possession(frame_count, possessing_player_id, current_frame_player_teams)
+
+    def find_possessing_player(self, ball_center_orig: tuple | None, current_player_boxes: dict):
+        """The id of the player in possession this frame, or None; the counters are not touched."""
+        return self._find_possessing_player(ball_center_orig, current_player_boxes)
+
+    def update_possessor(self, frame_count: int, possessing_player_id, possessing_team: int) -> tuple[int, int]:
+        """Same as update, with the possessing player (any hashable id) and their team already known, e.g. when replaying recorded possession."""
+        teams = {possessing_player_id: possessing_team} if possessing_player_id is not None else {}
+        return self._apply_possession(frame_count, possessing_player_id, teams)
+
+    def update_arrays(self, frame_count: int, ball_center_orig: tuple | None, boxes: np.ndarray, ids: np.ndarray,
+                      current_frame_player_teams: dict) -> tuple[int, int]:
+        """Same as update, with players given as an (N, 4) box array and an (N,) id array."""
+        possessing_player_id = self._find_possessing_player_array(ball_center_orig, np.asarray(boxes, dtype=np.float64).reshape(-1, 4), np.asarray(ids))
+        return self._apply_possession(frame_count, possessing_player_id, current_frame_player_teams)
+
+    def update_batch(self, frame_counts: list, ball_centers: list, boxes_per_frame: list, ids_per_frame: list,
+                     teams_per_frame: list, stats_log: dict | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Applies many frames at once, e.g. for offline recomputation. Possession distances for all frames
+        are computed in one vectorised pass; the possession/pass state is then advanced frame by frame.
+        If stats_log is given, per-frame stat updates are added to it as in the live analysis.
+        Returns per-frame (possessing team, passing team) arrays, -1 where there is none.
+        """
+        num_frames = len(frame_counts)
+        boxes_per_frame = [np.asarray(boxes, dtype=np.float64).reshape(-1, 4) for boxes in boxes_per_frame]
+        counts = np.array([len(boxes) for boxes in boxes_per_frame], dtype=np.int64)
+
+        possessor_index = np.full(num_frames, -1, dtype=np.int64)
+        if counts.sum() > 0:
+            all_boxes = np.concatenate(boxes_per_frame)
+            frame_of_box = np.repeat(np.arange(num_frames), counts)
+            balls = np.array([center if center is not None else (np.nan, np.nan) for center in ball_centers],
+                             dtype=np.float64).reshape(-1, 2)
+            dist_sq = self._possession_distances_sq(balls[frame_of_box], all_boxes)
+            dist_sq = np.where(dist_sq < self._possession_threshold_sq(), dist_sq, np.inf)
+
+            # Sort by (frame, distance); lexsort is stable, so ties keep the first player like the per-frame search.
+            order = np.lexsort((dist_sq, frame_of_box))
+            first_in_frame = np.cumsum(counts) - counts
+            has_boxes = counts > 0
+            closest = order[first_in_frame[has_boxes]]
+            found = np.isfinite(dist_sq[closest])
+            possessor_index[np.flatnonzero(has_boxes)[found]] = (closest - first_in_frame[has_boxes])[found]
+
+        possession_teams = np.full(num_frames, -1, dtype=np.int64)
+        pass_teams = np.full(num_frames, -1, dtype=np.int64)
+        for i in range(num_frames):
+            possessing_player_id = None
+            if possessor_index[i] >= 0:
+                possessing_player_id = np.asarray(ids_per_frame[i])[possessor_index[i]]
+                if isinstance(possessing_player_id, np.generic):
+                    possessing_player_id = possessing_player_id.item()
+            possession_teams[i], pass_teams[i] = self._apply_possession(frame_counts[i], possessing_player_id, teams_per_frame[i])
+            if stats_log is not None:
+                stat_update = self.get_stats_update(frame_counts[i])
+                if stat_update:
+                    stats_log.update(stat_update)
+
+        return possession_teams, pass_teams
 
     def get_stats_update(self, frame_count: int) -> dict | None:
          """Calculates current stats and returns an update entry if changed since last log."""
@@ -78,10 +208,10 @@ class StatsCalculator:
          current_stats_entry = {}
 
          # Calculate Possession %
-         total_possession = sum(self.possession_frames_team.values())
+         total_possession = int(self._possession_frames.sum())
          current_possession = {"team1": 0, "team2": 0}
          if total_possession > 0:
-             perc_t1 = round((self.possession_frames_team[0] / total_possession) * 100)
+             perc_t1 = round((int(self._possession_frames[0]) / total_possession) * 100)
              current_possession["team1"] = perc_t1
              current_possession["team2"] = 100 - perc_t1
 
@@ -90,10 +220,10 @@ class StatsCalculator:
              stats_changed = True
 
          # Get Pass Counts
-         current_passes = {"team1": self.pass_counts_team[0], "team2": self.pass_counts_team[1]}
+         current_passes = {"team1": int(self._pass_counts[0]), "team2": int(self._pass_counts[1])}
          if current_passes != self.last_logged_pass_count:
              # Only include teams with passes > 0 in the log entry
-             pass_entry = {f"team{i+1}": count for i, count in enumerate([self.pass_counts_team[0], self.pass_counts_team[1]]) if count > 0}
+             pass_entry = {f"team{i+1}": count for i, count in enumerate(current_passes.values()) if count > 0}
              if pass_entry:
                   current_stats_entry["PASS"] = pass_entry
                   stats_changed = True
@@ -108,15 +238,15 @@ class StatsCalculator:
 
     def get_final_stats(self) -> dict:
          """Returns the final accumulated stats."""
-         total_possession = sum(self.possession_frames_team.values())
+         total_possession = int(self._possession_frames.sum())
          final_possession = {"team1": 0, "team2": 0}
          if total_possession > 0:
-             perc_t1 = round((self.possession_frames_team[0] / total_possession) * 100)
+             perc_t1 = round((int(self._possession_frames[0]) / total_possession) * 100)
              final_possession["team1"] = perc_t1
              final_possession["team2"] = 100 - perc_t1
 
          final_passes = {
-             "team1": self.pass_counts_team[0],
-             "team2": self.pass_counts_team[1]
+             "team1": int(self._pass_counts[0]),
+             "team2": int(self._pass_counts[1])
          }
          return {"final_possession": final_possession, "final_passes": final_passes}
\ No newline at end of file
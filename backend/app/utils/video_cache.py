@@ -0,0 +1,297 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows: the cache is then only safe within one process
+    fcntl = None
+
+import httpx
+
+from capstone.backend.app.core.config import settings
+
+_INDEX_FILE = "index.json"
+_LOCK_FILE = ".lock"
+_LEASE_DIR = "leases"
+_CHUNK_SIZE = 1024 * 1024
+
+
+class VideoCache:
+    """
+    Local on-disk cache for analysis inputs. Files are stored under their SHA-256 content hash, so the
+    same video uploaded twice is kept once; an index maps source URLs to hashes. When the cache grows
+    beyond max_bytes, the least recently used files are removed, except files leased by a running analysis.
+    The API process and the analysis workers share the directory; index updates and eviction hold an
+    exclusive file lock on it.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Excludes other threads of this process and, through flock, other processes."""
+        with self._lock, open(os.path.join(self.cache_dir, _LOCK_FILE), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    @staticmethod
+    def _is_remote(source: str) -> bool:
+        return urlparse(source).scheme in ("http", "https")
+
+    @staticmethod
+    def _extension(source: str) -> str:
+        ext = os.path.splitext(urlparse(source).path)[1].lower()
+        return ext if ext and len(ext) <= 8 else ".mp4"
+
+    def _path(self, entry: dict) -> str:
+        return os.path.join(self.cache_dir, f"{entry['hash']}{entry['ext']}")
+
+    def _load_index(self) -> dict:
+        # Re-read on every call; the API process seeds and the analysis workers read the same directory.
+        try:
+            with open(os.path.join(self.cache_dir, _INDEX_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self, index: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".json.tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, os.path.join(self.cache_dir, _INDEX_FILE))
+
+    @staticmethod
+    def new_lease() -> str:
+        """
+        A lease id owned by this process. Files materialized under it are not evicted until release(),
+        or until this process has exited.
+        """
+        return f"{os.getpid()}-{uuid.uuid4().hex}"
+
+    def _add_lease(self, path: str, lease: str | None):
+        if lease is not None:
+            lease_dir = os.path.join(self.cache_dir, _LEASE_DIR)
+            os.makedirs(lease_dir, exist_ok=True)
+            open(os.path.join(lease_dir, f"{os.path.basename(path)}.{lease}"), "w").close()
+
+    def release(self, lease: str):
+        """Lets the files held by lease be evicted again."""
+        lease_dir = os.path.join(self.cache_dir, _LEASE_DIR)
+        for name in os.listdir(lease_dir) if os.path.isdir(lease_dir) else []:
+            if name.endswith(f".{lease}"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(lease_dir, name))
+
+    @staticmethod
+    def _process_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _leased_files(self) -> set[str]:
+        """Names of cache files with a live lease; leases of processes that have died are removed."""
+        lease_dir = os.path.join(self.cache_dir, _LEASE_DIR)
+        leased = set()
+        for name in os.listdir(lease_dir) if os.path.isdir(lease_dir) else []:
+            file_name, _, lease = name.rpartition(".")
+            try:
+                alive = self._process_alive(int(lease.split("-")[0]))
+            except ValueError:
+                alive = False
+            if alive:
+                leased.add(file_name)
+            else:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(lease_dir, name))
+        return leased
+
+    def lookup(self, source: str, lease: str | None = None) -> str | None:
+        """Returns the cached file for source, or None. A hit counts as a use for LRU eviction."""
+        with self._locked():
+            entry = self._load_index().get(source)
+            if entry is None:
+                return None
+            path = self._path(entry)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+            self._add_lease(path, lease)
+            return path
+
+    def _store(self, source: str, tmp_path: str, content_hash: str, lease: str | None = None) -> str:
+        """Moves a fully written temporary file into place under its content hash and indexes it."""
+        entry = {"hash": content_hash, "ext": self._extension(source)}
+        path = self._path(entry)
+        with self._locked():
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                os.utime(path)
+            else:
+                os.replace(tmp_path, path)
+            self._add_lease(path, lease)
+            index = self._load_index()
+            index[source] = entry
+            self._evict(index, keep=path)
+            self._save_index(index)
+        return path
+
+    def _evict(self, index: dict, keep: str):
+        leased = self._leased_files()
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name in (_INDEX_FILE, _LOCK_FILE) or name.endswith(".tmp") or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep or os.path.basename(path) in leased:
+                continue
+            os.remove(path)
+            total -= size
+            logging.info(f"Evicted {os.path.basename(path)} from video cache")
+            for cached_source in [s for s, entry in index.items() if self._path(entry) == path]:
+                del index[cached_source]
+
+    def _new_temp_file(self):
+        return tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".tmp", delete=False)
+
+    def open_writer(self) -> "CacheWriter":
+        """Starts adding a file chunk by chunk, for content whose source URL is only known afterwards."""
+        return CacheWriter(self)
+
+    def seed(self, source: str, content) -> str:
+        """
+        Adds content for source without downloading it, e.g. when the upload route already has the bytes.
+        content is either bytes or a binary file object. Returns the local path.
+        """
+        writer = self.open_writer()
+        try:
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                writer.write(content)
+            else:
+                while chunk := content.read(_CHUNK_SIZE):
+                    writer.write(chunk)
+        except BaseException:
+            writer.discard()
+            raise
+        return writer.commit(source)
+
+    def _download(self, url: str, lease: str | None = None) -> str:
+        logging.info(f"Downloading {url} into video cache")
+        writer = self.open_writer()
+        try:
+            with httpx.stream("GET", url, follow_redirects=True,
+                              timeout=settings.video_cache_download_timeout) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes(_CHUNK_SIZE):
+                    writer.write(chunk)
+        except BaseException:
+            writer.discard()
+            raise
+        return writer.commit(url, lease=lease)
+
+    def materialize(self, source: str, lease: str | None = None) -> str:
+        """
+        Returns a local file for source: local paths are used as they are, URLs are fetched once.
+        With a lease (see new_lease), the cached file is kept until the lease is released.
+        """
+        if not self._is_remote(source):
+            return source
+        cached_path = self.lookup(source, lease)
+        if cached_path is not None:
+            logging.info(f"Using cached copy of {source}")
+            return cached_path
+        return self._download(source, lease)
+
+    def content_key(self, path: str) -> str:
+        """SHA-256 of a local file's content; free for files in the cache, which are named by it."""
+        if os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.cache_dir):
+            return os.path.splitext(os.path.basename(path))[0]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def clear(self):
+        with self._locked():
+            # The lock file stays, other processes may be waiting on it
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if name == _LOCK_FILE:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
+
+
+class CacheWriter:
+    """Spools content into the cache directory while hashing it; commit() makes it a cache entry."""
+
+    def __init__(self, cache: VideoCache):
+        self._cache = cache
+        self._digest = hashlib.sha256()
+        self._file = cache._new_temp_file()
+        self.bytes_written = 0
+        self.discarded = False
+
+    def write(self, chunk: bytes):
+        self._digest.update(chunk)
+        self._file.write(chunk)
+        self.bytes_written += len(chunk)
+
+    def reset(self):
+        """Drops everything written so far, e.g. before a retried upload streams the file again."""
+        self._file.seek(0)
+        self._file.truncate()
+        self._digest = hashlib.sha256()
+        self.bytes_written = 0
+
+    def commit(self, source: str, lease: str | None = None) -> str:
+        """Stores the written content for source and returns the local path, held by lease if given."""
+        self._file.close()
+        return self._cache._store(source, self._file.name, self._digest.hexdigest(), lease)
+
+    def discard(self):
+        self.discarded = True
+        self._file.close()
+        try:
+            os.remove(self._file.name)
+        except FileNotFoundError:
+            pass
+
+
+_video_cache: VideoCache | None = None
+
+
+def get_video_cache() -> VideoCache:
+    """Returns the process-wide cache configured by settings."""
+    global _video_cache
+    if _video_cache is None:
+        _video_cache = VideoCache(settings.video_cache_dir, settings.video_cache_max_bytes)
+    return _video_cache
@@ -1,7 +1,9 @@
 import cv2
+import itertools
 import torch
 import numpy as np
 from collections import deque
+from typing import Iterator
 from skimage.color import rgb2lab
 import logging
 from capstone.backend.app.core import analysis_config as config
@@ -35,6 +37,60 @@ def get_dominant_color_lab_team(roi: np.ndarray) -> np.ndarray | None:
     return dom_lab
 
 
+def get_dominant_colors_lab_team(frame: np.ndarray, boxes, analysis_scale: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Frame-level version of get_dominant_color_lab_team for all player boxes at once.
+    The green mask is computed once for the whole frame (optionally downscaled and restricted to the
+    torso band), and the mean non-green color of every box is converted to LAB in a single call.
+    analysis_scale is the frame's size relative to the source video; MIN_NON_BG_PIXELS_TEAM counts
+    source pixels, so it is scaled by the area of both it and TEAM_COLOR_DOWNSCALE.
+    Returns an (N, 3) LAB array and an (N,) mask of boxes with enough non-green pixels.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    colors_lab = np.full((len(boxes), 3), np.nan)
+    has_color = np.zeros(len(boxes), dtype=bool)
+    if frame is None or frame.size == 0 or len(boxes) == 0:
+        return colors_lab, has_color
+
+    try:
+        scale = config.TEAM_COLOR_DOWNSCALE
+        if scale != 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            boxes = boxes * scale
+        frame_hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        mask_inv = cv2.bitwise_not(cv2.inRange(frame_hsv, config.LOWER_GREEN_HSV_TEAM, config.UPPER_GREEN_HSV_TEAM))
+        min_pixels = config.MIN_NON_BG_PIXELS_TEAM * (scale * analysis_scale) ** 2
+
+        if config.TEAM_COLOR_TORSO_ONLY:
+            heights = boxes[:, 3] - boxes[:, 1]
+            boxes = boxes.copy()
+            boxes[:, 3] = boxes[:, 1] + heights * config.TEAM_COLOR_TORSO_BOTTOM
+            boxes[:, 1] = boxes[:, 1] + heights * config.TEAM_COLOR_TORSO_TOP
+
+        frame_height, frame_width = frame.shape[:2]
+        boxes = boxes.astype(int)
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, frame_width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, frame_height)
+
+        mean_bgr = np.zeros((len(boxes), 3))
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            if x1 >= x2 or y1 >= y2:
+                continue
+            crop_mask = mask_inv[y1:y2, x1:x2]
+            if cv2.countNonZero(crop_mask) < min_pixels:
+                continue
+            mean_bgr[i] = cv2.mean(frame[y1:y2, x1:x2], mask=crop_mask)[:3]
+            has_color[i] = True
+
+        if has_color.any():
+            dominant_colors_rgb = mean_bgr[has_color].astype(np.uint8)[:, ::-1]  # BGR -> RGB
+            colors_lab[has_color] = rgb2lab(dominant_colors_rgb.reshape(-1, 1, 3) / 255.0)[:, 0, :]
+    except Exception as e:
+        logging.debug(f"Internal error in get_dominant_colors_lab_team: {e}")
+        has_color[:] = False
+    return colors_lab, has_color
+
+
 def prepare_tracknet_input(frames: deque, width: int, height: int) -> torch.Tensor | None:
     """Prepares a deque of frames for TrackNet input."""
     if not frames or len(frames) != 3:
@@ -53,6 +109,71 @@ def prepare_tracknet_input(frames: deque, width: int, height: int) -> torch.Tens
         logging.warning(f"Error preparing TrackNet input: {e}")
         return None
 
+class TrackNetInputBuffer:
+    """
+    Preallocated TrackNet input holding the last three frames. Each pushed frame is resized and
+    normalized once, into the slot of the oldest frame; the slots are only put in order (oldest
+    first) when the input is read, which needs no copy when the oldest frame is in the first slot.
+    """
+
+    def __init__(self, width: int, height: int, device: torch.device = config.DEVICE):
+        self.width = width
+        self.height = height
+        self._slots = torch.zeros((3, 3, height, width), dtype=torch.float32, device=device)
+        self._ordered = torch.empty_like(self._slots)
+        self._slot_orders = [torch.tensor([(oldest + i) % 3 for i in range(3)], device=device) for oldest in range(3)]
+        self._resized_bgr = np.empty((height, width, 3), dtype=np.uint8)
+        self._resized_rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self._frames_pushed = 0
+
+    def __len__(self) -> int:
+        return min(self._frames_pushed, 3)
+
+    def is_full(self) -> bool:
+        return self._frames_pushed >= 3
+
+    def clear(self):
+        self._frames_pushed = 0
+
+    def push(self, frame: np.ndarray):
+        """Writes the new frame into the slot of the oldest one."""
+        cv2.resize(frame, (self.width, self.height), dst=self._resized_bgr)
+        cv2.cvtColor(self._resized_bgr, cv2.COLOR_BGR2RGB, dst=self._resized_rgb)
+
+        newest = self._slots[self._frames_pushed % 3]
+        newest.copy_(torch.from_numpy(self._resized_rgb).permute(2, 0, 1))
+        newest.div_(255.0)
+        self._frames_pushed += 1
+
+    def model_input(self, origin: tuple[int, int] | None = None, size: int | None = None) -> torch.Tensor:
+        """
+        The (1, 9, H, W) model input, oldest frame first: a view of the slots, or a reused tensor that the
+        next read overwrites. With an origin (y, x), only the size x size crop from there is returned.
+        """
+        slots = self._slots
+        if origin is not None:
+            y0, x0 = origin
+            slots = slots[:, :, y0:y0 + size, x0:x0 + size]
+        oldest = self._frames_pushed % 3
+        if oldest:
+            order = self._slot_orders[oldest]
+            # The full window is gathered into a reused tensor; crops are small enough to allocate
+            slots = torch.index_select(slots, 0, order, out=self._ordered) if origin is None else slots[order]
+        return slots.reshape(1, 9, *slots.shape[2:])
+
+    @property
+    def tensor(self) -> torch.Tensor:
+        return self.model_input()
+
+
+def analysis_resolution(width: int, height: int) -> tuple[int, int]:
+    """Size frames are analysed at: the source size, or scaled down to ANALYSIS_MAX_HEIGHT keeping the aspect ratio."""
+    max_height = config.ANALYSIS_MAX_HEIGHT
+    if not max_height or height <= max_height or width <= 0 or height <= 0:
+        return width, height
+    scaled_width = max(2, int(round(width * max_height / height / 2)) * 2)  # even sizes keep decoders happy
+    return scaled_width, int(max_height)
+
 def get_video_metadata(video_path: str) -> dict | None:
     """Extracts metadata (dimensions, fps, frame count) from a video file."""
     cap = cv2.VideoCapture(video_path)
@@ -71,10 +192,110 @@ def get_video_metadata(video_path: str) -> dict | None:
             metadata["fps"] = 30
         if metadata["frame_count"] <= 0:
              logging.warning(f"Video frame count reported as {metadata['frame_count']}. Analysis might fail.")
+        # Frames are decoded straight to the analysis resolution; coordinates are in analysis pixels.
+        metadata["analysis_width"], metadata["analysis_height"] = analysis_resolution(metadata["width"], metadata["height"])
+        metadata["analysis_scale"] = metadata["analysis_height"] / metadata["height"] if metadata["height"] > 0 else 1.0
 
     except Exception as e:
         logging.error(f"Error reading video metadata: {e}")
         metadata = None
     finally:
         cap.release()
-    return metadata
\ No newline at end of file
+    return metadata
+
+def _seek_pyav(container, stream, start_frame: int):
+    """
+    Seeks to the keyframe before start_frame. Returns the decoded frames from there and the number of
+    frames before the first one; falls back to the start of the video if positions can't be determined.
+    """
+    first_pts = stream.start_time or 0
+    if stream.average_rate and stream.time_base:
+        target_pts = first_pts + int((start_frame - 1) / (stream.average_rate * stream.time_base))
+        container.seek(target_pts, stream=stream, backward=True)
+        frames = container.decode(stream)
+        first_frame = next(frames, None)
+        if first_frame is not None and first_frame.pts is not None:
+            frames_before = int(round(float((first_frame.pts - first_pts) * stream.time_base * stream.average_rate)))
+            return itertools.chain([first_frame], frames), frames_before
+    logging.warning("Could not seek by timestamp; decoding from the start of the video.")
+    container.seek(0)
+    return container.decode(stream), 0
+
+
+def _read_frames_pyav(video_path: str, size: tuple[int, int] | None, start_frame: int) -> Iterator[tuple[int, np.ndarray]]:
+    import av
+
+    try:
+        container = av.open(video_path)
+    except Exception as e:
+        raise IOError(f"Failed to open video for processing: {video_path}") from e
+    try:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        frames, frame_number = container.decode(stream), 0
+        if start_frame > 1:
+            frames, frame_number = _seek_pyav(container, stream, start_frame)
+        for video_frame in frames:
+            frame_number += 1
+            if frame_number < start_frame:
+                continue
+            # Scaling and BGR conversion happen in libswscale, so full-resolution frames never reach numpy.
+            if size is not None:
+                video_frame = video_frame.reformat(width=size[0], height=size[1], format="bgr24", interpolation="AREA")
+            yield frame_number, video_frame.to_ndarray(format="bgr24")
+        logging.info("End of video or cannot read frame.")
+    finally:
+        container.close()
+
+
+def _read_frames_opencv(video_path: str, size: tuple[int, int] | None, start_frame: int) -> Iterator[tuple[int, np.ndarray]]:
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Failed to open video for processing: {video_path}")
+    frame_number = 0
+    try:
+        if start_frame > 1:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame - 1)
+            frame_number = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+            if frame_number > start_frame - 1:
+                logging.warning("Seek overshot; decoding from the start of the video.")
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                frame_number = 0
+            # grab() skips any remaining frames without converting them.
+            while frame_number < start_frame - 1 and cap.grab():
+                frame_number += 1
+        while True:
+            # cap.read() returns a freshly allocated array, so frames can be handed on without copying.
+            ret, frame = cap.read()
+            if not ret:
+                logging.info("End of video or cannot read frame.")
+                break
+            if size is not None:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            frame_number += 1
+            yield frame_number, frame
+    finally:
+        cap.release()
+
+
+def read_frames(video_path: str, size: tuple[int, int] | None = None,
+                start_frame: int = 1) -> Iterator[tuple[int, np.ndarray]]:
+    """
+    Decodes a video and yields (frame_number, frame) with 1-based frame numbers, beginning at start_frame.
+    If size (width, height) is given, frames are delivered at that size. VIDEO_DECODE_BACKEND selects PyAV, which scales inside
+    the decoder, or OpenCV; "auto" uses PyAV for scaled decoding when it is installed.
+    """
+    backend = config.VIDEO_DECODE_BACKEND
+    if backend == "auto" and size is None:
+        backend = "opencv"
+    elif backend == "auto":
+        try:
+            import av  # noqa: F401
+            backend = "pyav"
+        except ImportError:
+            backend = "opencv"
+    if backend == "pyav":
+        return _read_frames_pyav(video_path, size, start_frame)
+    if backend != "opencv":
+        logging.warning(f"Unknown VIDEO_DECODE_BACKEND '{backend}', using OpenCV.")
+    return _read_frames_opencv(video_path, size, start_frame)
@@ -0,0 +1,320 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+import torch
+
+from capstone.backend.ai import model_registry
+from capstone.backend.ai.ball_tracker.ball_tracker import BallTracker
+from capstone.backend.ai.ball_tracker.track_net import TrackNetV4
+from capstone.backend.ai.team_identifier import TeamIdentifier
+from capstone.backend.app.core import analysis_config as config
+from capstone.backend.app.services import analysis_service
+from capstone.backend.app.utils import video_utils
+from capstone.backend.app.utils.stats_calculator import StatsCalculator
+
+PITCH_BGR = (40, 140, 40)
+TEAM_SHIRTS_BGR = ((40, 40, 200), (200, 120, 30))
+SHORTS_BGR = (30, 30, 30)
+BALL_BGR = (255, 255, 255)
+
+
+def write_synthetic_video(path: str, num_frames: int, width: int, height: int, num_players: int = 14,
+                          fps: int = 25, seed: int = 0) -> list[dict]:
+    """
+    Writes a deterministic pitch video: a green field with lines, players of two shirt colors walking
+    around and a white ball that is passed between them. Returns the ground truth per frame:
+    {"ball": (x, y), "boxes": {player_id: [x1, y1, x2, y2]}, "teams": {player_id: team}}.
+    """
+    rng = np.random.default_rng(seed)
+    box_height = max(12, height // 9)
+    box_width = max(6, box_height // 3)
+    margin = np.array([box_width, box_height])
+    limits = np.array([width, height]) - margin
+    positions = rng.uniform(margin, limits, size=(num_players, 2))
+    velocities = rng.normal(0, 1.5, size=(num_players, 2))
+    teams = {player_id: player_id % 2 for player_id in range(1, num_players + 1)}
+
+    background = np.full((height, width, 3), PITCH_BGR, dtype=np.uint8)
+    line_color, thickness = (220, 220, 220), max(1, height // 180)
+    cv2.rectangle(background, (width // 40, height // 20), (width - width // 40, height - height // 20), line_color, thickness)
+    cv2.line(background, (width // 2, height // 20), (width // 2, height - height // 20), line_color, thickness)
+    cv2.circle(background, (width // 2, height // 2), height // 8, line_color, thickness)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open a video writer for {path}")
+
+    carrier, ball, target, pass_start, pass_length, pass_frames = 0, positions[0].copy(), None, None, 1, 0
+    truth = []
+    try:
+        for frame_index in range(num_frames):
+            velocities += rng.normal(0, 0.3, size=velocities.shape)
+            velocities = velocities.clip(-3, 3)
+            positions += velocities
+            bounced = (positions < margin) | (positions > limits)
+            velocities[bounced] = -velocities[bounced]
+            positions = positions.clip(margin, limits)
+
+            # The ball is dribbled at the carrier's feet, then passed to another player
+            if target is None and rng.random() < 0.04:
+                target, pass_start, pass_length = int(rng.integers(num_players)), ball.copy(), int(rng.integers(8, 20))
+                pass_frames = pass_length
+            if target is not None:
+                pass_frames -= 1
+                ball = pass_start + (positions[target] - pass_start) * (1 - pass_frames / pass_length)
+                if pass_frames <= 0:
+                    carrier, target = target, None
+            else:
+                ball = positions[carrier] + np.array([box_width, box_height / 2])
+            ball = ball.clip(0, [width - 1, height - 1])
+
+            frame = background.copy()
+            boxes = {}
+            for index, (cx, cy) in enumerate(positions):
+                player_id = index + 1
+                x1, y1 = int(cx - box_width / 2), int(cy - box_height / 2)
+                x2, y2 = x1 + box_width, y1 + box_height
+                cv2.rectangle(frame, (x1, y1), (x2, y1 + box_height * 2 // 3), TEAM_SHIRTS_BGR[teams[player_id]], -1)
+                cv2.rectangle(frame, (x1, y1 + box_height * 2 // 3), (x2, y2), SHORTS_BGR, -1)
+                boxes[player_id] = [x1, y1, x2, y2]
+            cv2.circle(frame, (int(ball[0]), int(ball[1])), max(2, height // 150), BALL_BGR, -1)
+            writer.write(frame)
+            truth.append({"ball": (float(ball[0]), float(ball[1])), "boxes": boxes, "teams": teams})
+    finally:
+        writer.release()
+    return truth
+
+
+def latency_summary(latencies: list[float]) -> dict:
+    """Throughput and latency percentiles (milliseconds) of per-call wall times in seconds."""
+    if not latencies:
+        return {"calls": 0}
+    values = np.asarray(latencies) * 1000
+    total = values.sum() / 1000
+    return {
+        "calls": len(values),
+        "per_s": len(values) / total if total > 0 else float("inf"),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p90_ms": float(np.percentile(values, 90)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def _timed(fn, args_list) -> tuple[dict, list]:
+    """Calls fn once per argument tuple; returns the latency summary and the results."""
+    latencies, results = [], []
+    for args in args_list:
+        start = time.perf_counter()
+        results.append(fn(*args))
+        latencies.append(time.perf_counter() - start)
+    return latency_summary(latencies), results
+
+
+@contextlib.contextmanager
+def _config_overrides(**values):
+    """Temporarily sets analysis_config attributes (the pipeline reads them at call time)."""
+    previous = {name: getattr(config, name) for name in values}
+    for name, value in values.items():
+        setattr(config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(config, name, value)
+
+
+def _ball_heatmap_logits(ball_center: tuple, scale: tuple[float, float]) -> torch.Tensor:
+    """Raw (logit) heatmap a trained TrackNet would give for a ball at ball_center (frame pixels)."""
+    ys = torch.arange(config.TRACKNET_HEIGHT, dtype=torch.float32).view(-1, 1)
+    xs = torch.arange(config.TRACKNET_WIDTH, dtype=torch.float32).view(1, -1)
+    x, y = ball_center[0] / scale[0], ball_center[1] / scale[1]
+    heatmap = torch.exp(-((xs - x)**2 + (ys - y)**2) / (2 * 2.5**2))
+    return torch.logit(heatmap.clamp(1e-4, 1 - 1e-4)).to(config.DEVICE)
+
+
+def _scale_truth(frame_truth: dict, scale: float) -> dict:
+    if scale == 1.0:
+        return frame_truth
+    return {
+        "ball": (frame_truth["ball"][0] * scale, frame_truth["ball"][1] * scale),
+        "boxes": {player_id: [v * scale for v in box] for player_id, box in frame_truth["boxes"].items()},
+        "teams": frame_truth["teams"],
+    }
+
+
+def benchmark_stages(video_path: str, truth: list[dict], tracknet_iterations: int) -> dict:
+    """Measures each analysis stage on its own, fed with the decoded frames and the ground truth."""
+
+    results = {}
+    metadata = video_utils.get_video_metadata(video_path)
+    # Frames are decoded at the analysis resolution, like run_video_analysis does
+    decode_size = (metadata["analysis_width"], metadata["analysis_height"])
+    truth = [_scale_truth(frame_truth, metadata["analysis_scale"]) for frame_truth in truth]
+
+    frames_iter = video_utils.read_frames(video_path, decode_size)
+    results["decode"], frames = _timed(lambda: next(frames_iter, (None, None))[1], [()] * len(truth))
+    frames = [frame for frame in frames if frame is not None]
+    truth = truth[:len(frames)]
+
+    windows = [deque(frames[i - 2:i + 1]) for i in range(2, len(frames))]
+    results["prepare_tracknet_input"], _ = _timed(video_utils.prepare_tracknet_input,
+                                                  [(w, config.TRACKNET_WIDTH, config.TRACKNET_HEIGHT) for w in windows])
+    input_buffer = video_utils.TrackNetInputBuffer(config.TRACKNET_WIDTH, config.TRACKNET_HEIGHT)
+    results["tracknet_input_buffer"], _ = _timed(input_buffer.push, [(frame,) for frame in frames])
+
+    # The configured inference backend, as BallTracker gets it
+    model = model_registry.get_tracknet_model()
+    with torch.no_grad():
+        model(input_buffer.tensor)  # warm-up
+        results["tracknet_forward"], _ = _timed(model, [(input_buffer.tensor,)] * tracknet_iterations)
+
+    # Random weights give meaningless heatmaps, so peak finding and tracking run on heatmaps with a
+    # peak at the true ball position.
+    ball_tracker = BallTracker(metadata)
+    scale = (ball_tracker.scale_width, ball_tracker.scale_height)
+    heatmaps = [_ball_heatmap_logits(frame_truth["ball"], scale) for frame_truth in truth]
+    results["peak_finding"], detections = _timed(ball_tracker._detections_from_heatmap, [(h,) for h in heatmaps])
+    results["ball_tracker_update"], _ = _timed(ball_tracker._update_tracker,
+                                               list(zip(detections, frames)))
+
+    player_boxes = [list(frame_truth["boxes"].values()) for frame_truth in truth]
+    results["color_extraction"], colors = _timed(video_utils.get_dominant_colors_lab_team,
+                                                 [(frame, boxes, metadata["analysis_scale"])
+                                                  for frame, boxes in zip(frames, player_boxes)])
+
+    features = []
+    for frame_truth, (colors_lab, has_color) in zip(truth, colors):
+        ids = np.asarray(list(frame_truth["boxes"]))[has_color].tolist()
+        features.append((list(colors_lab[has_color]), ids))
+    team_identifier = TeamIdentifier()
+    start = time.perf_counter()
+    team_identifier.initialize_from_samples([f for frame_features, _ in features[:config.INITIALIZATION_FRAMES] for f in frame_features])
+    results["team_initialization_s"] = time.perf_counter() - start
+    results["teams_initialized"] = team_identifier.teams_initialized
+    results["team_assignment"], teams = _timed(team_identifier.assign_teams_for_frame, features)
+
+    stats_calculator = StatsCalculator()
+    results["stats_update"], _ = _timed(stats_calculator.update,
+                                        [(i + 1, frame_truth["ball"], frame_truth["boxes"], frame_teams)
+                                         for i, (frame_truth, frame_teams) in enumerate(zip(truth, teams))])
+    return results
+
+
+def benchmark_end_to_end(video_path: str) -> dict:
+    """Times run_video_analysis on the video; models are loaded beforehand and not part of the time."""
+
+    frame_count = video_utils.get_video_metadata(video_path)["frame_count"]
+    model_registry.warm_up()
+    start = time.perf_counter()
+    result = analysis_service.run_video_analysis(video_path)
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": frame_count,
+        "seconds": elapsed,
+        "frames_per_s": frame_count / elapsed if elapsed > 0 else float("inf"),
+        "error": result.get("error"),
+    }
+
+
+def random_model_overrides(work_dir: str, include_yolo: bool = True) -> dict:
+    """
+    Saves randomly initialised TrackNet (and YOLO) weights into work_dir and returns the config
+    overrides that make the model registry load them. Checkpoints and the INT8 model are disabled.
+    """
+
+    torch.manual_seed(0)
+    tracknet_path = os.path.join(work_dir, "tracknet.pth")
+    torch.save(TrackNetV4().state_dict(), tracknet_path)
+    overrides = {"TRACKNET_MODEL_PATH": tracknet_path, "TRACKNET_USE_QUANTIZED": False, "CHECKPOINT_INTERVAL_FRAMES": 0}
+    if include_yolo:
+        from ultralytics import YOLO
+        yolo = YOLO("yolov8n.yaml")  # architecture only, no download
+        yolo_path = os.path.join(work_dir, "yolo.pt")
+        yolo.save(yolo_path)
+        overrides.update(YOLO_MODEL_PATH=yolo_path, PLAYER_CLASS_NAME=yolo.names[0])
+    return overrides
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "opencv": cv2.__version__,
+        "device": str(config.DEVICE),
+        "torch_threads": torch.get_num_threads(),
+        "machine": platform.machine(),
+    }
+
+
+def main():
+    """
+    Analysis performance benchmark on a deterministic synthetic pitch video: frames/s and latency
+    percentiles per stage (decode, TrackNet input, TrackNet forward, peak finding, ball tracker,
+    color extraction, team assignment, stats) and for the end-to-end run_video_analysis. Runs offline
+    with randomly initialised networks and writes JSON, so results can be compared between commits.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--players", type=int, default=14)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracknet-iterations", type=int, default=5)
+    parser.add_argument("--tracknet-height", type=int, default=config.TRACKNET_HEIGHT)
+    parser.add_argument("--tracknet-width", type=int, default=config.TRACKNET_WIDTH)
+    parser.add_argument("--skip-end-to-end", action="store_true")
+    args = parser.parse_args()
+
+    # analysis_service configures INFO logging on import; per-frame logs would skew the timings
+    logging.basicConfig(level=logging.WARNING, format=config.LOG_FORMAT, force=True)
+
+    report = {
+        "environment": _environment(),
+        "parameters": vars(args),
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        video_path = os.path.join(work_dir, "synthetic.avi")
+        truth = write_synthetic_video(video_path, args.frames, args.width, args.height, args.players, seed=args.seed)
+        overrides = random_model_overrides(work_dir, include_yolo=not args.skip_end_to_end)
+        with _config_overrides(TRACKNET_HEIGHT=args.tracknet_height, TRACKNET_WIDTH=args.tracknet_width, **overrides):
+            model_registry.clear()
+            try:
+                report["stages"] = benchmark_stages(video_path, truth, args.tracknet_iterations)
+                if not args.skip_end_to_end:
+                    report["end_to_end"] = benchmark_end_to_end(video_path)
+            finally:
+                model_registry.clear()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for stage, summary in report["stages"].items():
+        if isinstance(summary, dict):
+            print(f"{stage:<24} {summary.get('per_s', 0):>10.1f}/s  p50 {summary.get('p50_ms', 0):>8.2f} ms  p99 {summary.get('p99_ms', 0):>8.2f} ms")
+    if "end_to_end" in report:
+        print(f"{'end_to_end':<24} {report['end_to_end']['frames_per_s']:>10.1f} frames/s")
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import numpy as np
+import pytest
+import torch
+from unittest.mock import MagicMock, patch
+
+from capstone.backend.ai.ball_tracker.ball_tracker import BallTracker, heatmap_peak_candidates
+from capstone.backend.ai.ball_tracker.kalman_tracker import KalmanBallTracker
+
+
+class PeakModel:
+    """Fake TrackNet: a strong heatmap peak at a fixed model position, wherever its input is cropped from."""
+
+    def __init__(self, tracker_ref, peak_yx):
+        self.tracker_ref = tracker_ref
+        self.peak_yx = peak_yx
+        self.input_shapes = []
+
+    def __call__(self, frames):
+        self.input_shapes.append(tuple(frames.shape))
+        heatmaps = torch.full((frames.shape[0], 3, *frames.shape[2:]), -10.0)
+        # The crop origin is recovered from the view's offset into the buffer
+        buffer = self.tracker_ref[0].input_buffer.tensor
+        offset = frames.storage_offset() - buffer.storage_offset()
+        y0, x0 = divmod(offset, buffer.shape[-1])
+        y, x = self.peak_yx[0] - y0, self.peak_yx[1] - x0
+        if 0 <= y < heatmaps.shape[-2] and 0 <= x < heatmaps.shape[-1]:
+            heatmaps[:, :, y, x] = 10.0
+        return heatmaps
+
+
+@pytest.fixture(autouse=True)
+def small_model_size():
+    with patch('capstone.backend.app.core.analysis_config.TRACKNET_HEIGHT', 128), \
+         patch('capstone.backend.app.core.analysis_config.TRACKNET_WIDTH', 192), \
+         patch('capstone.backend.app.core.analysis_config.TRACKNET_ROI_SIZE', 64), \
+         patch('capstone.backend.app.core.analysis_config.TRACKNET_ROI_REFRESH_INTERVAL', 3), \
+         patch('capstone.backend.app.core.analysis_config.DEVICE', torch.device("cpu")):
+        yield
+
+
+@pytest.fixture
+def make_tracker():
+    def make(peak_yx=(40, 150)):
+        tracker_ref = []
+        model = PeakModel(tracker_ref, peak_yx)
+        with patch('capstone.backend.ai.model_registry.get_tracknet_model', return_value=model), \
+             patch('capstone.backend.ai.model_registry.get_deepsort_embedder', return_value=MagicMock()):
+            tracker = BallTracker({"width": 384, "height": 256, "fps": 25, "frame_count": 100})
+        tracker_ref.append(tracker)
+        for _ in range(3):
+            tracker.add_frame(np.zeros((256, 384, 3), dtype=np.uint8))
+        return tracker, model
+    return make
+
+
+class TestBallTrackerRoi:
+    def test_full_frame_without_confirmed_ball(self, make_tracker):
+        tracker, model = make_tracker()
+
+        heatmaps, origin = tracker._infer_heatmaps((1,))
+
+        assert origin == (0, 0)
+        assert model.input_shapes == [(1, 9, 128, 192)]
+
+    def test_crop_around_confirmed_ball_is_clamped_to_frame(self, make_tracker):
+        tracker, model = make_tracker()
+        tracker.last_known_ball_center_model = (180.0, 40.0)  # (x, y), near the right edge
+
+        heatmaps, origin = tracker._infer_heatmaps((1,))
+
+        assert origin == (8, 128)
+        assert model.input_shapes == [(1, 9, 64, 64)]
+        assert heatmaps.shape == (1, 1, 64, 64)
+
+    def test_roi_peak_maps_back_to_model_coordinates(self, make_tracker):
+        tracker, _ = make_tracker(peak_yx=(40, 150))
+        tracker.last_known_ball_center_model = (160.0, 50.0)
+
+        heatmaps, origin = tracker._infer_heatmaps((1,))
+        detections = tracker._detections_from_heatmap(heatmaps[0, 0], origin)
+
+        assert tracker._find_ball_peak(heatmaps[0, 0], origin) == (40, 150)
+        (left, top, width, height), _, _ = detections[0]
+        # Model (150, 40) is (300, 80) in the 384x256 frame
+        assert left + width / 2 == pytest.approx(300)
+        assert top + height / 2 == pytest.approx(80)
+
+    def test_periodic_full_frame_refresh(self, make_tracker):
+        tracker, model = make_tracker()
+        tracker.last_known_ball_center_model = (100.0, 60.0)
+
+        origins = [tracker._infer_heatmaps((1,))[1] for _ in range(5)]
+
+        assert [o == (0, 0) for o in origins] == [False, False, False, True, False]
+
+    def test_failed_roi_inference_falls_back_to_full_frames(self, make_tracker):
+        tracker, model = make_tracker()
+        tracker.last_known_ball_center_model = (100.0, 60.0)
+        full_model = model.__call__
+
+        def fixed_size_only(frames):
+            if frames.shape[-1] != 192:
+                raise RuntimeError("Got invalid dimensions for input")
+            return full_model(frames)
+        tracker.model = fixed_size_only
+
+        _, origin = tracker._infer_heatmaps((1,))
+        _, second_origin = tracker._infer_heatmaps((1,))
+
+        assert origin == (0, 0) and second_origin == (0, 0)
+        assert tracker.roi_size == 0
+
+    @patch('capstone.backend.app.core.analysis_config.TRACKNET_ROI_SIZE', 50)
+    def test_invalid_roi_size_disables_roi(self, make_tracker):
+        tracker, _ = make_tracker()
+
+        assert tracker.roi_size == 0
+
+
+class TestPeakExtraction:
+    def test_candidates_are_thresholded_local_maxima_strongest_first(self):
+        logits = torch.full((2, 20, 60), -10.0)
+        logits[0, 5, 5], logits[0, 5, 6] = 3.0, 2.5  # one tile: only its maximum is a candidate
+        logits[0, 15, 55] = 4.0
+        # BALL_DETECTION_THRESHOLD 0.3 is logit -0.847: compared without a sigmoid
+        logits[1, 2, 3], logits[1, 10, 20] = -0.84, -0.85
+
+        candidates = heatmap_peak_candidates(logits)
+
+        assert candidates == [[(15, 55), (5, 5)], [(2, 3)]]
+
+    @patch('capstone.backend.app.core.analysis_config.BALL_PEAK_TILE_SIZE', 4)
+    @patch('capstone.backend.app.core.analysis_config.BALL_PEAK_CANDIDATES', 2)
+    def test_candidates_are_capped(self):
+        logits = torch.full((1, 20, 30), -10.0)
+        for i, x in enumerate((3, 10, 17, 24)):
+            logits[0, 10 + i, x] = float(i)
+
+        assert heatmap_peak_candidates(logits) == [[(13, 24), (12, 17)]]
+
+    def test_blob_on_tile_corner_is_one_candidate(self):
+        logits = torch.full((1, 64, 64), -10.0)
+        logits[0, 14:18, 30:34] = 5.0  # straddles four tiles
+        logits[0, 16, 32] = 6.0
+
+        assert heatmap_peak_candidates(logits) == [[(16, 32)]]
+
+    def test_window_prefers_peak_near_last_ball(self, make_tracker):
+        tracker, _ = make_tracker()
+        logits = torch.full((200, 300), -10.0)
+        logits[100, 180], logits[40, 60] = 5.0, 1.0
+
+        assert tracker._find_ball_peak(logits) == (100, 180)
+        tracker.last_known_ball_center_model = (50.0, 30.0)
+        with patch('capstone.backend.ai.ball_tracker.ball_tracker.heatmap_peak_candidates') as candidates:
+            assert tracker._find_ball_peak(logits) == (40, 60)
+        candidates.assert_not_called()  # a window hit needs no global search
+        # Nothing in the window: the strongest peak overall
+        logits[40, 60] = -10.0
+        assert tracker._find_ball_peak(logits) == (100, 180)
+        logits[100, 180] = -10.0
+        assert tracker._find_ball_peak(logits) is None
+
+    def test_window_finds_ball_among_stronger_distractors(self, make_tracker):
+        tracker, _ = make_tracker()
+        logits = torch.full((288, 512), -10.0)
+        for y, x in ((32, 32), (32, 128), (128, 64)):  # blobs centred on tile corners
+            logits[y - 2:y + 2, x - 2:x + 2] = 5.0
+            logits[y, x] = 6.0
+        logits[200, 400] = 2.0
+        tracker.last_known_ball_center_model = (400.0, 200.0)
+
+        candidates = heatmap_peak_candidates(logits.unsqueeze(0))[0]
+
+        assert sorted(candidates[:3]) == [(32, 32), (32, 128), (128, 64)]  # one per blob
+        assert tracker._find_ball_peak(logits) == (200, 400)
+
+    @patch('capstone.backend.app.core.analysis_config.BALL_TRACKER_BACKEND', 'kalman')
+    def test_strided_window_uses_one_peak_per_frame(self, make_tracker):
+        tracker, _ = make_tracker(peak_yx=(40, 150))
+        frame = np.zeros((256, 384, 3), dtype=np.uint8)
+
+        results = tracker.track_ball_window([frame] * 3)
+
+        # The track is confirmed on the third consecutive detection
+        assert [tracked for _, tracked in results] == [False, False, True]
+        assert results[2][0] == pytest.approx((300, 80))
+
+
+class TestBallTrackerBackend:
+    @patch('capstone.backend.app.core.analysis_config.BALL_TRACKER_BACKEND', 'kalman')
+    def test_kalman_backend_needs_no_embedder(self, make_tracker):
+        with patch('capstone.backend.ai.model_registry.get_deepsort_embedder') as get_embedder:
+            tracker, _ = make_tracker()
+
+        assert isinstance(tracker.tracker, KalmanBallTracker)
+        get_embedder.assert_not_called()
+        frame = np.zeros((256, 384, 3), dtype=np.uint8)
+        for _ in range(3):
+            center, tracked = tracker._update_tracker([([90, 70, 20, 20], 0.9, 'ball')], frame)
+        assert tracked and center == pytest.approx((100, 80))
+        # Reported in model coordinates (384x256 frame -> 192x128 model)
+        assert tracker.last_known_ball_center_model == pytest.approx((50, 40))
@@ -0,0 +1,96 @@
+import pytest
+import torch
+from unittest.mock import patch
+
+from capstone.backend.ai.ball_tracker import inference_backends
+from capstone.backend.ai.ball_tracker.track_net import TrackNetV4
+
+
+@pytest.fixture
+def small_input_size(tmp_path):
+    with patch('capstone.backend.app.core.analysis_config.TRACKNET_HEIGHT', 32), \
+         patch('capstone.backend.app.core.analysis_config.TRACKNET_WIDTH', 48), \
+         patch('capstone.backend.app.core.analysis_config.DEVICE', torch.device("cpu")), \
+         patch('capstone.backend.app.core.analysis_config.TRACKNET_EXPORT_DIR', str(tmp_path / "exports")):
+        yield
+
+
+@pytest.fixture
+def model(small_input_size):
+    torch.manual_seed(0)
+    return TrackNetV4().eval()
+
+
+class TestTrackNetFusion:
+    def test_forward_weights_later_frames_by_motion(self):
+        torch.manual_seed(0)
+        model = TrackNetV4().eval()
+        x = torch.rand(2, 9, 32, 48)
+
+        with torch.no_grad():
+            motion_maps = model.generate_motion_attention_maps(x)
+            visual = model.decoder(*model.encoder(x))
+            fused = model(x)
+
+        assert torch.equal(fused[:, 0], visual[:, 0])
+        assert torch.equal(fused[:, 1], visual[:, 1] * motion_maps[:, 0])
+        assert torch.equal(fused[:, 2], visual[:, 2] * motion_maps[:, 1])
+
+
+    @pytest.mark.parametrize("channels", [(0,), (1,), (2,), (0, 1, 2), (2, 0)])
+    def test_infer_matches_forward(self, channels):
+        torch.manual_seed(0)
+        model = TrackNetV4().eval()
+        x = torch.rand(2, 9, 32, 48)
+
+        with torch.no_grad():
+            expected = model(x)[:, list(channels)]
+        actual = model.infer(x, channels)
+
+        assert torch.equal(actual, expected)
+
+    def test_infer_does_not_modify_input(self):
+        model = TrackNetV4().eval()
+        x = torch.rand(1, 9, 32, 48)
+        original = x.clone()
+
+        model.infer(x, (1,))
+
+        assert torch.equal(x, original)
+
+
+class TestInferenceBackends:
+    @pytest.mark.parametrize("backend", ["torchscript", "onnx"])
+    def test_backend_matches_eager(self, model, backend):
+        if backend == "onnx":
+            pytest.importorskip("onnxruntime")
+        built = inference_backends.build_backend(model, backend, inference_backends.example_input())
+
+        # A different batch size than the one the backend was built with
+        inputs = torch.rand(3, 9, 32, 48)
+        assert inference_backends.max_heatmap_difference(model, built, inputs) < 1e-4
+        assert built(inputs).shape == (3, 3, 32, 48)
+
+    def test_onnx_export_is_reused(self, model):
+        pytest.importorskip("onnxruntime")
+        with patch.object(inference_backends, 'export_onnx', wraps=inference_backends.export_onnx) as export:
+            inference_backends.build_backend(model, "onnx", inference_backends.example_input())
+            inference_backends.build_backend(model, "onnx", inference_backends.example_input())
+
+        assert export.call_count == 1
+
+    def test_load_backend_falls_back_when_heatmaps_differ(self, model):
+        broken = lambda x: model(x) + 1.0
+        with patch.object(inference_backends, 'build_backend', return_value=broken):
+            assert inference_backends.load_backend(model, "onnx") is model
+
+    def test_load_backend_falls_back_when_build_fails(self, model):
+        with patch.object(inference_backends, 'build_backend', side_effect=ImportError("no onnxruntime")):
+            assert inference_backends.load_backend(model, "onnx") is model
+
+    def test_unknown_backend_is_rejected(self, model):
+        with pytest.raises(ValueError):
+            inference_backends.build_backend(model, "tensorrt", inference_backends.example_input())
+
+    def test_throughput_is_positive(self, model):
+        assert inference_backends.measure_throughput(model, inference_backends.example_input(), iterations=2) > 0
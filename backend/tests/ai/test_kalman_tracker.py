@@ -0,0 +1,90 @@
+import pytest
+
+from capstone.backend.ai.ball_tracker.ball_tracker import select_ball_center
+from capstone.backend.ai.ball_tracker.compare_ball_trackers import continuity_report, synthetic_peaks
+from capstone.backend.ai.ball_tracker.kalman_tracker import KalmanBallTracker
+
+
+def detection(cx, cy, size=10):
+    return [cx - size / 2, cy - size / 2, size, size], 0.9, 'ball'
+
+
+class TestKalmanBallTracker:
+    def test_confirms_after_n_init_hits(self):
+        tracker = KalmanBallTracker(max_age=5, n_init=3)
+
+        states = [tracker.update_tracks([detection(100 + 5 * i, 50)])[0].is_confirmed() for i in range(3)]
+
+        assert states == [False, False, True]
+        assert tracker.tracks[0].time_since_update == 0
+
+    def test_tentative_track_is_deleted_on_miss(self):
+        tracker = KalmanBallTracker(max_age=5, n_init=3)
+        tracker.update_tracks([detection(100, 50)])
+
+        assert tracker.update_tracks([]) == []
+
+    def test_confirmed_track_survives_until_max_age(self):
+        tracker = KalmanBallTracker(max_age=2, n_init=1)
+        tracker.update_tracks([detection(100, 50)])
+
+        assert len(tracker.update_tracks([])) == 1
+        assert len(tracker.update_tracks([])) == 1
+        assert tracker.update_tracks([]) == []
+
+    def test_follows_constant_velocity_and_coasts_over_a_dropout(self):
+        tracker = KalmanBallTracker(max_age=5, n_init=3)
+        for i in range(20):
+            tracks = tracker.update_tracks([detection(100 + 8 * i, 200 - 3 * i)])
+        center = select_ball_center(tracks)
+        assert center == pytest.approx((100 + 8 * 19, 200 - 3 * 19), abs=1.0)
+
+        # No detection: the track is predicted one step on and still reported (time_since_update == 1)
+        center = select_ball_center(tracker.update_tracks([]))
+        assert center == pytest.approx((100 + 8 * 20, 200 - 3 * 20), abs=2.0)
+
+    def test_gating_rejects_far_detection(self):
+        tracker = KalmanBallTracker(max_age=5, n_init=1)
+        for i in range(5):
+            tracker.update_tracks([detection(100 + 5 * i, 50)])
+        track = tracker.tracks[0]
+
+        tracks = tracker.update_tracks([detection(600, 400)])
+
+        assert len(tracks) == 2
+        assert track.time_since_update == 1
+        assert tracks[1].to_tlbr()[:2] == pytest.approx([595, 395])
+
+    def test_nearest_detection_wins(self):
+        tracker = KalmanBallTracker(max_age=5, n_init=1)
+        for i in range(5):
+            tracker.update_tracks([detection(100 + 5 * i, 50)])
+
+        tracker.update_tracks([detection(140, 60), detection(126, 51)])
+
+        assert select_ball_center(tracker.tracks) == pytest.approx((126, 51), abs=2.0)
+
+
+class TestTrackerComparison:
+    def test_kalman_tracks_synthetic_ball(self):
+        truth, peaks = synthetic_peaks(300, 640, 360)
+        tracker = KalmanBallTracker(max_age=10, n_init=3)
+        centers = []
+        for peak in peaks:
+            centers.append(select_ball_center(tracker.update_tracks([] if peak is None else [detection(*peak)])))
+
+        report = continuity_report(centers, truth, max_error=20)
+
+        assert report["coverage"] > 0.8
+        assert report["mean_error_px"] < 5
+
+    def test_continuity_report_counts_breaks(self):
+        centers = [(0, 0), (1, 1), None, (3, 3), None, None]
+        reference = [(0, 0), (1, 1), (2, 2), (3, 30), (4, 4), None]
+
+        report = continuity_report(centers, reference, max_error=10)
+
+        assert report["coverage"] == 0.5
+        assert report["track_breaks"] == 2
+        assert report["off_ball_frames"] == 1
+        assert report["mean_error_px"] == pytest.approx(27 / 3)
@@ -0,0 +1,151 @@
+import pytest
+import numpy as np
+import torch
+from unittest.mock import MagicMock, patch
+
+from capstone.backend.ai.player_tracker.player_tracker import PlayerTracker
+
+
+def yolo_result(boxes, ids, confidences):
+    result = MagicMock()
+    result.boxes.xyxy = torch.tensor(boxes, dtype=torch.float32)
+    result.boxes.id = torch.tensor(ids, dtype=torch.float32)
+    result.boxes.conf = torch.tensor(confidences, dtype=torch.float32)
+    return [result]
+
+
+@pytest.fixture
+def frame():
+    frame = np.zeros((200, 300, 3), dtype=np.uint8)
+    frame[:, :] = [0, 255, 0]
+    frame[20:100, 20:120] = [0, 0, 255]
+    return frame
+
+
+@pytest.fixture
+def model():
+    model = MagicMock()
+    model.names = {0: 'player'}
+    model.predictor = None
+    return model
+
+
+@pytest.fixture
+def tracker(model):
+    with patch('capstone.backend.ai.model_registry.get_yolo_model', return_value=model):
+        return PlayerTracker()
+
+
+class TestPlayerTracker:
+    def test_detects_every_frame_by_default(self, tracker, model, frame):
+        model.track.return_value = yolo_result([[20, 20, 60, 100]], [4], [0.9])
+
+        for _ in range(3):
+            boxes, features, ids, bboxes = tracker.track_players(frame)
+
+        assert model.track.call_count == 3
+        assert boxes == {4: [20, 20, 60, 100]}
+        assert ids == [4]
+        assert len(features) == 1 and features[0].shape == (3,)
+        assert bboxes == [(20, 20, 60, 100)]
+
+    @patch('capstone.backend.app.core.analysis_config.PLAYER_DETECTION_STRIDE', 3)
+    def test_stride_propagates_boxes_between_detections(self, tracker, model, frame):
+        model.track.side_effect = [
+            yolo_result([[20, 20, 60, 100]], [4], [0.9]),
+            yolo_result([[26, 20, 66, 100]], [4], [0.9]),
+            yolo_result([[32, 20, 72, 100]], [4], [0.9]),
+        ]
+
+        results = [tracker.track_players(frame)[0] for _ in range(7)]
+
+        assert model.track.call_count == 3  # frames 1, 4 and 7
+        assert results[1] == {4: [20, 20, 60, 100]}  # no velocity known yet
+        assert results[3] == {4: [26, 20, 66, 100]}
+        assert results[4] == {4: [27, 20, 67, 100]}  # velocity smoothed from 2 px/frame
+        assert results[6] == {4: [32, 20, 72, 100]}
+
+    @patch('capstone.backend.app.core.analysis_config.PLAYER_DETECTION_STRIDE', 5)
+    def test_propagated_boxes_keep_up_with_constant_speed(self, tracker, model, frame):
+        # 10 px/frame: each detection is 50 px on from the previous one
+        model.track.side_effect = [yolo_result([[10 * i, 20, 10 * i + 20, 100]], [4], [0.9]) for i in range(0, 30, 5)]
+
+        results = [tracker.track_players(frame)[0] for _ in range(30)]
+
+        assert model.track.call_count == 6
+        # The smoothed velocity converges on the true speed: by the last interval boxes lag by under 2 px
+        for i in range(26, 30):
+            assert results[i][4][0] == pytest.approx(10 * i, abs=2)
+
+    @patch('capstone.backend.app.core.analysis_config.PLAYER_DETECTION_STRIDE', 5)
+    def test_low_confidence_triggers_redetection(self, tracker, model, frame):
+        model.track.return_value = yolo_result([[20, 20, 60, 100]], [4], [0.2])
+
+        tracker.track_players(frame)
+        tracker.track_players(frame)
+
+        assert model.track.call_count == 2
+
+    @patch('capstone.backend.app.core.analysis_config.PLAYER_DETECTION_STRIDE', 5)
+    def test_propagated_boxes_stay_inside_frame(self, tracker, model, frame):
+        tracker.track_motion = {1: (np.array([280.0, 10.0, 299.0, 60.0]), np.array([30.0, 0.0, 30.0, 0.0]))}
+        tracker.frames_since_detection = 1
+
+        boxes, _, _, _ = tracker.track_players(frame)
+
+        assert model.track.call_count == 0
+        assert boxes == {}
+
+    def test_missing_player_class_returns_empty(self, model, frame):
+        model.names = {0: 'referee'}
+        with patch('capstone.backend.ai.model_registry.get_yolo_model', return_value=model):
+            tracker = PlayerTracker()
+
+        assert tracker.track_players(frame) == ({}, [], [], [])
+
+
+def predict_result(boxes, confidences, frame_shape=(200, 300)):
+    from ultralytics.engine.results import Boxes
+
+    data = torch.tensor([box + [conf, 0.0] for box, conf in zip(boxes, confidences)], dtype=torch.float32)
+    result = MagicMock()
+    result.boxes = Boxes(data.reshape(-1, 6), frame_shape)
+    return result
+
+
+@patch('capstone.backend.app.core.analysis_config.PLAYER_DETECTION_BATCH_SIZE', 4)
+class TestPlayerTrackerBatch:
+    def test_predicts_once_per_batch_and_keeps_track_ids(self, tracker, model, frame):
+        model.predict.side_effect = lambda frames, **kwargs: [
+            predict_result([[20, 20, 60, 100], [150, 30, 190, 120]], [0.9, 0.8]) for _ in frames]
+
+        first = tracker.track_players_batch([frame] * 4)
+        second = tracker.track_players_batch([frame] * 4)
+
+        assert model.predict.call_count == 2
+        assert len(model.predict.call_args.args[0]) == 4
+        model.track.assert_not_called()
+        ids = set(second[-1][0])
+        assert len(ids) == 2
+        assert all(set(boxes) == ids for boxes, _, _, _ in first[1:] + second)
+        assert sorted(second[-1][0].values()) == [[20, 20, 60, 100], [150, 30, 190, 120]]
+
+    @patch('capstone.backend.app.core.analysis_config.PLAYER_DETECTION_STRIDE', 2)
+    def test_stride_only_sends_detection_frames(self, tracker, model, frame):
+        model.predict.side_effect = lambda frames, **kwargs: [
+            predict_result([[20, 20, 60, 100]], [0.9]) for _ in frames]
+
+        results = tracker.track_players_batch([frame] * 4)
+
+        assert len(model.predict.call_args.args[0]) == 2  # frames 1 and 3
+        assert len(results) == 4
+
+    def test_batch_size_one_uses_track(self, tracker, model, frame):
+        model.track.return_value = yolo_result([[20, 20, 60, 100]], [4], [0.9])
+
+        with patch('capstone.backend.app.core.analysis_config.PLAYER_DETECTION_BATCH_SIZE', 1):
+            results = tracker.track_players_batch([frame] * 2)
+
+        assert model.track.call_count == 2
+        model.predict.assert_not_called()
+        assert results[1][0] == {4: [20, 20, 60, 100]}
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+from unittest.mock import patch
+
+from capstone.backend.ai.ball_tracker import quantization
+from capstone.backend.ai.ball_tracker.track_net import TrackNetV4
+
+
+@pytest.fixture(autouse=True)
+def small_input_size():
+    with patch('capstone.backend.app.core.analysis_config.TRACKNET_HEIGHT', 32), \
+         patch('capstone.backend.app.core.analysis_config.TRACKNET_WIDTH', 48):
+        yield
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    """A tiny TrackNetDataset: each sample is 3 frames with a white ball moving over a green pitch."""
+    rng = np.random.default_rng(0)
+    for sample in range(6):
+        for i in range(3):
+            image_dir = tmp_path / f"frame{sample:03d}" / f"image-{i}"
+            image_dir.mkdir(parents=True)
+            image = np.full((64, 96, 3), (40, 140, 40), dtype=np.uint8)
+            x, y = int(rng.integers(10, 86)), int(rng.integers(10, 54))
+            image[y - 2:y + 2, x - 2:x + 2] = 255
+            Image.fromarray(image).save(image_dir / "image.jpg")
+            (image_dir / "label.txt").write_text(f"0 {x / 96} {y / 64} 0.05 0.05\n")
+    return str(tmp_path)
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return TrackNetV4().eval()
+
+
+@pytest.fixture
+def quantized(model, dataset_dir):
+    calibration = quantization.calibration_loader(dataset_dir, num_samples=4, batch_size=2)
+    return quantization.quantize_tracknet(model, (images for images, _ in calibration))
+
+
+class TestQuantization:
+    def test_calibration_frames_match_live_preprocessing(self, dataset_dir):
+        images, _ = next(iter(quantization.calibration_loader(dataset_dir, num_samples=2, batch_size=2)))
+
+        assert images.shape == (2, 9, 32, 48)
+        # RGB in [0, 1] like TrackNetInputBuffer, not mean/std normalised
+        assert images.min() >= 0 and images.max() <= 1
+
+    def test_quantized_model_tracks_fp32(self, model, quantized):
+        x = torch.rand(2, 9, 32, 48)
+        with torch.no_grad():
+            expected, actual = torch.sigmoid(model(x)), torch.sigmoid(quantized(x))
+
+        assert actual.shape == expected.shape
+        assert (expected - actual).abs().max() < 0.05
+        assert any(isinstance(m, torch.ao.nn.quantized.Conv2d) or type(m).__module__.startswith("torch.ao.nn.intrinsic.quantized")
+                   for m in quantized.modules())
+
+    def test_saved_model_loads_identically(self, quantized, tmp_path):
+        path = tmp_path / "int8.pth"
+        torch.save(quantized.state_dict(), path)
+
+        loaded = quantization.load_quantized_tracknet(str(path))
+
+        x = torch.rand(1, 9, 32, 48)
+        with torch.no_grad():
+            assert torch.equal(loaded(x), quantized(x))
+
+    def test_peak_report_and_gate(self, model, quantized, dataset_dir):
+        evaluation = quantization.calibration_loader(dataset_dir, num_samples=2, batch_size=2, offset=4)
+        report = quantization.compare_peaks(model, model, (images for images, _ in evaluation))
+
+        assert report["heatmaps"] == 6
+        assert report["detection_agreement"] == 1.0
+        assert report["mean_peak_error_px"] == 0.0
+        assert quantization.passes_accuracy_gate(report)
+        assert not quantization.passes_accuracy_gate({**report, "mean_peak_error_px": 50.0})
+        assert not quantization.passes_accuracy_gate({**report, "detection_agreement": 0.5})
+
+    def test_peaks_are_located_per_channel(self):
+        logits = torch.full((1, 3, 4, 5), -10.0)
+        logits[0, 0, 1, 2] = 10.0
+        logits[0, 2, 3, 4] = 10.0
+
+        coords, confidence = quantization._peaks(logits)
+
+        assert coords[0, 0].tolist() == [1, 2] and coords[0, 2].tolist() == [3, 4]
+        assert confidence[0, 0] > 0.99 and confidence[0, 1] < 0.01
@@ -0,0 +1,93 @@
+import json
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from capstone.backend.ai.team_identifier import TeamIdentifier
+
+DARK = np.array([20.0, 0.0, 0.0])
+LIGHT = np.array([80.0, 10.0, 10.0])
+
+
+class TestTeamIdentifier:
+    @pytest.fixture
+    def identifier(self):
+        identifier = TeamIdentifier()
+        identifier.reference_team_colors_lab = [DARK, LIGHT]
+        identifier.teams_initialized = True
+        return identifier
+
+    def test_initialize_from_samples_orders_teams_by_lightness(self):
+        identifier = TeamIdentifier()
+        rng = np.random.default_rng(0)
+        samples = list(LIGHT + rng.normal(0, 1, (10, 3))) + list(DARK + rng.normal(0, 1, (10, 3)))
+
+        assert identifier.initialize_from_samples(samples) is True
+        assert np.linalg.norm(identifier.reference_team_colors_lab[0] - DARK) < 2
+        assert np.linalg.norm(identifier.reference_team_colors_lab[1] - LIGHT) < 2
+
+    def test_initialize_from_too_few_samples(self):
+        identifier = TeamIdentifier()
+
+        assert identifier.initialize_from_samples([DARK, LIGHT]) is False
+        assert identifier.assign_teams_for_frame([DARK], [1]) == {}
+
+    def test_assigns_nearest_reference_color(self, identifier):
+        teams = identifier.assign_teams_for_frame([DARK + 5, LIGHT - 5, LIGHT], [1, 2, 3])
+
+        assert teams == {1: 0, 2: 1, 3: 1}
+
+    def test_single_player_is_assigned(self, identifier):
+        assert identifier.assign_teams_for_frame([LIGHT], [7]) == {7: 1}
+
+    def test_stable_track_does_not_flip_on_single_outlier(self, identifier):
+        for _ in range(10):
+            identifier.assign_teams_for_frame([DARK], [1])
+
+        assert identifier.assign_teams_for_frame([LIGHT], [1]) == {1: 0}
+
+    @patch('capstone.backend.app.core.analysis_config.TEAM_RECHECK_INTERVAL_FRAMES', 5)
+    def test_locked_track_is_only_rechecked_periodically(self, identifier):
+        while abs(identifier.track_teams.get(1, {'score': 0})['score']) < 0.9:
+            identifier.assign_teams_for_frame([DARK], [1])
+        last_checked = identifier.track_teams[1]['last_checked']
+
+        for _ in range(4):
+            identifier.assign_teams_for_frame([LIGHT], [1])
+        assert identifier.track_teams[1]['last_checked'] == last_checked
+
+        identifier.assign_teams_for_frame([LIGHT], [1])
+        assert identifier.track_teams[1]['last_checked'] > last_checked
+
+    def test_persistent_color_change_switches_team(self, identifier):
+        identifier.assign_teams_for_frame([DARK], [1])
+        for _ in range(5):
+            teams = identifier.assign_teams_for_frame([LIGHT], [1])
+
+        assert teams == {1: 1}
+
+    @patch('capstone.backend.app.core.analysis_config.TEAM_CACHE_MAX_AGE_FRAMES', 3)
+    def test_stale_tracks_are_evicted(self, identifier):
+        identifier.assign_teams_for_frame([DARK], [1])
+        for _ in range(6):
+            identifier.assign_teams_for_frame([LIGHT], [2])
+
+        assert 1 not in identifier.track_teams
+        assert 2 in identifier.track_teams
+
+    def test_state_round_trip(self, identifier):
+        identifier.assign_teams_for_frame([DARK], [1])
+
+        restored = TeamIdentifier()
+        restored.load_state(json.loads(json.dumps(identifier.get_state())))
+
+        assert restored.teams_initialized
+        assert np.allclose(restored.reference_team_colors_lab[0], DARK)
+        assert restored.track_teams == {}
+        assert restored.assign_teams_for_frame([LIGHT, DARK], [5, 6]) == {5: 1, 6: 0}
+
+    def test_uninitialized_state_round_trip(self):
+        restored = TeamIdentifier()
+        restored.load_state(TeamIdentifier().get_state())
+
+        assert not restored.teams_initialized
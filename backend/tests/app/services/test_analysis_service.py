@@ -0,0 +1,393 @@
+import cv2
+import numpy as np
+import pytest
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from capstone.backend.app.services import analysis_service
+from capstone.backend.app.services.analysis_service import FrameAnalysis, _team_stage, _ProgressReporter, _drain_progress
+from capstone.backend.app.utils.analysis_checkpoint import CheckpointStore
+from capstone.backend.app.utils.stats_calculator import StatsCalculator
+from capstone.backend.app.utils.video_cache import VideoCache
+
+
+def make_item(frame_number):
+    return FrameAnalysis(frame_number, None, player_features=[[frame_number, 0, 0]], player_ids=[frame_number])
+
+
+@pytest.fixture
+def team_identifier():
+    identifier = MagicMock()
+    identifier.teams_initialized = False
+
+    def initialize(samples):
+        identifier.teams_initialized = True
+        return True
+
+    identifier.initialize_from_samples.side_effect = initialize
+    identifier.assign_teams_for_frame.side_effect = lambda features, ids: {ids[0]: 0}
+    return identifier
+
+
+class TestTeamStage:
+    @patch('capstone.backend.app.core.analysis_config.INITIALIZATION_FRAMES', 3)
+    def test_initializes_from_first_frames_and_assigns_retroactively(self, team_identifier):
+        results = list(_team_stage(team_identifier, iter([make_item(i) for i in range(1, 6)])))
+
+        team_identifier.initialize_from_samples.assert_called_once_with([[1, 0, 0], [2, 0, 0], [3, 0, 0]])
+        assert [item.frame_number for item in results] == [1, 2, 3, 4, 5]
+        assert [item.player_teams for item in results] == [{i: 0} for i in range(1, 6)]
+
+    @patch('capstone.backend.app.core.analysis_config.INITIALIZATION_FRAMES', 10)
+    def test_short_video_initializes_at_end(self, team_identifier):
+        results = list(_team_stage(team_identifier, iter([make_item(i) for i in range(1, 3)])))
+
+        team_identifier.initialize_from_samples.assert_called_once()
+        assert [item.player_teams for item in results] == [{1: 0}, {2: 0}]
+
+    def test_skips_initialization_when_teams_known(self, team_identifier):
+        team_identifier.teams_initialized = True
+
+        results = list(_team_stage(team_identifier, iter([make_item(1)])))
+
+        team_identifier.initialize_from_samples.assert_not_called()
+        assert results[0].player_teams == {1: 0}
+
+
+class TestProgressReporting:
+    @patch('capstone.backend.app.core.analysis_config.ANALYSIS_PROGRESS_INTERVAL_SECONDS', 2.0)
+    def test_reports_at_bounded_rate_with_accumulated_stats(self):
+        callback = MagicMock()
+        clock = iter([0.0, 1.0, 2.5, 2.5, 3.0])
+        with patch('capstone.backend.app.services.analysis_service.time.monotonic', lambda: next(clock)):
+            reporter = _ProgressReporter(100, callback)
+            reporter.update(10, {"10": {"POSSESSION": {"team1": 100, "team2": 0}}})
+            reporter.update(25, {"25": {"POSSESSION": {"team1": 60, "team2": 40}}})
+            reporter.update(30, None)
+
+        callback.assert_called_once()
+        update = callback.call_args.args[0]
+        assert update["progress"] == {"frames_done": 25, "frame_count": 100, "fps": 10.0, "eta_seconds": 7.5}
+        assert set(update["stats"]) == {"10", "25"}
+        assert reporter.pending_stats == {}
+
+    def test_callback_errors_do_not_stop_analysis(self):
+        reporter = _ProgressReporter(10, MagicMock(side_effect=RuntimeError("queue gone")))
+        reporter.update(1, {"1": {}})
+
+        reporter.flush()
+
+        assert reporter.pending_stats == {}
+
+    def test_drain_merges_queued_messages(self):
+        progress_queue = queue.Queue()
+        progress_queue.put({"progress": {"frames_done": 1}, "stats": {"1": "a"}})
+        progress_queue.put({"progress": {"frames_done": 2}, "stats": {"2": "b"}})
+
+        assert _drain_progress(progress_queue) == {"progress": {"frames_done": 2}, "stats": {"1": "a", "2": "b"}}
+        assert _drain_progress(progress_queue) is None
+
+
+class TestPoolRestarts:
+    @pytest.fixture(autouse=True)
+    def fake_executors(self):
+        executors = []
+
+        def new_executor():
+            if analysis_service._analysis_executor is None:
+                analysis_service._analysis_executor = MagicMock()
+                executors.append(analysis_service._analysis_executor)
+            return analysis_service._analysis_executor
+
+        with patch.object(analysis_service, 'get_analysis_executor', new_executor):
+            yield executors
+        analysis_service._analysis_executor = None
+
+    @pytest.mark.asyncio
+    async def test_resubmits_after_worker_death(self, fake_executors):
+        run_once = AsyncMock(side_effect=[BrokenProcessPool("worker died"), {"stats": {}}])
+        with patch.object(analysis_service, '_run_in_pool_once', run_once):
+            result = await analysis_service.run_video_analysis_in_pool("video.mp4")
+
+        assert result == {"stats": {}}
+        assert run_once.call_count == 2
+        # The second attempt ran on a fresh pool
+        assert run_once.call_args_list[1].args[0] is fake_executors[1]
+        fake_executors[0].shutdown.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch('capstone.backend.app.core.config.settings.analysis_max_restarts', 1)
+    async def test_gives_up_after_max_restarts(self):
+        run_once = AsyncMock(side_effect=BrokenProcessPool("worker died"))
+        with patch.object(analysis_service, '_run_in_pool_once', run_once):
+            with pytest.raises(BrokenProcessPool):
+                await analysis_service.run_video_analysis_in_pool("video.mp4")
+
+        assert run_once.call_count == 2
+
+    def test_reset_ignores_already_replaced_pool(self, fake_executors):
+        old_executor = MagicMock()
+        current = analysis_service.get_analysis_executor()
+
+        analysis_service._reset_analysis_executor(old_executor)
+
+        assert analysis_service._analysis_executor is current
+        current.shutdown.assert_not_called()
+
+
+def make_segment(first_frame, frames, possessors):
+    """possessors: per-frame (id, team) or None, for frames starting at frames[0]."""
+    return {
+        "first_frame": first_frame,
+        "frame_numbers": list(frames),
+        "possessor_ids": [p[0] if p else None for p in possessors],
+        "possessor_teams": [p[1] if p else -1 for p in possessors],
+    }
+
+
+class TestSegmentedAnalysis:
+    def test_segment_bounds_cover_all_frames(self):
+        bounds = analysis_service._segment_bounds(10, 3)
+
+        assert bounds == [(1, 3), (4, 7), (8, None)]
+        assert analysis_service._segment_bounds(2, 4) == [(1, 1), (2, None)]
+
+    def test_frames_until_stops_and_closes_decoder(self):
+        closed = []
+
+        def frames():
+            try:
+                for n in range(1, 10):
+                    yield n, None
+            finally:
+                closed.append(True)
+
+        assert [n for n, _ in analysis_service._frames_until(frames(), 4)] == [1, 2, 3, 4]
+        assert closed == [True]
+
+    def test_single_segment_matches_sequential_stats(self):
+        possessors = [(1, 0), (1, 0), (2, 0), None, (3, 1), (3, 1), (4, 1), (5, 0)]
+        calculator = StatsCalculator()
+        expected = {}
+        for n, p in enumerate(possessors, start=1):
+            calculator.update_possessor(n, *(p or (None, -1)))
+            expected.update(calculator.get_stats_update(n) or {})
+
+        merged = analysis_service.merge_segment_results([make_segment(1, range(1, 9), possessors)])
+
+        assert merged["stats"] == expected
+        assert merged["summary"] == calculator.get_final_stats()
+
+    def test_possession_across_boundary_is_not_a_pass(self):
+        # Segment 2 calls the possessor of frames 3-6 track 7; the overlap (frames 3-4) shows it is track 1.
+        first = make_segment(1, range(1, 5), [(1, 0)] * 4)
+        second = make_segment(5, range(3, 9), [(7, 0)] * 6)
+
+        merged = analysis_service.merge_segment_results([second, first])
+
+        assert merged["summary"]["final_passes"] == {"team1": 0, "team2": 0}
+        assert merged["summary"]["final_possession"] == {"team1": 100, "team2": 0}
+
+    def test_pass_at_boundary_is_counted_once(self):
+        first = make_segment(1, range(1, 5), [(1, 0)] * 4)
+        # Overlap frames are ignored for counting; the pass to track 8 happens on frame 5.
+        second = make_segment(5, range(3, 9), [(7, 0), (7, 0), (8, 0), (8, 0), (8, 0), (8, 0)])
+
+        merged = analysis_service.merge_segment_results([first, second])
+
+        assert merged["summary"]["final_passes"] == {"team1": 1, "team2": 0}
+        assert "5" in merged["stats"] and merged["stats"]["5"]["PASS"] == {"team1": 1}
+
+    @pytest.mark.asyncio
+    @patch('capstone.backend.app.core.analysis_config.ANALYSIS_SEGMENTS', 2)
+    async def test_runs_segments_and_merges(self):
+        plan = {"video_path": "local.mp4", "video_metadata": {"frame_count": 8}, "teams": {"teams_initialized": True}}
+        segments = {
+            1: make_segment(1, range(1, 5), [(1, 0)] * 4),
+            5: make_segment(5, range(3, 9), [(2, 1)] * 6),
+        }
+
+        def analyze_segment(video_path, video_metadata, first_frame, last_frame, team_state):
+            assert video_path == "local.mp4" and team_state == plan["teams"]
+            return segments[first_frame]
+
+        on_progress = AsyncMock()
+        with ThreadPoolExecutor(max_workers=2) as executor, \
+                patch.object(analysis_service, 'prepare_segmented_analysis', return_value=plan), \
+                patch.object(analysis_service, 'analyze_segment', side_effect=analyze_segment):
+            result = await analysis_service._run_segmented_in_pool_once(executor, "video.mp4", on_progress)
+
+        assert result["summary"]["final_possession"] == {"team1": 50, "team2": 50}
+        assert on_progress.call_count == 2
+        assert on_progress.call_args.args[0]["progress"]["frames_done"] == 8
+
+    @pytest.mark.asyncio
+    @patch('capstone.backend.app.core.analysis_config.ANALYSIS_SEGMENTS', 2)
+    async def test_segment_error_fails_analysis(self):
+        plan = {"video_path": "local.mp4", "video_metadata": {"frame_count": 8}, "teams": {"teams_initialized": False}}
+        with ThreadPoolExecutor(max_workers=2) as executor, \
+                patch.object(analysis_service, 'prepare_segmented_analysis', return_value=plan), \
+                patch.object(analysis_service, 'analyze_segment', return_value={"error": "boom"}):
+            result = await analysis_service._run_segmented_in_pool_once(executor, "video.mp4", None)
+
+        assert result == {"error": "boom"}
+
+
+def frame_number_of(frame):
+    """The synthetic test videos encode each frame's number in its brightness."""
+    return int(round(frame.mean() / 8))
+
+
+@pytest.fixture
+def numbered_video(tmp_path):
+    path = str(tmp_path / "numbered.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (320, 240))
+    for n in range(1, 31):
+        writer.write(np.full((240, 320, 3), n * 8, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+class FakeBallTracker:
+    """Ball always at (10, 10); records the frames it was given."""
+    frames_added = []
+
+    def __init__(self, video_metadata):
+        self.state = None
+
+    def add_frame(self, frame):
+        FakeBallTracker.frames_added.append(frame_number_of(frame))
+        return True
+
+    def track_ball(self, frame):
+        return (10.0, 10.0), True
+
+    def track_ball_window(self, frames):
+        return [((10.0, 10.0), True)] * len(frames)
+
+    def get_state(self):
+        return {"ball": True}
+
+    def load_state(self, state):
+        self.state = state
+
+
+class FakePlayerTracker:
+    """Three players; the one at the ball changes every 4 frames: 1, 2 (team 1), 3 (team 2), ..."""
+    far_box = [280, 200, 300, 220]
+    frame_sizes = []
+
+    def __init__(self, analysis_scale=1.0):
+        self.analysis_scale = analysis_scale
+
+    def track_players(self, frame):
+        FakePlayerTracker.frame_sizes.append(frame.shape[:2])
+        return self.track_players_batch([frame])[0]
+
+    def track_players_batch(self, frames):
+        results = []
+        for frame in frames:
+            possessor = (frame_number_of(frame) - 1) // 4 % 3 + 1
+            boxes = {player_id: [0, 0, 20, 20] if player_id == possessor else self.far_box for player_id in (1, 2, 3)}
+            results.append((boxes, [[0, 0, 0]] * 3, [1, 2, 3], []))
+        return results
+
+
+class FakeTeamIdentifier:
+    teams_initialized = True
+
+    def assign_teams_for_frame(self, features, ids):
+        return {player_id: 0 if player_id < 3 else 1 for player_id in ids}
+
+    def get_state(self):
+        return {"teams": True}
+
+    def load_state(self, state):
+        pass
+
+
+class Crash(BaseException):
+    """Stands in for the worker process dying."""
+
+
+class TestCheckpointResume:
+    @pytest.fixture(autouse=True)
+    def fake_components(self, tmp_path):
+        FakeBallTracker.frames_added = []
+        with patch.object(analysis_service, 'BallTracker', FakeBallTracker), \
+                patch.object(analysis_service, 'PlayerTracker', FakePlayerTracker), \
+                patch.object(analysis_service, 'TeamIdentifier', FakeTeamIdentifier), \
+                patch.object(analysis_service, 'get_video_cache', return_value=VideoCache(str(tmp_path / "cache"), 10**9)), \
+                patch('capstone.backend.app.core.analysis_config.TRACKNET_INFERENCE_STRIDE', 3), \
+                patch('capstone.backend.app.core.analysis_config.ANALYSIS_MAX_HEIGHT', 0), \
+                patch('capstone.backend.app.core.analysis_config.CHECKPOINT_INTERVAL_FRAMES', 10), \
+                patch('capstone.backend.app.core.analysis_config.CHECKPOINT_RESUME_WARMUP_FRAMES', 5), \
+                patch('capstone.backend.app.core.analysis_config.ANALYSIS_PROGRESS_INTERVAL_SECONDS', 0.0):
+            yield
+
+    def run(self, video_path, store, progress_callback=None):
+        with patch.object(analysis_service, 'get_checkpoint_store', return_value=store):
+            return analysis_service.run_video_analysis(video_path, progress_callback)
+
+    def test_resume_continues_from_last_checkpoint(self, numbered_video, tmp_path):
+        expected = self.run(numbered_video, CheckpointStore(str(tmp_path / "reference")))
+        assert expected["summary"]["final_passes"]["team1"] > 1
+
+        store = CheckpointStore(str(tmp_path / "checkpoints"))
+
+        def crash_at_frame_25(update):
+            if update["progress"]["frames_done"] == 25:
+                raise Crash()
+
+        with pytest.raises(Crash):
+            self.run(numbered_video, store, crash_at_frame_25)
+        key = VideoCache(str(tmp_path / "unused"), 1).content_key(numbered_video)
+        checkpoint = store.load(key)
+        assert checkpoint["frame_number"] == 20 and checkpoint["frames_done"] == 20
+
+        FakeBallTracker.frames_added = []
+        progress = []
+        with patch.object(StatsCalculator, 'update', autospec=True, side_effect=StatsCalculator.update) as update:
+            result = self.run(numbered_video, store, progress.append)
+
+        # Warm-up frames 16-20 are decoded again, but only frames after the checkpoint are counted
+        assert FakeBallTracker.frames_added[:5] == [16, 17, 18, 19, 20]
+        assert [call.args[1] for call in update.call_args_list] == list(range(21, 31))
+        assert progress[0]["progress"]["frames_done"] == 21
+        assert progress[-1]["progress"]["frames_done"] == 30
+        assert result == expected
+        assert store.load(key) is None
+
+
+class TestSegmentDecoding:
+    @pytest.fixture(autouse=True)
+    def fake_components(self, tmp_path):
+        FakePlayerTracker.frame_sizes = []
+        with patch.object(analysis_service, 'BallTracker', FakeBallTracker), \
+                patch.object(analysis_service, 'PlayerTracker', FakePlayerTracker), \
+                patch.object(analysis_service, 'get_video_cache', return_value=VideoCache(str(tmp_path / "cache"), 10**9)), \
+                patch('capstone.backend.app.core.analysis_config.TRACKNET_INFERENCE_STRIDE', 1):
+            yield
+
+    @pytest.mark.parametrize("overlap", [0, 3])
+    def test_sliding_segment_emits_its_first_frame(self, numbered_video, overlap):
+        metadata = analysis_service.video_utils.get_video_metadata(numbered_video)
+        no_teams = {"teams_initialized": False, "reference_team_colors_lab": [None, None]}
+        with patch('capstone.backend.app.core.analysis_config.ANALYSIS_SEGMENT_OVERLAP_FRAMES', overlap):
+            segment = analysis_service.analyze_segment(numbered_video, metadata, 11, 20, no_teams)
+
+        counted = [n for n in segment["frame_numbers"] if n >= segment["first_frame"]]
+        assert counted == list(range(11, 21))
+        assert segment["frame_numbers"][0] == 11 - max(overlap, 1) + 1
+
+    @patch('capstone.backend.app.core.analysis_config.ANALYSIS_MAX_HEIGHT', 120)
+    @patch('capstone.backend.app.core.analysis_config.INITIALIZATION_FRAMES', 5)
+    def test_team_colors_are_sampled_at_the_decode_size(self, numbered_video):
+        with patch.object(analysis_service.TeamIdentifier, 'initialize_from_samples', return_value=False) as initialize:
+            plan = analysis_service.prepare_segmented_analysis(numbered_video, "lease")
+
+        assert FakePlayerTracker.frame_sizes == [(120, 160)] * 5
+        assert len(initialize.call_args.args[0]) == 15
+        assert plan["video_path"] == numbered_video
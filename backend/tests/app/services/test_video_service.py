@@ -0,0 +1,208 @@
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, patch
+
+from capstone.backend.app.services.video_service import VideoService
+
+
+@pytest.fixture
+def video_collection():
+    return AsyncMock()
+
+
+@pytest.fixture
+def video_service(video_collection):
+    return VideoService(video_collection)
+
+
+def mock_client(received: dict):
+    def handler(request: httpx.Request):
+        received["headers"] = request.headers
+        received["body"] = request.read()
+        return httpx.Response(200, json={"filePath": "/uploads/match.mp4", "fileUrl": "https://upcdn.io/acc/raw/uploads/match.mp4"})
+
+    real_client = httpx.AsyncClient
+    return lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_upload_video_streams_chunks(video_service, video_collection):
+    received = {}
+    chunks_sent = []
+
+    async def chunks():
+        for chunk in (b"abc", b"def", b"g"):
+            chunks_sent.append(chunk)
+            yield chunk
+
+    with patch('capstone.backend.app.services.video_service.httpx.AsyncClient', mock_client(received)):
+        result = await video_service.upload_video("acc", "user@example.com", "key", chunks(),
+                                                  metadata={"originalFileName": "match.mp4"},
+                                                  content_length=7)
+
+    assert received["body"] == b"abcdefg"
+    assert received["headers"]["Content-Length"] == "7"
+    assert json.loads(received["headers"]["X-Upload-Metadata"]) == {"originalFileName": "match.mp4"}
+    assert chunks_sent == [b"abc", b"def", b"g"]
+    assert result["filePath"] == "/uploads/match.mp4"
+    video_collection.insert_one.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_upload_video_accepts_bytes(video_service):
+    received = {}
+
+    with patch('capstone.backend.app.services.video_service.httpx.AsyncClient', mock_client(received)):
+        await video_service.upload_video("acc", "user@example.com", "key", b"abcdefg")
+
+    assert received["body"] == b"abcdefg"
+
+
+def flaky_handler(failures: list, received: list):
+    """Answers with the queued failure responses/exceptions first, then succeeds."""
+    def handler(request: httpx.Request):
+        received.append(request.read())
+        if failures:
+            failure = failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return httpx.Response(failure)
+        return httpx.Response(200, json={"filePath": "/uploads/match.mp4"})
+    return handler
+
+
+@pytest.fixture
+def no_backoff():
+    with patch('capstone.backend.app.core.config.settings.upload_retry_backoff', 0):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_upload_uses_shared_client(video_collection):
+    received = []
+    async with httpx.AsyncClient(transport=httpx.MockTransport(flaky_handler([], received))) as client:
+        service = VideoService(video_collection, client)
+        await service.upload_video("acc", "user@example.com", "key", b"abc")
+        assert not client.is_closed
+
+    assert received == [b"abc"]
+
+
+@pytest.mark.asyncio
+async def test_upload_retries_transient_errors(video_collection, no_backoff):
+    received = []
+    failures = [503, httpx.ConnectError("connection refused")]
+
+    async def chunks():
+        yield b"abc"
+        yield b"def"
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(flaky_handler(failures, received))) as client:
+        result = await VideoService(video_collection, client).upload_video("acc", "user@example.com", "key", chunks)
+
+    assert received == [b"abcdef"] * 3
+    assert result["filePath"] == "/uploads/match.mp4"
+
+
+@pytest.mark.asyncio
+async def test_upload_gives_up_after_max_retries(video_collection, no_backoff):
+    received = []
+    with patch('capstone.backend.app.core.config.settings.upload_max_retries', 2):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(flaky_handler([503] * 5, received))) as client:
+            with pytest.raises(HTTPException) as exc_info:
+                await VideoService(video_collection, client).upload_video("acc", "user@example.com", "key", b"abc")
+
+    assert exc_info.value.status_code == 503
+    assert len(received) == 3
+    video_collection.insert_one.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_one_shot_stream_is_not_retried(video_collection, no_backoff):
+    received = []
+
+    async def chunks():
+        yield b"abc"
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(flaky_handler([503], received))) as client:
+        with pytest.raises(HTTPException):
+            await VideoService(video_collection, client).upload_video("acc", "user@example.com", "key", chunks())
+
+    assert len(received) == 1
+
+
+@pytest.mark.asyncio
+async def test_read_timeout_is_not_retried(video_collection, no_backoff):
+    # The body was sent, so the upload may already be stored
+    received = []
+    failures = [httpx.ReadTimeout("no response")]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(flaky_handler(failures, received))) as client:
+        with pytest.raises(HTTPException) as exc_info:
+            await VideoService(video_collection, client).upload_video("acc", "user@example.com", "key", b"abc")
+
+    assert exc_info.value.status_code == 503
+    assert len(received) == 1
+    video_collection.insert_one.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(video_collection, no_backoff):
+    received = []
+    async with httpx.AsyncClient(transport=httpx.MockTransport(flaky_handler([400], received))) as client:
+        with pytest.raises(HTTPException) as exc_info:
+            await VideoService(video_collection, client).upload_video("acc", "user@example.com", "key", b"abc")
+
+    assert exc_info.value.status_code == 400
+    assert len(received) == 1
+
+
+@pytest.mark.asyncio
+async def test_update_progress_merges_partial_stats(video_service, video_collection):
+    progress = {"frames_done": 50, "frame_count": 100, "fps": 25.0, "eta_seconds": 2.0}
+    stats = {"50": {"POSSESSION": {"team1": 60, "team2": 40}}}
+
+    await video_service.update_progress("https://upcdn.io/acc/video/match.mp4", progress, stats)
+
+    video_collection.update_one.assert_awaited_once_with(
+        {"file_url": "https://upcdn.io/acc/video/match.mp4"},
+        {"$set": {"status": "processing", "progress": progress, "latest_stats": stats,
+                  "analysis_results.stats.50": {"POSSESSION": {"team1": 60, "team2": 40}}}})
+
+
+@pytest.mark.asyncio
+async def test_progress_events_until_finished(video_service, video_collection):
+    video_collection.find_one.side_effect = [
+        {"status": "processing", "progress": {"frames_done": 10}, "latest_stats": {"10": {}}},
+        {"status": "processing", "progress": {"frames_done": 10}, "latest_stats": {"10": {}}},
+        {"status": "processing", "progress": {"frames_done": 20}, "latest_stats": {}},
+        {"status": "finished", "progress": {"frames_done": 20}},
+    ]
+
+    events = [event async for event in video_service.progress_events("64b7f0c2a1b2c3d4e5f60718", "user@example.com", 0)]
+
+    assert events == [
+        ("progress", {"progress": {"frames_done": 10}, "stats": {"10": {}}}),
+        ("progress", {"progress": {"frames_done": 20}, "stats": {}}),
+        ("status", {"status": "finished"}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_progress_events_reports_errors(video_service, video_collection):
+    video_collection.find_one.return_value = {"status": "error", "error_message": "boom"}
+
+    events = [event async for event in video_service.progress_events("64b7f0c2a1b2c3d4e5f60718", "user@example.com", 0)]
+
+    assert events == [("status", {"status": "error", "error_message": "boom"})]
+
+
+@pytest.mark.asyncio
+async def test_update_status_records_source_url(video_service, video_collection):
+    await video_service.update_status("https://upcdn.io/acc/video/match.mp4", source_url="https://upcdn.io/acc/raw/match.mp4")
+
+    video_collection.update_one.assert_awaited_once_with(
+        {"file_url": "https://upcdn.io/acc/video/match.mp4"},
+        {"$set": {"status": "processing", "source_url": "https://upcdn.io/acc/raw/match.mp4"}})
@@ -0,0 +1,48 @@
+import json
+import os
+
+import pytest
+
+from capstone.backend.app.utils.analysis_checkpoint import CheckpointStore, CHECKPOINT_VERSION
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / "checkpoints"))
+
+
+class TestCheckpointStore:
+    def test_save_and_load(self, store):
+        store.save("abc", {"frame_number": 1500, "stats_log": {"1500": {"POSSESSION": {"team1": 50, "team2": 50}}}})
+
+        checkpoint = store.load("abc")
+
+        assert checkpoint["frame_number"] == 1500
+        assert checkpoint["stats_log"]["1500"]["POSSESSION"]["team1"] == 50
+        assert checkpoint["version"] == CHECKPOINT_VERSION
+
+    def test_missing_checkpoint(self, store):
+        assert store.load("unknown") is None
+
+    def test_save_replaces_previous(self, store):
+        store.save("abc", {"frame_number": 1500})
+        store.save("abc", {"frame_number": 3000})
+
+        assert store.load("abc")["frame_number"] == 3000
+        assert os.listdir(store.checkpoint_dir) == ["abc.json"]
+
+    def test_delete(self, store):
+        store.save("abc", {"frame_number": 1500})
+        store.delete("abc")
+        store.delete("abc")
+
+        assert store.load("abc") is None
+
+    def test_ignores_corrupt_and_outdated_checkpoints(self, store):
+        with open(os.path.join(store.checkpoint_dir, "corrupt.json"), "w") as f:
+            f.write("{not json")
+        with open(os.path.join(store.checkpoint_dir, "old.json"), "w") as f:
+            json.dump({"frame_number": 10, "version": CHECKPOINT_VERSION - 1}, f)
+
+        assert store.load("corrupt") is None
+        assert store.load("old") is None
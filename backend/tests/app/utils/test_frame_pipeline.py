@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from capstone.backend.app.utils.frame_pipeline import FramePipeline
+
+
+def double(items):
+    for item in items:
+        yield item * 2
+
+
+def pairs(items):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == 2:
+            yield tuple(batch)
+            batch = []
+    if batch:
+        yield tuple(batch)
+
+
+class TestFramePipeline:
+    def test_delivers_items_in_order(self):
+        pipeline = FramePipeline(range(100), [double], queue_size=2)
+
+        assert list(pipeline) == [i * 2 for i in range(100)]
+
+    def test_stages_can_regroup_items(self):
+        pipeline = FramePipeline(range(5), [double, pairs], queue_size=1)
+
+        assert list(pipeline) == [(0, 2), (4, 6), (8,)]
+
+    def test_no_stages_passes_source_through(self):
+        assert list(FramePipeline(iter("abc"), [])) == ["a", "b", "c"]
+
+    def test_backpressure_bounds_source_read_ahead(self):
+        produced = []
+
+        def source():
+            for i in range(50):
+                produced.append(i)
+                yield i
+
+        pipeline = FramePipeline(source(), [double], queue_size=2)
+        iterator = iter(pipeline)
+        assert next(iterator) == 0
+        time.sleep(0.3)
+
+        # Two bounded queues plus the item held by each thread.
+        assert len(produced) <= 8
+        pipeline.close()
+
+    def test_stage_error_is_raised_to_consumer(self):
+        def failing(items):
+            for item in items:
+                if item == 3:
+                    raise ValueError("bad frame")
+                yield item
+
+        pipeline = FramePipeline(range(10), [failing, double], queue_size=2)
+
+        with pytest.raises(ValueError, match="bad frame"):
+            list(pipeline)
+
+    def test_source_error_is_raised_to_consumer(self):
+        def source():
+            yield 1
+            raise IOError("decode failed")
+
+        with pytest.raises(IOError, match="decode failed"):
+            list(FramePipeline(source(), [double]))
+
+    def test_early_exit_stops_threads_and_closes_source(self):
+        closed = threading.Event()
+
+        def source():
+            try:
+                i = 0
+                while True:
+                    yield i
+                    i += 1
+            finally:
+                closed.set()
+
+        pipeline = FramePipeline(source(), [double], queue_size=2)
+        for item in pipeline:
+            if item >= 10:
+                break
+
+        assert closed.wait(timeout=2)
+        assert all(not thread.is_alive() for thread in pipeline._threads)
@@ -1,7 +1,10 @@
 import pytest
 from unittest.mock import patch, MagicMock
+import json
 import logging
 
+import numpy as np
+
 from capstone.backend.app.utils.stats_calculator import StatsCalculator
 from capstone.backend.app.core import analysis_config as config
 
@@ -43,6 +46,30 @@ class TestStatsCalculator:
         result = calculator._find_possessing_player(ball_center, player_boxes)
         assert result is None
 
+    @patch('capstone.backend.app.core.analysis_config.POSSESSION_THRESHOLD_PIXELS', 40)
+    def test_possession_threshold_follows_distance_scale(self):
+        ball_center = (40, 40)
+        player_boxes = {1: [10, 10, 30, 30]}  # center (20, 20), ~28 px from the ball
+        assert StatsCalculator()._find_possessing_player(ball_center, player_boxes) == 1
+        # Frames analysed at half resolution: 40 source pixels are 20 analysis pixels.
+        assert StatsCalculator(distance_scale=0.5)._find_possessing_player(ball_center, player_boxes) is None
+
+    def test_state_round_trip(self, calculator):
+        calculator.possession_frames_team = {0: 30, 1: 10}
+        calculator.pass_counts_team = {0: 2, 1: 1}
+        calculator.last_confirmed_possessor_info = {'id': 7, 'team': 0}
+        calculator.get_stats_update(40)
+
+        restored = StatsCalculator()
+        restored.load_state(json.loads(json.dumps(calculator.get_state())))
+
+        assert restored.possession_frames_team == {0: 30, 1: 10}
+        assert restored.pass_counts_team == {0: 2, 1: 1}
+        assert restored.last_logged_possession_percent == calculator.last_logged_possession_percent
+        assert restored.get_stats_update(41) is None
+        # Track ids don't survive a restart, so the next possessor must not count as a pass.
+        assert restored.last_confirmed_possessor_info == {'id': None, 'team': -1}
+
     @patch('logging.warning')
     def test_find_possessing_player_error_handling(self, mock_warning, calculator):
         ball_center = (20, 20)
@@ -138,4 +165,95 @@ class TestStatsCalculator:
         assert final_stats == {
             "final_possession": {"team1": 70, "team2": 30},
             "final_passes": {"team1": 8, "team2": 5}
-        }
\ No newline at end of file
+        }
+
+
+def random_frames(seed, num_frames=300, max_players=6):
+    """Random but reproducible frames with close-by players, shared track ids and occasional missing balls."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for frame_count in range(1, num_frames + 1):
+        num_players = int(rng.integers(0, max_players + 1))
+        ids = rng.choice(np.arange(1, 10), size=num_players, replace=False)
+        boxes = {}
+        for track_id in ids:
+            x1, y1 = rng.integers(0, 400, size=2)
+            boxes[track_id] = [int(x1), int(y1), int(x1 + rng.integers(5, 60)), int(y1 + rng.integers(5, 120))]
+        teams = {track_id: int(track_id % 2) for track_id in ids if track_id != 9}
+        ball = None if rng.random() < 0.1 else (float(rng.uniform(0, 450)), float(rng.uniform(0, 500)))
+        frames.append((frame_count, ball, boxes, teams))
+    return frames
+
+
+class TestStatsCalculatorVectorised:
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_array_search_matches_dict_search(self, seed):
+        calculator = StatsCalculator()
+        for _, ball, boxes, _ in random_frames(seed):
+            box_array, ids = StatsCalculator._boxes_to_arrays(boxes)
+            assert calculator._find_possessing_player_array(ball, box_array, ids) == \
+                calculator._find_possessing_player(ball, boxes)
+
+    def test_array_search_keeps_first_of_equally_close_players(self):
+        calculator = StatsCalculator()
+        boxes = np.array([[0, 0, 20, 20], [10, 10, 30, 30], [0, 0, 20, 20]])
+
+        assert calculator._find_possessing_player_array((15, 15), boxes, np.array([7, 3, 5])) == 7
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_update_arrays_matches_update(self, seed):
+        by_dict, by_array = StatsCalculator(), StatsCalculator()
+        for frame_count, ball, boxes, teams in random_frames(seed):
+            by_dict.update(frame_count, ball, boxes, teams)
+            box_array, ids = StatsCalculator._boxes_to_arrays(boxes)
+            by_array.update_arrays(frame_count, ball, box_array, ids, teams)
+
+        assert by_array.possession_frames_team == by_dict.possession_frames_team
+        assert by_array.pass_counts_team == by_dict.pass_counts_team
+        assert by_array.get_final_stats() == by_dict.get_final_stats()
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_replayed_possessors_match_update(self, seed):
+        # Segment-parallel analysis records each frame's possessor and replays them in frame order.
+        live, replayed = StatsCalculator(), StatsCalculator()
+        for frame_count, ball, boxes, teams in random_frames(seed):
+            live.update(frame_count, ball, boxes, teams)
+            possessor = replayed.find_possessing_player(ball, boxes)
+            replayed.update_possessor(frame_count, possessor, teams.get(possessor, -1))
+
+        assert replayed.possession_frames_team == live.possession_frames_team
+        assert replayed.pass_counts_team == live.pass_counts_team
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_update_batch_matches_sequential_updates(self, seed):
+        frames = random_frames(seed)
+        sequential, batched = StatsCalculator(), StatsCalculator()
+        sequential_log = {}
+        for frame_count, ball, boxes, teams in frames:
+            sequential.update(frame_count, ball, boxes, teams)
+            stat_update = sequential.get_stats_update(frame_count)
+            if stat_update:
+                sequential_log.update(stat_update)
+
+        arrays = [StatsCalculator._boxes_to_arrays(boxes) for _, _, boxes, _ in frames]
+        batched_log = {}
+        possession_teams, pass_teams = batched.update_batch(
+            [frame[0] for frame in frames], [frame[1] for frame in frames],
+            [box_array for box_array, _ in arrays], [ids for _, ids in arrays],
+            [frame[3] for frame in frames], stats_log=batched_log)
+
+        assert batched.possession_frames_team == sequential.possession_frames_team
+        assert batched.pass_counts_team == sequential.pass_counts_team
+        assert batched_log == sequential_log
+        assert np.count_nonzero(pass_teams == 0) == batched.pass_counts_team[0]
+        assert np.count_nonzero(possession_teams == 1) == batched.possession_frames_team[1]
+
+    def test_counters_are_plain_ints(self):
+        calculator = StatsCalculator()
+        calculator.update(1, (20, 20), {1: [10, 10, 30, 30]}, {1: 0})
+
+        final_stats = calculator.get_final_stats()
+
+        assert type(final_stats["final_passes"]["team1"]) is int
+        assert type(calculator.possession_frames_team[0]) is int
+
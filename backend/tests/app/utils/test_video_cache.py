@@ -0,0 +1,188 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from capstone.backend.app.utils.video_cache import VideoCache
+
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        CountingHandler.requests.append(self.path)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def served_dir(tmp_path):
+    served = tmp_path / "served"
+    served.mkdir()
+    (served / "a.mp4").write_bytes(b"a" * 1000)
+    (served / "copy_of_a.mp4").write_bytes(b"a" * 1000)
+    (served / "b.mp4").write_bytes(b"b" * 1000)
+    return served
+
+
+@pytest.fixture
+def base_url(served_dir):
+    CountingHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=str(served_dir)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def seed_many(cache_dir: str, max_bytes: int, prefix: str, count: int):
+    cache = VideoCache(cache_dir, max_bytes)
+    for i in range(count):
+        cache.seed(f"http://example.com/{prefix}-{i}.mp4", f"{prefix}-{i}".encode() * 100)
+
+
+def run_in_processes(*jobs):
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=seed_many, args=args) for args in jobs]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0] * len(processes)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return VideoCache(str(tmp_path / "cache"), max_bytes=10_000)
+
+
+class TestVideoCache:
+    def test_downloads_once(self, cache, base_url):
+        first = cache.materialize(f"{base_url}/a.mp4")
+        second = cache.materialize(f"{base_url}/a.mp4")
+
+        assert first == second
+        assert first.endswith(".mp4")
+        with open(first, "rb") as f:
+            assert f.read() == b"a" * 1000
+        assert CountingHandler.requests == ["/a.mp4"]
+
+    def test_same_content_is_stored_once(self, cache, base_url):
+        first = cache.materialize(f"{base_url}/a.mp4")
+        second = cache.materialize(f"{base_url}/copy_of_a.mp4")
+
+        assert first == second
+        assert len([name for name in os.listdir(cache.cache_dir) if name.endswith(".mp4")]) == 1
+
+    def test_seed_skips_download(self, cache, base_url):
+        seeded = cache.seed(f"{base_url}/b.mp4", b"b" * 1000)
+
+        assert cache.materialize(f"{base_url}/b.mp4") == seeded
+        assert CountingHandler.requests == []
+
+    def test_local_paths_are_used_directly(self, cache, served_dir):
+        path = str(served_dir / "a.mp4")
+        assert cache.materialize(path) == path
+
+    def test_failed_download_leaves_no_entry(self, cache, base_url):
+        with pytest.raises(httpx.HTTPStatusError):
+            cache.materialize(f"{base_url}/missing.mp4")
+
+        assert cache.lookup(f"{base_url}/missing.mp4") is None
+        assert [name for name in os.listdir(cache.cache_dir) if name.endswith(".tmp")] == []
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = VideoCache(str(tmp_path / "cache"), max_bytes=2500)
+        cache.seed("http://example.com/1.mp4", b"1" * 1000)
+        os.utime(cache.lookup("http://example.com/1.mp4"), (1, 1))
+        cache.seed("http://example.com/2.mp4", b"2" * 1000)
+        os.utime(cache.lookup("http://example.com/2.mp4"), (2, 2))
+        cache.lookup("http://example.com/1.mp4")  # 1 is now the most recently used
+        cache.seed("http://example.com/3.mp4", b"3" * 1000)
+
+        assert cache.lookup("http://example.com/1.mp4") is not None
+        assert cache.lookup("http://example.com/2.mp4") is None
+        assert cache.lookup("http://example.com/3.mp4") is not None
+
+    def test_writer_commits_under_source_known_later(self, cache):
+        writer = cache.open_writer()
+        writer.write(b"ab")
+        writer.write(b"c")
+
+        path = writer.commit("http://example.com/late.mp4")
+
+        assert cache.lookup("http://example.com/late.mp4") == path
+        with open(path, "rb") as f:
+            assert f.read() == b"abc"
+
+    def test_discarded_writer_leaves_nothing(self, cache):
+        writer = cache.open_writer()
+        writer.write(b"abc")
+        writer.discard()
+
+        assert writer.discarded
+        assert os.listdir(cache.cache_dir) == []
+
+    def test_writer_reset_starts_over(self, cache):
+        writer = cache.open_writer()
+        writer.write(b"partial")
+        writer.reset()
+        writer.write(b"abc")
+
+        path = writer.commit("http://example.com/retried.mp4")
+
+        with open(path, "rb") as f:
+            assert f.read() == b"abc"
+        assert os.path.basename(path).startswith(hashlib.sha256(b"abc").hexdigest())
+
+
+class TestVideoCacheAcrossProcesses:
+    def test_concurrent_stores_keep_every_index_entry(self, tmp_path):
+        cache_dir = str(tmp_path / "cache")
+
+        run_in_processes(*[(cache_dir, 10**9, f"p{p}", 25) for p in range(4)])
+
+        cache = VideoCache(cache_dir, 10**9)
+        missing = [(p, i) for p in range(4) for i in range(25) if cache.lookup(f"http://example.com/p{p}-{i}.mp4") is None]
+        assert missing == []
+
+    def test_leased_file_is_not_evicted_by_another_process(self, tmp_path):
+        cache = VideoCache(str(tmp_path / "cache"), max_bytes=2500)
+        lease = cache.new_lease()
+        writer = cache.open_writer()
+        writer.write(b"x" * 1000)
+        path = writer.commit("http://example.com/in-use.mp4", lease=lease)
+        os.utime(path, (1, 1))  # least recently used
+
+        run_in_processes((cache.cache_dir, 2500, "other", 3))
+
+        assert os.path.exists(path)
+        assert cache.lookup("http://example.com/in-use.mp4") == path
+
+        cache.release(lease)
+        os.utime(path, (1, 1))
+        run_in_processes((cache.cache_dir, 2500, "more", 1))
+        assert not os.path.exists(path)
+
+    def test_lease_of_dead_process_is_ignored(self, tmp_path):
+        cache = VideoCache(str(tmp_path / "cache"), max_bytes=1500)
+        process = multiprocessing.get_context("fork").Process(target=lambda: None)
+        process.start()
+        process.join()
+        writer = cache.open_writer()
+        writer.write(b"x" * 1000)
+        path = writer.commit("http://example.com/abandoned.mp4", lease=f"{process.pid}-{'0' * 32}")
+        os.utime(path, (1, 1))
+
+        cache.seed("http://example.com/new.mp4", b"y" * 1000)
+
+        assert not os.path.exists(path)
+        assert os.listdir(os.path.join(cache.cache_dir, "leases")) == []
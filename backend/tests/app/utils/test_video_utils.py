@@ -9,8 +9,12 @@ from unittest.mock import patch, MagicMock
 
 from capstone.backend.app.utils.video_utils import (
     get_dominant_color_lab_team,
+    get_dominant_colors_lab_team,
     prepare_tracknet_input,
-    get_video_metadata
+    get_video_metadata,
+    read_frames,
+    analysis_resolution,
+    TrackNetInputBuffer
 )
 from capstone.backend.app.core import analysis_config as config
 
@@ -58,6 +62,71 @@ class TestGetDominantColorLabTeam:
         assert result is None
 
 
+class TestGetDominantColorsLabTeam:
+    @pytest.fixture
+    def frame(self):
+        frame = np.zeros((200, 300, 3), dtype=np.uint8)
+        frame[:, :] = [0, 255, 0]  # Green pitch
+        frame[20:80, 20:60] = [0, 0, 255]  # Red player
+        frame[20:80, 100:140] = [200, 50, 30]  # Blue player
+        frame[30:50, 100:140] = [255, 255, 255]  # White band on the blue player
+        return frame
+
+    def test_matches_per_crop_extraction(self, frame):
+        boxes = [(10, 10, 70, 90), (95, 15, 145, 85)]
+
+        colors, has_color = get_dominant_colors_lab_team(frame, boxes)
+
+        assert colors.shape == (2, 3)
+        assert has_color.tolist() == [True, True]
+        for (x1, y1, x2, y2), color in zip(boxes, colors):
+            expected = get_dominant_color_lab_team(frame[y1:y2, x1:x2])
+            np.testing.assert_allclose(color, expected, atol=1.0)
+
+    def test_mostly_green_box_has_no_color(self, frame):
+        colors, has_color = get_dominant_colors_lab_team(frame, [(200, 100, 260, 180), (10, 10, 70, 90)])
+
+        assert has_color.tolist() == [False, True]
+        assert np.isnan(colors[0]).all()
+
+    def test_no_boxes(self, frame):
+        colors, has_color = get_dominant_colors_lab_team(frame, [])
+
+        assert colors.shape == (0, 3)
+        assert has_color.shape == (0,)
+
+    def test_boxes_are_clipped_to_frame(self, frame):
+        _, has_color = get_dominant_colors_lab_team(frame, [(-20, -20, 70, 90), (290, 190, 400, 400)])
+
+        assert has_color.tolist() == [True, False]
+
+    @patch('capstone.backend.app.core.analysis_config.TEAM_COLOR_TORSO_ONLY', True)
+    def test_torso_only_ignores_legs(self, frame):
+        frame[60:80, 100:140] = [0, 0, 0]  # Dark shorts below the torso band
+
+        torso_colors, _ = get_dominant_colors_lab_team(frame, [(100, 20, 140, 80)])
+
+        expected = get_dominant_color_lab_team(frame[29:56, 100:140])
+        np.testing.assert_allclose(torso_colors[0], expected, atol=1.0)
+
+    @patch('capstone.backend.app.core.analysis_config.TEAM_COLOR_DOWNSCALE', 0.5)
+    def test_downscaled_extraction(self, frame):
+        colors, has_color = get_dominant_colors_lab_team(frame, [(10, 10, 70, 90)])
+
+        assert has_color.tolist() == [True]
+        np.testing.assert_allclose(colors[0], get_dominant_color_lab_team(frame[10:90, 10:70]), atol=1.0)
+
+    def test_pixel_threshold_scales_with_analysis_resolution(self, frame):
+        frame[150:155, 200:205] = [0, 0, 255]  # Distant player: 25 non-green pixels, below MIN_NON_BG_PIXELS_TEAM
+
+        _, at_source_size = get_dominant_colors_lab_team(frame, [(195, 145, 210, 160)])
+        # Decoded at half the source size, the same player would have covered 100 source pixels
+        _, at_half_size = get_dominant_colors_lab_team(frame, [(195, 145, 210, 160)], analysis_scale=0.5)
+
+        assert at_source_size.tolist() == [False]
+        assert at_half_size.tolist() == [True]
+
+
 class TestPrepareTracknetInput:
     def test_valid_frames(self):
         frames = deque([
@@ -112,6 +181,64 @@ class TestPrepareTracknetInput:
         assert result is None
 
 
+class TestTrackNetInputBuffer:
+    @pytest.fixture
+    def frames(self):
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(4)]
+
+    def test_matches_prepare_tracknet_input(self, frames):
+        buffer = TrackNetInputBuffer(224, 224)
+        for frame in frames[:3]:
+            buffer.push(frame)
+
+        expected = prepare_tracknet_input(deque(frames[:3]), 224, 224)
+
+        assert buffer.is_full()
+        assert buffer.tensor.shape == (1, 9, 224, 224)
+        assert torch.equal(buffer.tensor, expected)
+
+    def test_rolls_oldest_frame_out(self, frames):
+        buffer = TrackNetInputBuffer(224, 224)
+        for frame in frames[:3]:
+            buffer.push(frame)
+        untouched = buffer.tensor[:, 3:9].clone()
+
+        buffer.push(frames[3])
+
+        expected = prepare_tracknet_input(deque(frames[1:]), 224, 224)
+        assert torch.equal(buffer.tensor, expected)
+        # Only the oldest frame's slot was written
+        assert torch.equal(buffer.tensor[:, 0:6], untouched)
+
+    def test_ordered_input_is_a_view(self, frames):
+        buffer = TrackNetInputBuffer(224, 224)
+        for frame in frames[:3]:
+            buffer.push(frame)
+
+        assert buffer.tensor.data_ptr() == buffer.tensor.data_ptr()
+
+    def test_crop(self, frames):
+        buffer = TrackNetInputBuffer(224, 224)
+        for frame in frames:
+            buffer.push(frame)
+
+        crop = buffer.model_input((10, 20), 64)
+
+        assert torch.equal(crop, buffer.tensor[:, :, 10:74, 20:84])
+
+    def test_not_full_until_three_frames(self, frames):
+        buffer = TrackNetInputBuffer(224, 224)
+        buffer.push(frames[0])
+        buffer.push(frames[1])
+
+        assert len(buffer) == 2
+        assert not buffer.is_full()
+
+        buffer.clear()
+        assert len(buffer) == 0
+
+
 class TestGetVideoMetadata:
     @pytest.fixture
     def mock_video_file(self):
@@ -140,6 +267,27 @@ class TestGetVideoMetadata:
         assert result["height"] == 1080
         assert result["fps"] == 30
         assert result["frame_count"] == 300
+        assert (result["analysis_width"], result["analysis_height"]) == (1920, 1080)
+        assert result["analysis_scale"] == 1.0
+
+    @patch('capstone.backend.app.core.analysis_config.ANALYSIS_MAX_HEIGHT', 720)
+    @patch('cv2.VideoCapture')
+    def test_analysis_resolution(self, mock_cap, mock_video_file):
+        mock_instance = MagicMock()
+        mock_instance.isOpened.return_value = True
+        mock_instance.get.side_effect = lambda prop: {
+            cv2.CAP_PROP_FRAME_WIDTH: 3840,
+            cv2.CAP_PROP_FRAME_HEIGHT: 2160,
+            cv2.CAP_PROP_FPS: 30,
+            cv2.CAP_PROP_FRAME_COUNT: 300
+        }.get(prop, 0)
+        mock_cap.return_value = mock_instance
+
+        result = get_video_metadata(mock_video_file)
+
+        assert (result["width"], result["height"]) == (3840, 2160)
+        assert (result["analysis_width"], result["analysis_height"]) == (1280, 720)
+        assert result["analysis_scale"] == pytest.approx(1 / 3)
 
     @patch('cv2.VideoCapture')
     def test_video_open_failure(self, mock_cap, mock_video_file):
@@ -177,4 +325,58 @@ class TestGetVideoMetadata:
 
         result = get_video_metadata(mock_video_file)
 
-        assert result is None
\ No newline at end of file
+        assert result is None
+
+class TestReadFrames:
+    @pytest.fixture
+    def video_file(self):
+        temp_file = tempfile.NamedTemporaryFile(suffix=".avi", delete=False)
+        temp_file.close()
+        writer = cv2.VideoWriter(temp_file.name, cv2.VideoWriter_fourcc(*"MJPG"), 10, (320, 240))
+        for i in range(5):
+            frame = np.full((240, 320, 3), 40 * i, dtype=np.uint8)
+            writer.write(frame)
+        writer.release()
+        yield temp_file.name
+        os.unlink(temp_file.name)
+
+    @pytest.mark.parametrize("backend", ["opencv", "pyav"])
+    def test_decodes_at_requested_size(self, video_file, backend):
+        if backend == "pyav":
+            pytest.importorskip("av")
+        with patch('capstone.backend.app.core.analysis_config.VIDEO_DECODE_BACKEND', backend):
+            frames = list(read_frames(video_file, (160, 120)))
+
+        assert [frame_number for frame_number, _ in frames] == [1, 2, 3, 4, 5]
+        assert all(frame.shape == (120, 160, 3) and frame.dtype == np.uint8 for _, frame in frames)
+        assert abs(int(frames[2][1].mean()) - 80) < 5
+
+    @pytest.mark.parametrize("backend", ["opencv", "pyav"])
+    def test_starts_at_requested_frame(self, video_file, backend):
+        if backend == "pyav":
+            pytest.importorskip("av")
+        with patch('capstone.backend.app.core.analysis_config.VIDEO_DECODE_BACKEND', backend):
+            all_frames = dict(read_frames(video_file, (160, 120)))
+            frames = list(read_frames(video_file, (160, 120), start_frame=4))
+
+        assert [frame_number for frame_number, _ in frames] == [4, 5]
+        assert all(np.array_equal(frame, all_frames[frame_number]) for frame_number, frame in frames)
+
+    def test_full_resolution_by_default(self, video_file):
+        frames = list(read_frames(video_file))
+
+        assert len(frames) == 5
+        assert frames[0][1].shape == (240, 320, 3)
+
+    @pytest.mark.parametrize("backend", ["opencv", "pyav"])
+    def test_missing_file_raises(self, backend):
+        if backend == "pyav":
+            pytest.importorskip("av")
+        with patch('capstone.backend.app.core.analysis_config.VIDEO_DECODE_BACKEND', backend):
+            with pytest.raises(IOError):
+                next(read_frames("/nonexistent/video.mp4", (160, 120)))
+
+    @patch('capstone.backend.app.core.analysis_config.ANALYSIS_MAX_HEIGHT', 480)
+    def test_analysis_resolution_keeps_smaller_videos(self):
+        assert analysis_resolution(640, 360) == (640, 360)
+        assert analysis_resolution(1920, 1080) == (854, 480)
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from unittest.mock import patch
+
+from capstone.backend.ai import model_registry
+from capstone.backend.app.utils import video_utils
+from capstone.backend.benchmarks import analysis_benchmark
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "synthetic.avi")
+    truth = analysis_benchmark.write_synthetic_video(path, num_frames=30, width=320, height=192, num_players=6)
+    return path, truth
+
+
+class TestSyntheticVideo:
+    def test_video_matches_ground_truth(self, video):
+        path, truth = video
+
+        assert video_utils.get_video_metadata(path)["frame_count"] == 30
+        for frame_number, frame in video_utils.read_frames(path):
+            frame_truth = truth[frame_number - 1]
+            x, y = (int(v) for v in frame_truth["ball"])
+            assert frame[y, x].min() > 200  # white ball
+            x1, y1, x2, y2 = frame_truth["boxes"][1]
+            shirt = frame[y1 + 2, (x1 + x2) // 2].astype(int)
+            assert abs(shirt - analysis_benchmark.TEAM_SHIRTS_BGR[frame_truth["teams"][1]]).max() < 40
+
+    def test_is_deterministic(self, video, tmp_path):
+        _, truth = video
+
+        again = analysis_benchmark.write_synthetic_video(str(tmp_path / "again.avi"), num_frames=30, width=320,
+                                                         height=192, num_players=6)
+
+        assert again == truth
+
+
+class TestBenchmark:
+    def test_latency_summary(self):
+        summary = analysis_benchmark.latency_summary([0.001, 0.002, 0.003, 0.004])
+
+        assert summary["calls"] == 4
+        assert summary["per_s"] == pytest.approx(400)
+        assert summary["p50_ms"] == pytest.approx(2.5)
+        assert summary["max_ms"] == pytest.approx(4)
+        assert analysis_benchmark.latency_summary([]) == {"calls": 0}
+
+    def test_stages_run_offline_with_random_weights(self, video, tmp_path):
+        path, truth = video
+        overrides = analysis_benchmark.random_model_overrides(str(tmp_path), include_yolo=False)
+
+        with analysis_benchmark._config_overrides(TRACKNET_HEIGHT=64, TRACKNET_WIDTH=96, INITIALIZATION_FRAMES=10,
+                                                  TRACKNET_BACKEND="eager", BALL_TRACKER_BACKEND="kalman", **overrides):
+            model_registry.clear()
+            try:
+                results = analysis_benchmark.benchmark_stages(path, truth, tracknet_iterations=2)
+            finally:
+                model_registry.clear()
+
+        assert results["decode"]["calls"] == 30
+        assert results["prepare_tracknet_input"]["calls"] == 28
+        assert results["tracknet_forward"]["calls"] == 2
+        for stage in ("peak_finding", "ball_tracker_update", "color_extraction", "team_assignment", "stats_update"):
+            assert results[stage]["calls"] == 30 and results[stage]["p99_ms"] >= results[stage]["p50_ms"]
+        assert results["teams_initialized"]
+        json.dumps(results)